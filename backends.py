@@ -0,0 +1,183 @@
+"""
+GPT4oTimeReader의 chat.completions 백엔드
+OpenAIBackend는 공용 OpenAI 클라이언트로 HTTP 요청을 보내고, LocalBackend는 네트워크 없이
+프로세스 안에서 대역 응답(정답/오류 모델)과 주입된 지연, 429, 타임아웃, 500을 돌려줍니다.
+리더의 재시도, 속도 제한, 캐시는 백엔드와 무관하게 그대로 동작합니다.
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+import openai
+from openai.types.chat import ChatCompletion
+from cassette import Cassette, shared_cassette
+from client_registry import async_client, connection_stats, http, shared_client
+from local_openai_server import FaultModel, Responder, completion, constant_responder
+
+class Backend(ABC):
+    """백엔드 인터페이스 (create/async_client/acreate를 모두 구현해야 인스턴스를 만들 수 있음)
+
+    key: 속도 제한기와 서킷 브레이커를 공유할 단위 (같은 할당량을 쓰는 백엔드끼리 같은 값)
+    create(request, timeout) → (ChatCompletion, 응답 헤더), timeout은 리더의 요청당 시간(초)
+    async_client() → 배치 하나 동안 쓸 async 컨텍스트 관리자 (acreate의 client 인자)
+    """
+
+    key = ''
+    client: Optional[openai.OpenAI] = None
+
+    @abstractmethod
+    def create(self, request: Dict, timeout: Optional[float] = None) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        """요청 하나 (동기)"""
+
+    @abstractmethod
+    def async_client(self, max_connections: Optional[int] = None):
+        """배치 하나 동안 쓸 async 컨텍스트 관리자"""
+
+    @abstractmethod
+    async def acreate(self, request: Dict, client) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        """요청 하나 (비동기, client는 async_client()의 값)"""
+
+    def summary(self) -> Optional[Dict]:
+        """연결/요청 통계 (없으면 None)"""
+        return None
+
+class OpenAIBackend(Backend):
+    """OpenAI API (또는 base_url의 호환 서버), (API 키, base_url)별 공용 연결 풀 사용"""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = 60.0):
+        # 재시도는 SDK 대신 리더의 retry_policy와 공용 제한기(429)가 처리
+        self.client = shared_client(api_key, base_url, max_retries=0, timeout=timeout)
+        self.base_url = base_url
+        self.timeout = timeout
+        self.key = self.client.api_key or ''
+
+    def create(self, request: Dict, timeout: Optional[float] = None) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        options = {} if timeout is None else {"timeout": timeout}
+        raw = self.client.chat.completions.with_raw_response.create(**request, **options)
+        return raw.parse(), raw.headers
+
+    def async_client(self, max_connections: Optional[int] = None) -> openai.AsyncOpenAI:
+        """비동기 클라이언트 (이벤트 루프마다 새로 만들어 닫아야 함)"""
+        return async_client(self.client.api_key, self.base_url, max_connections,
+                            max_retries=0, timeout=self.timeout)
+
+    async def acreate(self, request: Dict, client: openai.AsyncOpenAI) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        raw = await client.chat.completions.with_raw_response.create(**request)
+        return raw.parse(), raw.headers
+
+    def summary(self) -> Dict:
+        return {"connections": connection_stats(self.client.api_key, self.base_url).summary()}
+
+class _LocalSession:
+    """LocalBackend.async_client가 돌려주는 빈 세션 (연결이 없으므로 열고 닫을 것이 없음)"""
+
+    async def __aenter__(self) -> '_LocalSession':
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+class LocalBackend(Backend):
+    """HTTP 없이 프로세스 안에서 응답하는 대역 백엔드 (부하 테스트, 클라이언트 오버헤드 측정용)
+
+    responder: 요청 body → 응답 텍스트 (예: local_openai_server.DatasetOracle)
+    faults: 지연 시간과 429/타임아웃/500 주입 (OpenAI SDK와 같은 예외를 던짐)
+    timeout: create에 timeout이 없을 때 멈춘 응답을 타임아웃으로 볼 시간(초)
+             (리더는 자기 timeout을 넘기고, 비동기는 리더의 timeout이 끊음)
+    """
+
+    def __init__(self, responder: Optional[Responder] = None, faults: Optional[FaultModel] = None,
+                 timeout: float = 60.0, key: Optional[str] = None):
+        self.responder = responder or constant_responder
+        self.faults = faults
+        self.timeout = timeout
+        self.key = key or f"local-{id(self):x}"
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _draw(self, request: Dict) -> Tuple[str, float]:
+        with self._lock:
+            self.requests += 1
+        if self.faults is None:
+            return 'ok', 0.0
+        return self.faults.draw(request)
+
+    def _respond(self, request: Dict, kind: str) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        """주입된 오류를 SDK 예외로 던지거나 응답 생성"""
+        if kind in ('rate_limit', 'server_error'):
+            status = 429 if kind == 'rate_limit' else 500
+            body = self.faults.error_body(kind)
+            response = http.Response(status, headers={k: str(v) for k, v in self.faults.headers(kind).items()},
+                                     json=body, request=_REQUEST)
+            error = openai.RateLimitError if status == 429 else openai.InternalServerError
+            raise error(body["error"]["message"], response=response, body=body["error"])
+        return ChatCompletion.model_validate(completion(request, self.responder(request))), {}
+
+    def create(self, request: Dict, timeout: Optional[float] = None) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        kind, delay = self._draw(request)
+        time.sleep(delay)
+        if kind == 'timeout':
+            time.sleep(min(self.faults.hang, self.timeout if timeout is None else timeout))
+            raise openai.APITimeoutError(request=_REQUEST)
+        return self._respond(request, kind)
+
+    def async_client(self, max_connections: Optional[int] = None) -> _LocalSession:
+        return _LocalSession()
+
+    async def acreate(self, request: Dict, client) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        kind, delay = self._draw(request)
+        if delay:
+            await asyncio.sleep(delay)
+        if kind == 'timeout':
+            # 리더의 asyncio.wait_for(timeout)가 끊을 때까지 멈춤
+            await asyncio.sleep(self.faults.hang)
+            raise openai.APITimeoutError(request=_REQUEST)
+        return self._respond(request, kind)
+
+    def summary(self) -> Dict:
+        return {"requests": self.requests, "faults": None if self.faults is None else dict(self.faults.counts)}
+
+class CassetteBackend(Backend):
+    """다른 백엔드 앞에서 호출을 카세트에 녹화하거나 카세트에서 재생 (cassette.py 참고)
+
+    재생한 응답도 리더의 파싱, 사용량 집계, 텔레메트리를 그대로 거친다.
+    """
+
+    def __init__(self, inner: Backend, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.client = inner.client
+        self.key = inner.key
+
+    def create(self, request: Dict, timeout: Optional[float] = None) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        return self.cassette.complete(request, lambda: self.inner.create(request, timeout))
+
+    def async_client(self, max_connections: Optional[int] = None):
+        # replay는 연결이 필요 없음
+        if self.cassette.mode == 'replay':
+            return _LocalSession()
+        return self.inner.async_client(max_connections)
+
+    async def acreate(self, request: Dict, client) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        return await self.cassette.acomplete(request, lambda: self.inner.acreate(request, client))
+
+    def summary(self) -> Dict:
+        return {**(self.inner.summary() or {}), "cassette": self.cassette.summary()}
+
+def default_backend(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                    timeout: float = 60.0) -> Backend:
+    """OpenAIBackend, 공용 카세트(OPENAI_CASSETTE)가 있으면 CassetteBackend로 감쌈"""
+    cassette = shared_cassette()
+    if cassette is None:
+        return OpenAIBackend(api_key, base_url, timeout)
+    if cassette.mode == 'replay' and not (api_key or os.getenv('OPENAI_API_KEY')):
+        # 재생은 API를 부르지 않으므로 키가 없어도 됨
+        api_key = 'cassette-replay'
+    return CassetteBackend(OpenAIBackend(api_key, base_url, timeout), cassette)
+
+# SDK 예외에 붙일 요청 객체
+_REQUEST = http.Request('POST', 'http://local/v1/chat/completions')
@@ -0,0 +1,61 @@
+"""
+Batch API 전체 데이터셋 평가 (야간 실행용)
+지연 시간 대신 비용/처리량을 우선해 데이터셋 전체를 Batch API로 읽히고 평가합니다.
+중간에 멈췄으면 --resume으로 같은 manifest를 이어서 기다리고 결과를 수집합니다.
+
+사용법:
+    python batch_evaluation.py --dataset dataset
+    python batch_evaluation.py --resume batches/2024-01-01_02-00-00/manifest.json
+"""
+
+import argparse
+import json
+import os
+from gpt4o_time_reader import GPT4oTimeReader
+from dataset_loader import DatasetLoader
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the whole dataset through the OpenAI Batch API')
+    parser.add_argument('--dataset', default='dataset', help='Dataset directory')
+    parser.add_argument('--samples', type=int, help='Stratified subset size (default: every sample)')
+    parser.add_argument('--seed', type=int, default=0, help='Sampling seed for --samples')
+    parser.add_argument('--prompt-file', help='Read the prompt from this file instead of the default')
+    parser.add_argument('--work-dir', help='Where to write batch files (default: batches/<timestamp>)')
+    parser.add_argument('--resume', help='Continue an earlier run from its manifest.json')
+    parser.add_argument('--poll-interval', type=float, default=60.0, help='Seconds between status checks')
+    parser.add_argument('--output', default='batch_evaluation.json', help='Where to save the evaluation')
+    args = parser.parse_args()
+
+    loader = DatasetLoader(args.dataset)
+    if not loader.exists():
+        print("Dataset not found. Please run dataset_generator.py first.")
+        return
+    samples = loader.index.subset('batch_evaluation', args.samples, args.seed) if args.samples else loader.samples
+
+    reader = GPT4oTimeReader()
+    manifest_path = args.resume
+    if manifest_path is None:
+        prompt = None
+        if args.prompt_file:
+            with open(args.prompt_file, 'r', encoding='utf-8') as f:
+                prompt = f.read()
+        manifest_path = reader.prepare_batch(loader.images(samples), prompt, args.work_dir,
+                                             reuse_duplicates=loader.deduplicated)
+    reader.submit_batch(manifest_path)
+    reader.wait_for_batch(manifest_path, args.poll_interval)
+    results = reader.collect_batch(manifest_path)
+    evaluation = reader.evaluate_results(results, samples)
+
+    print("Evaluation Results:")
+    print(f"Hour Accuracy: {evaluation['hour_accuracy']:.2%}")
+    print(f"Minute Accuracy: {evaluation['minute_accuracy']:.2%}")
+    print(f"Exact Match Accuracy: {evaluation['exact_match_accuracy']:.2%}")
+    print(f"Errors: {sum(1 for r in results if 'error' in r)}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"manifest": os.path.abspath(manifest_path), "usage": reader.usage_summary(),
+                   "evaluation": evaluation}, f, ensure_ascii=False, indent=2, default=str)
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+시계 렌더링 벤치마크
+PIL 개별 렌더링 vs NumPy 일괄 렌더링(아날로그) / 글리프 캐시(디지털, 문자) 속도와
+픽셀 일치 여부를 확인합니다.
+"""
+
+import argparse
+import tempfile
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+from dataset_generator import (ClockDatasetGenerator, FaceTemplateCache, CLOCK_STYLES, TEXT_CLOCK_STYLES,
+                               sample_augmentations, _digital_text, _word_text, _homographies, _warp, _blur,
+                               _colorize)
+
+def check_parity(generator: ClockDatasetGenerator, size: int = 256):
+    """일괄 렌더링 결과가 개별 렌더링과 픽셀 단위로 같은지 확인"""
+    hours = np.repeat(np.arange(24), 60)
+    minutes = np.tile(np.arange(60), 24)
+
+    for style in CLOCK_STYLES:
+        exact = generator.generate_analog_batch(hours, minutes, size, style, antialias=False)
+        smooth = generator.generate_analog_batch(hours, minutes, size, style, antialias=True)
+
+        mismatched = 0
+        max_smooth_diff = 0.0
+        for i, (hour, minute) in enumerate(zip(hours, minutes)):
+            reference = np.asarray(generator.generate_analog_clock(int(hour), int(minute), size, style))
+            if not np.array_equal(reference, exact[i]):
+                mismatched += 1
+            diff = np.abs(reference.astype(np.int16) - smooth[i].astype(np.int16)).mean()
+            max_smooth_diff = max(max_smooth_diff, diff)
+
+        print(f"[{style}] exact mismatches: {mismatched}/{len(hours)}, "
+              f"antialias max mean abs diff: {max_smooth_diff:.3f}")
+        assert mismatched == 0, f"batch renderer diverged from PIL for style '{style}'"
+        assert max_smooth_diff < 2.0, f"antialiased renderer drifted for style '{style}'"
+
+def _draw_text_clock(generator: ClockDatasetGenerator, clock_type: str, text: str, size: int) -> np.ndarray:
+    """캐시 없이 draw.textbbox/draw.text로 그린 기준 이미지"""
+    spec = TEXT_CLOCK_STYLES[clock_type]
+    font = generator.glyph_cache.font(spec['font'])
+    img = Image.new('RGB', (size, size), spec['background'])
+    draw = ImageDraw.Draw(img)
+    bbox = draw.textbbox((0, 0), text, font=font)
+    draw.text(((size - (bbox[2] - bbox[0])) // 2, (size - (bbox[3] - bbox[1])) // 2), text,
+              fill=spec['ink'], font=font)
+    return np.asarray(img)
+
+def _text_clock_cases():
+    """모든 (시, 분)의 디지털(24/12시간)·문자 시계 문자열"""
+    for hour in range(24):
+        for minute in range(60):
+            yield 'digital', _digital_text(hour, minute, False)
+            yield 'digital', _digital_text(hour, minute, True)
+            yield 'word', _word_text(hour, minute)
+
+def check_text_parity(generator: ClockDatasetGenerator, size: int = 256):
+    """글리프 캐시 합성 결과가 draw.text와 픽셀 단위로 같은지 확인"""
+    mismatched = 0
+    cases = list(_text_clock_cases())
+    for clock_type, text in cases:
+        cached = generator._text_batch(clock_type, [text], size)[0]
+        if not np.array_equal(cached, _draw_text_clock(generator, clock_type, text, size)):
+            mismatched += 1
+    print(f"[text] exact mismatches: {mismatched}/{len(cases)}")
+    assert mismatched == 0, "glyph cache diverged from draw.text"
+
+def benchmark_text(generator: ClockDatasetGenerator, num_images: int, size: int = 256):
+    """디지털/문자 시계 처리량 측정 (캐시 없는 draw.text vs 글리프 캐시 일괄 렌더링)"""
+    rng = np.random.default_rng(0)
+    hours = rng.integers(0, 24, num_images)
+    minutes = rng.integers(0, 60, num_images)
+    texts = [_word_text(int(hour), int(minute)) for hour, minute in zip(hours, minutes)]
+
+    start = time.perf_counter()
+    for text in texts:
+        _draw_text_clock(generator, 'word', text, size)
+    per_image = num_images / (time.perf_counter() - start)
+    print(f"PIL draw.text (word):  {per_image:10.1f} images/sec")
+
+    for clock_type, render in (('digital', generator.generate_digital_batch),
+                               ('word', generator.generate_word_batch)):
+        start = time.perf_counter()
+        render(hours, minutes, size=size)
+        batched = num_images / (time.perf_counter() - start)
+        print(f"Glyph cache ({clock_type:7s}):  {batched:10.1f} images/sec ({batched / per_image:.2f}x)")
+
+def best_rate(render, num_images: int, repeat: int = 3) -> float:
+    """render()를 repeat번 돌려 가장 빠른 images/sec (다른 프로세스 때문에 한 번 재면 들쭉날쭉함)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        best = min(best, time.perf_counter() - start)
+    return num_images / best
+
+def benchmark(generator: ClockDatasetGenerator, num_images: int, size: int = 256):
+    """개별/일괄 렌더링 처리량 측정 (images/sec, 세 번 중 가장 빠른 값)"""
+    rng = np.random.default_rng(0)
+    hours = rng.integers(0, 24, num_images)
+    minutes = rng.integers(0, 60, num_images)
+
+    # 모든 경로를 (N, H, W, 3) 텐서를 채우는 비용으로 비교
+    # 캐시 없는 기준: 빈 시계판 캐시로 매번 시계판부터 그림 (시계판 캐시 도입 전 개별 렌더링)
+    uncached_generator = ClockDatasetGenerator(generator.output_dir, face_cache=FaceTemplateCache(max_entries=0))
+    def per_image(source: ClockDatasetGenerator):
+        # 일괄 렌더링처럼 매번 새 텐서에 채움
+        out = np.empty((num_images, size, size, 3), dtype=np.uint8)
+        for i, (hour, minute) in enumerate(zip(hours, minutes)):
+            out[i] = np.asarray(source.generate_analog_clock(int(hour), int(minute), size))
+    uncached = best_rate(lambda: per_image(uncached_generator), num_images)
+    cached = best_rate(lambda: per_image(generator), num_images)
+    print(f"PIL per-image (uncached): {uncached:10.1f} images/sec")
+    print(f"PIL per-image (cached  ): {cached:10.1f} images/sec ({cached / uncached:.2f}x)")
+
+    for antialias in (False, True):
+        batched = best_rate(lambda: generator.generate_analog_batch(hours, minutes, size, antialias=antialias),
+                            num_images)
+        label = "antialias" if antialias else "exact"
+        print(f"NumPy batch ({label:9s}):  {batched:10.1f} images/sec "
+              f"({batched / uncached:.2f}x uncached, {batched / cached:.2f}x cached)")
+
+def benchmark_augmentation(generator: ClockDatasetGenerator, num_images: int, size: int = 256):
+    """증강 렌더링 처리량 측정 (images/sec, 기본 일괄 렌더링과 비교)"""
+    rng = np.random.default_rng(0)
+    hours = rng.integers(0, 24, num_images)
+    minutes = rng.integers(0, 60, num_images)
+    params = sample_augmentations(np.random.default_rng(1), num_images)
+    
+    start = time.perf_counter()
+    generator.generate_analog_batch(hours, minutes, size, antialias=False)
+    plain = num_images / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    generator.generate_augmented_batch(hours, minutes, params, size)
+    augmented = num_images / (time.perf_counter() - start)
+    
+    print(f"NumPy batch (plain    ): {plain:10.1f} images/sec")
+    print(f"NumPy batch (augmented): {augmented:10.1f} images/sec ({augmented / plain:.2f}x)")
+    
+    # 단계별 시간 (generate_augmented_batch와 같은 순서, 같은 64장 묶음)
+    stages = {'render': 0.0, 'warp': 0.0, 'blur': 0.0, 'color+noise': 0.0}
+    start = time.perf_counter()
+    gray = generator.generate_analog_batch(hours, minutes, size, antialias=True,
+                                           numerals=[tuple(p['numerals']) for p in params],
+                                           hour_widths=[p['hour_width'] for p in params],
+                                           minute_widths=[p['minute_width'] for p in params])[..., 0]
+    stages['render'] = time.perf_counter() - start
+    out = np.empty((num_images, size, size, 3), dtype=np.uint8)
+    for begin in range(0, num_images, 64):
+        chunk_params = params[begin:begin + 64]
+        start = time.perf_counter()
+        chunk = _warp(np.ascontiguousarray(gray[begin:begin + 64]),
+                      _homographies(np.array([p['rotation'] for p in chunk_params]),
+                                    np.array([p['perspective'] for p in chunk_params]), size))
+        stages['warp'] += time.perf_counter() - start
+        start = time.perf_counter()
+        _blur(chunk, np.array([p['blur'] for p in chunk_params]))
+        stages['blur'] += time.perf_counter() - start
+        start = time.perf_counter()
+        _colorize(chunk, [p['color_scheme'] for p in chunk_params], [p['noise'] for p in chunk_params],
+                  [p['noise_seed'] for p in chunk_params], out[begin:begin + 64])
+        stages['color+noise'] += time.perf_counter() - start
+    print("Augmentation stages:   " + ", ".join(f"{name} {seconds / num_images * 1000:.3f}"
+                                             for name, seconds in stages.items()) + " ms/image")
+
+def main():
+    parser = argparse.ArgumentParser(description='Clock rendering benchmark')
+    parser.add_argument('--images', type=int, default=2000, help='Number of clocks to render')
+    parser.add_argument('--size', type=int, default=256, help='Image size in pixels')
+    parser.add_argument('--skip-parity', action='store_true', help='Skip pixel parity checks')
+    parser.add_argument('--skip-augment', action='store_true', help='Skip the augmentation benchmark')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator = ClockDatasetGenerator(tmp_dir)
+
+        if not args.skip_parity:
+            print("Checking pixel parity...")
+            check_parity(generator, args.size)
+            check_text_parity(generator, args.size)
+
+        print(f"\nRendering {args.images} clocks at {args.size}x{args.size}...")
+        benchmark(generator, args.images, args.size)
+        
+        print(f"\nRendering {args.images} digital/word clocks...")
+        benchmark_text(generator, args.images, args.size)
+        
+        if not args.skip_augment:
+            print(f"\nAugmenting {args.images} clocks...")
+            benchmark_augmentation(generator, args.images, args.size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+API 호출 녹화/재생 카세트
+요청(JSON) 해시 → 응답, 토큰 사용량, 지연 시간을 JSONL 파일 하나에 기록해 두고,
+다시 실행할 때 API를 부르지 않고 메모리에서 돌려줍니다 (원래 지연 시간을 흉내 낼 수도 있음).
+리더(backends.CassetteBackend)와 최적화기(telemetry.logged_completion)가 같은 카세트를 씁니다.
+
+모드:
+    record  파일을 새로 쓰고 모든 호출을 보내 기록
+    replay  기록된 응답만 사용 (없는 요청은 CassetteMiss, API를 부르지 않음)
+    auto    기록이 있으면 재생, 없으면 보내고 기록 (기본)
+
+같은 요청을 여러 번 보냈다면 기록된 순서대로 재생하고, replay에서 다 쓰면 마지막 응답을 반복합니다.
+이미지도 요청에 포함되므로 데이터셋을 같은 --seed로 만들어야 재생됩니다.
+
+사용법:
+    OPENAI_CASSETTE=cassettes/run1.jsonl OPENAI_CASSETTE_MODE=record python main_pipeline.py --seed 0
+    OPENAI_CASSETTE=cassettes/run1.jsonl OPENAI_CASSETTE_MODE=replay python main_pipeline.py --seed 0
+    OPENAI_CASSETTE_LATENCY=1 ...    # 재생할 때 원래 지연 시간만큼 기다림 (0.5면 절반)
+    python cassette.py cassettes/run1.jsonl    # 카세트 요약
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+from openai.types.chat import ChatCompletion
+
+CASSETTE_MODES = ('record', 'replay', 'auto')
+DEFAULT_CASSETTE = os.getenv('OPENAI_CASSETTE')
+DEFAULT_CASSETTE_MODE = os.getenv('OPENAI_CASSETTE_MODE', 'auto')
+# 재생 지연 배율 (0이면 메모리 속도, 1이면 기록된 지연 시간 그대로)
+DEFAULT_REPLAY_LATENCY = float(os.getenv('OPENAI_CASSETTE_LATENCY', '0'))
+
+# 재생한 응답에 붙는 헤더 (리더가 텔레메트리에 'replayed'로 표시)
+REPLAY_HEADER = 'x-cassette'
+
+class CassetteMiss(LookupError):
+    """replay 모드에서 기록에 없는 요청 (재시도해도 소용없으므로 바로 실패)"""
+
+def request_key(request: Mapping) -> str:
+    """요청 전체(모델, 메시지, 이미지, 파라미터)의 sha256"""
+    text = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class Cassette:
+    """JSONL 카세트 (한 줄 = 기록 하나, 스레드 안전)"""
+
+    def __init__(self, path: str, mode: str = 'auto', latency_scale: float = 0.0):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode} (expected one of {CASSETTE_MODES})")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = max(0.0, latency_scale)
+        self._entries: Dict[str, List[Dict]] = {}
+        self._played: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'replayed': 0, 'recorded': 0, 'misses': 0, 'replayed_latency': 0.0}
+
+        if mode != 'record':
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+        if mode != 'replay':
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 중단된 기록의 잘린 마지막 줄
+                self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def next_entry(self, key: str) -> Optional[Dict]:
+        """이 요청에 재생할 기록 (보내야 하면 None, replay 모드에서 없으면 CassetteMiss)"""
+        with self._lock:
+            entries = self._entries.get(key, [])
+            played = self._played.get(key, 0)
+            if played < len(entries):
+                self._played[key] = played + 1
+                entry = entries[played]
+            elif self.mode == 'replay' and entries:
+                entry = entries[-1]
+            elif self.mode == 'replay':
+                self.stats['misses'] += 1
+                raise CassetteMiss(f"Request {key[:12]} is not in cassette {self.path}")
+            else:
+                return None
+            self.stats['replayed'] += 1
+            self.stats['replayed_latency'] += entry.get("latency", 0.0)
+            return entry
+
+    def record(self, key: str, request: Mapping, response: ChatCompletion, latency: float):
+        """응답 하나 추가 (이미지 데이터는 키에만 반영하고 저장하지 않음)"""
+        entry = {"key": key, "model": request.get("model"), "ts": time.time(),
+                 "latency": round(latency, 4), "response": response.model_dump(mode='json')}
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            # 녹화 중 같은 요청을 다시 보내면 새로 보내도록 재생 위치도 넘김
+            self._played[key] = len(self._entries[key])
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.stats['recorded'] += 1
+
+    def delay(self, entry: Dict) -> float:
+        return entry.get("latency", 0.0) * self.latency_scale
+
+    def complete(self, request: Mapping,
+                 send: Callable[[], Tuple[ChatCompletion, Mapping[str, str]]]) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        """재생하거나 send()로 보내고 기록 (send는 (응답, 헤더)를 돌려줌)"""
+        key = request_key(request)
+        entry = self.next_entry(key)
+        if entry is not None:
+            time.sleep(self.delay(entry))
+            return ChatCompletion.model_validate(entry["response"]), {REPLAY_HEADER: 'replay'}
+        started = time.perf_counter()
+        response, headers = send()
+        self.record(key, request, response, time.perf_counter() - started)
+        return response, headers
+
+    async def acomplete(self, request: Mapping, send) -> Tuple[ChatCompletion, Mapping[str, str]]:
+        """complete의 비동기 버전 (send는 (응답, 헤더)를 돌려주는 코루틴 함수)"""
+        key = request_key(request)
+        entry = self.next_entry(key)
+        if entry is not None:
+            if self.delay(entry):
+                await asyncio.sleep(self.delay(entry))
+            return ChatCompletion.model_validate(entry["response"]), {REPLAY_HEADER: 'replay'}
+        started = time.perf_counter()
+        response, headers = await send()
+        self.record(key, request, response, time.perf_counter() - started)
+        return response, headers
+
+    def summary(self) -> Dict:
+        """이 프로세스의 재생/기록 수, 재생으로 아낀 원래 지연 시간(초)"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self), 'mode': self.mode, 'path': self.path}
+
+# 프로세스 공용 카세트 (OPENAI_CASSETTE 또는 use_cassette로 정함)
+_ACTIVE: Dict[str, Optional[Cassette]] = {}
+_ACTIVE_LOCK = threading.Lock()
+
+def use_cassette(path: Optional[str], mode: str = DEFAULT_CASSETTE_MODE,
+                 latency_scale: float = DEFAULT_REPLAY_LATENCY) -> Optional[Cassette]:
+    """이 프로세스의 카세트를 정함 (path가 None이면 끔), 이후 만드는 리더와 최적화 호출에 적용"""
+    cassette = Cassette(path, mode, latency_scale) if path else None
+    with _ACTIVE_LOCK:
+        _ACTIVE['cassette'] = cassette
+    return cassette
+
+def shared_cassette() -> Optional[Cassette]:
+    """공용 카세트 (처음 부를 때 OPENAI_CASSETTE로 열고, 설정이 없으면 None)"""
+    with _ACTIVE_LOCK:
+        if 'cassette' not in _ACTIVE:
+            _ACTIVE['cassette'] = (Cassette(DEFAULT_CASSETTE, DEFAULT_CASSETTE_MODE, DEFAULT_REPLAY_LATENCY)
+                                   if DEFAULT_CASSETTE else None)
+        return _ACTIVE['cassette']
+
+def add_cassette_arguments(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group('cassette (record/replay API calls)')
+    group.add_argument('--cassette', default=DEFAULT_CASSETTE,
+                       help='Cassette file (default: OPENAI_CASSETTE)')
+    group.add_argument('--cassette-mode', choices=CASSETTE_MODES, default=DEFAULT_CASSETTE_MODE,
+                       help='record: call and save everything, replay: never call the API, '
+                            'auto: replay what was recorded and record the rest')
+    group.add_argument('--replay-latency', type=float, default=DEFAULT_REPLAY_LATENCY,
+                       help='Wait this fraction of the recorded latency when replaying (1 = original speed)')
+
+def cassette_from_args(args: argparse.Namespace) -> Optional[Cassette]:
+    return use_cassette(args.cassette, args.cassette_mode, args.replay_latency)
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a record/replay cassette')
+    parser.add_argument('path', nargs='?', default=DEFAULT_CASSETTE, help='Cassette file')
+    args = parser.parse_args()
+    if not args.path or not os.path.exists(args.path):
+        print(f"No cassette at {args.path}")
+        return
+
+    cassette = Cassette(args.path, 'replay')
+    entries = [entry for entries in cassette._entries.values() for entry in entries]
+    models: Dict[str, int] = {}
+    for entry in entries:
+        models[entry.get("model") or '?'] = models.get(entry.get("model") or '?', 0) + 1
+    usage = [entry["response"].get("usage") or {} for entry in entries]
+    print(f"{args.path}: {len(entries)} responses for {len(cassette._entries)} distinct requests")
+    print(f"Models: {', '.join(f'{name} {count}' for name, count in sorted(models.items()))}")
+    print(f"Tokens: {sum(u.get('prompt_tokens', 0) for u in usage)} prompt, "
+          f"{sum(u.get('completion_tokens', 0) for u in usage)} completion")
+    print(f"Recorded latency: {sum(entry.get('latency', 0.0) for entry in entries):.1f}s total")
+
+if __name__ == "__main__":
+    main()
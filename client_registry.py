@@ -0,0 +1,111 @@
+"""
+프로세스 공용 OpenAI 클라이언트
+같은 (API 키, base_url)을 쓰는 리더와 최적화기가 keep-alive 연결 풀 하나를 같이 써서
+요청마다 TCP/TLS 연결을 새로 맺지 않도록 합니다. 연결 재사용 통계도 모읍니다.
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+import openai
+
+# 연결 풀 설정 (유휴 연결을 오래 유지해 최적화 단계 사이에도 재사용)
+DEFAULT_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '64'))
+DEFAULT_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_KEEPALIVE_CONNECTIONS', '32'))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+
+# openai가 쓰는 HTTP 라이브러리와 그 Limits (openai 버전에 따라 모듈 이름이 달라 직접 import하지 않음)
+Limits = type(openai.DEFAULT_CONNECTION_LIMITS)
+http = sys.modules[Limits.__module__.split('.')[0]]
+
+def connection_limits(max_connections: Optional[int] = None) -> 'Limits':
+    max_connections = max(max_connections or DEFAULT_MAX_CONNECTIONS, 1)
+    return Limits(max_connections=max_connections,
+                  max_keepalive_connections=min(max_connections, DEFAULT_KEEPALIVE_CONNECTIONS),
+                  keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY)
+
+class ConnectionStats:
+    """요청 수와 새로 맺은 연결/TLS 핸드셰이크 수 (HTTP 연결 trace 이벤트로 셈)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def _trace(self, name: str, info: Dict):
+        if name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.connections += 1
+        elif name == 'connection.start_tls.complete':
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def _atrace(self, name: str, info: Dict):
+        self._trace(name, info)
+
+    def _on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self._trace
+
+    async def _aon_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self._atrace
+
+    def summary(self) -> Dict:
+        """재사용된 요청 = 새 연결 없이 보낸 요청"""
+        reused = max(0, self.requests - self.connections)
+        return {'requests': self.requests, 'connections': self.connections,
+                'tls_handshakes': self.tls_handshakes, 'reused': reused,
+                'reuse_rate': reused / self.requests if self.requests else 0.0}
+
+_CLIENTS: Dict[Tuple[str, str], openai.OpenAI] = {}
+_STATS: Dict[Tuple[str, str], ConnectionStats] = {}
+_LOCK = threading.Lock()
+
+def _key(api_key: Optional[str], base_url: Optional[str]) -> Tuple[str, str]:
+    return (api_key or os.getenv('OPENAI_API_KEY') or '',
+            str(base_url or os.getenv('OPENAI_BASE_URL') or '').rstrip('/'))
+
+def connection_stats(api_key: Optional[str] = None, base_url: Optional[str] = None) -> ConnectionStats:
+    """(API 키, base_url)별 연결 통계 (동기/비동기 클라이언트 합산)"""
+    key = _key(api_key, base_url)
+    with _LOCK:
+        stats = _STATS.get(key)
+        if stats is None:
+            stats = _STATS[key] = ConnectionStats()
+        return stats
+
+def shared_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                  **options) -> openai.OpenAI:
+    """(API 키, base_url)별 공용 동기 클라이언트
+
+    options(timeout, max_retries 등)를 주면 같은 연결 풀을 쓰는 복사본을 돌려준다.
+    """
+    key = _key(api_key, base_url)
+    stats = connection_stats(api_key, base_url)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            http_client = openai.DefaultHttpxClient(limits=connection_limits(),
+                                                    event_hooks={'request': [stats._on_request]})
+            client = _CLIENTS[key] = openai.OpenAI(api_key=key[0] or None, base_url=key[1] or None,
+                                                   http_client=http_client)
+    return client.with_options(**options) if options else client
+
+def async_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: Optional[int] = None, **options) -> openai.AsyncOpenAI:
+    """연결 풀을 조정한 비동기 클라이언트
+
+    비동기 연결은 이벤트 루프에 묶이므로 공유하지 않고 루프(배치)마다 만들어 닫아야 한다.
+    연결 통계는 같은 키의 공용 통계에 합산된다.
+    """
+    key = _key(api_key, base_url)
+    stats = connection_stats(api_key, base_url)
+    http_client = openai.DefaultAsyncHttpxClient(limits=connection_limits(max_connections),
+                                                 event_hooks={'request': [stats._aon_request]})
+    return openai.AsyncOpenAI(api_key=key[0] or None, base_url=key[1] or None,
+                              http_client=http_client, **options)
@@ -3,153 +3,1358 @@
 다양한 시간 표현 방식으로 시계 데이터를 생성합니다.
 """
 
+import base64
+import io
 import numpy as np
 import matplotlib.pyplot as plt
-from PIL import Image, ImageDraw
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 import json
 import os
-from typing import List, Tuple, Dict
+import queue
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Tuple, Dict, Iterator, Optional, Sequence, Union
 import random
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import partial
+from image_store import ImageStore
+
+# 샤드 하나의 샘플 수 (샤드 경계가 고정되어야 워커 수와 무관하게 같은 데이터가 나온다)
+SHARD_SIZE = 256
+
+# 아날로그 시계 스타일 (면 색, 잉크 색, 선 두께)
+CLOCK_STYLES = {
+    'classic': {
+        'face': 'white',
+        'ink': 'black',
+        'border_width': 3,
+        'hour_width': 4,
+        'minute_width': 2,
+    },
+    'dark': {
+        'face': 'black',
+        'ink': 'white',
+        'border_width': 3,
+        'hour_width': 4,
+        'minute_width': 2,
+    },
+}
+
+
+def _hand_angles(hours: np.ndarray, minutes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """시침/분침 각도(라디안) 계산"""
+    hour_angles = np.radians((hours % 12) * 30 + minutes * 0.5 - 90)
+    minute_angles = np.radians(minutes * 6 - 90)
+    return hour_angles, minute_angles
+
+
+def _hand_endpoints(angles: np.ndarray, center: int, length: float) -> Tuple[np.ndarray, np.ndarray]:
+    """바늘 끝점 좌표 (실수)"""
+    return center + length * np.cos(angles), center + length * np.sin(angles)
+
+
+# 시계판에 표시하는 숫자
+ALL_NUMERALS = (12, 3, 6, 9)
+
+
+def _render_face(size: int, style: str, numerals: Tuple[int, ...] = ALL_NUMERALS) -> Image.Image:
+    """시계 바늘을 제외한 정적 시계판 렌더링 (numerals에 있는 숫자만 표시)"""
+    spec = CLOCK_STYLES[style]
+    img = Image.new('RGB', (size, size), spec['face'])
+    draw = ImageDraw.Draw(img)
+    
+    # 원형 시계 테두리
+    center = size // 2
+    radius = center - 20
+    draw.ellipse([center-radius, center-radius, center+radius, center+radius], 
+                outline=spec['ink'], width=spec['border_width'])
+    
+    # 시간 표시 (12, 3, 6, 9)
+    for i in range(0, 12, 3):
+        angle = np.radians(i * 30 - 90)
+        x = center + (radius - 15) * np.cos(angle)
+        y = center + (radius - 15) * np.sin(angle)
+        number = 12 if i == 0 else i
+        if number not in numerals:
+            continue
+        draw.text((x-5, y-5), str(number), fill=spec['ink'])
+    
+    return img
+
+
+class FaceTemplateCache:
+    """(size, style, numerals)별 정적 시계판 템플릿 LRU 캐시"""
+    
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _entry(self, size: int, style: str, numerals: Tuple[int, ...]) -> Tuple[Image.Image, np.ndarray]:
+        key = (size, style, tuple(numerals))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        face = _render_face(size, style, numerals)
+        entry = (face, np.asarray(face))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def image(self, size: int, style: str, numerals: Tuple[int, ...] = ALL_NUMERALS) -> Image.Image:
+        """시계판 PIL 이미지 (복사본을 그려야 함)"""
+        return self._entry(size, style, numerals)[0]
+    
+    def array(self, size: int, style: str, numerals: Tuple[int, ...] = ALL_NUMERALS) -> np.ndarray:
+        """시계판 (H, W, 3) uint8 배열 (읽기 전용으로 사용)"""
+        return self._entry(size, style, numerals)[1]
+    
+    def stats(self) -> Dict:
+        """캐시 통계"""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# 프로세스 전체에서 공유하는 기본 시계판 캐시
+_FACE_CACHE = FaceTemplateCache()
+
+
+# 한글 글꼴 후보 (CLOCK_CJK_FONT 환경 변수가 있으면 먼저 사용)
+CJK_FONT_CANDIDATES = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/nanum/NanumGothic.ttf',
+    '/System/Library/Fonts/AppleSDGothicNeo.ttc',
+    '/Library/Fonts/AppleGothic.ttf',
+    'C:/Windows/Fonts/malgun.ttf',
+)
+
+# 글꼴 이름: None = PIL 기본 글꼴, 'cjk' = 한글 글꼴, 그 외 = 글꼴 파일 경로
+FontName = Optional[str]
+
+# 텍스트 시계 (배경색, 잉크 색, 글꼴)
+TEXT_CLOCK_STYLES = {
+    'digital': {'background': 'black', 'ink': 'green', 'font': None},
+    'word': {'background': 'white', 'ink': 'black', 'font': 'cjk'},
+}
+
+
+def _find_cjk_font() -> Optional[str]:
+    """설치된 한글 글꼴 경로 (없으면 None)"""
+    candidates = (os.environ.get('CLOCK_CJK_FONT'),) + CJK_FONT_CANDIDATES
+    return next((path for path in candidates if path and os.path.exists(path)), None)
+
+
+class GlyphCache:
+    """글꼴과 렌더링된 텍스트 비트맵 캐시
+    
+    글꼴은 (이름, 크기)별로 한 번만 읽고, 문자열은 (글꼴, 크기, 문자열)별로
+    알파 마스크와 bbox를, (..., 잉크, 배경)별로 배경에 합성한 RGB 조각을 LRU로 보관한다.
+    배경이 단색인 텍스트 시계는 조각을 복사하기만 하면 된다.
+    """
+    
+    def __init__(self, max_entries: int = 8192):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fonts = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def font(self, name: FontName = None, size: Optional[int] = None):
+        """글꼴 객체 (한 번만 로드, 한글 글꼴이 없으면 기본 글꼴로 대체)"""
+        key = (name, size)
+        with self._lock:
+            font = self._fonts.get(key)
+        if font is not None:
+            return font
+        
+        path = _find_cjk_font() if name == 'cjk' else name
+        if name == 'cjk' and path is None:
+            print("Warning: no CJK font found (set CLOCK_CJK_FONT); Korean text falls back to the default font")
+        if path is None:
+            font = ImageFont.load_default() if size is None else ImageFont.load_default(size)
+        else:
+            font = ImageFont.truetype(path, size or 16)
+        with self._lock:
+            self._fonts[key] = font
+        return font
+    
+    def _cached(self, key: Tuple, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        entry = build()
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def text(self, string: str, font: FontName = None,
+             size: Optional[int] = None) -> Tuple[Image.Image, Tuple[int, int, int, int]]:
+        """(알파 마스크, 원점 기준 bbox) — draw.textbbox/draw.text와 같은 결과"""
+        def build():
+            face = self.font(font, size)
+            bbox = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), string, font=face)
+            mask = Image.new('L', (max(1, bbox[2] - bbox[0]), max(1, bbox[3] - bbox[1])), 0)
+            ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), string, fill=255, font=face)
+            return mask, bbox
+        return self._cached(('text', string, font, size), build)
+    
+    def patch(self, string: str, ink: str, background: str, font: FontName = None,
+              size: Optional[int] = None) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
+        """배경색 위에 잉크로 합성한 (h, w, 3) uint8 조각과 bbox (읽기 전용으로 사용)"""
+        def build():
+            mask, bbox = self.text(string, font, size)
+            tile = Image.new('RGB', mask.size, background)
+            tile.paste(ImageColor.getrgb(ink), (0, 0), mask)
+            return np.asarray(tile), bbox
+        return self._cached(('patch', string, ink, background, font, size), build)
+    
+    def stats(self) -> Dict:
+        """캐시 통계"""
+        return {'fonts': len(self._fonts), 'entries': len(self._entries),
+                'hits': self.hits, 'misses': self.misses}
+
+
+# 프로세스 전체에서 공유하는 기본 글꼴/글리프 캐시
+_GLYPH_CACHE = GlyphCache()
+
+
+def _digital_text(hour: int, minute: int, twelve_hour: bool) -> str:
+    """디지털 시계 문자열 (24시간 또는 12시간 AM/PM 형식)"""
+    if not twelve_hour:
+        return f"{hour:02d}:{minute:02d}"
+    hour_12 = hour % 12
+    if hour_12 == 0:
+        hour_12 = 12
+    am_pm = "AM" if hour < 12 else "PM"
+    return f"{hour_12}:{minute:02d} {am_pm}"
+
+
+# 문자 시계의 시 표현 (0시와 12시는 열두시)
+HOUR_WORDS = ("열두시", "한시", "두시", "세시", "네시", "다섯시",
+              "여섯시", "일곱시", "여덟시", "아홉시", "열시", "열한시")
+
+
+def _word_text(hour: int, minute: int) -> str:
+    """문자 시계 문자열 (정각 / 반 / N분)"""
+    hour_word = HOUR_WORDS[hour % 12]
+    if minute == 0:
+        return f"{hour_word} 정각"
+    if minute == 30:
+        return f"{hour_word} 반"
+    return f"{hour_word} {minute}분"
+
+
+def _center_pixels(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """중심점 픽셀 좌표 (ys, xs)"""
+    mask = Image.new('L', (size, size), 0)
+    center = size // 2
+    ImageDraw.Draw(mask).ellipse([center-3, center-3, center+3, center+3], fill=255)
+    return np.nonzero(np.asarray(mask))
+
+
+def _round_up(values: np.ndarray) -> np.ndarray:
+    """ImageDraw의 ROUND_UP (0.5는 0에서 멀어지는 쪽으로 반올림)"""
+    return np.where(values >= 0, np.floor(values + 0.5), -np.floor(np.abs(values) + 0.5))
+
+
+def _round_down(values: np.ndarray) -> np.ndarray:
+    """ImageDraw의 ROUND_DOWN (0.5는 0 쪽으로 반올림)"""
+    return np.where(values >= 0, np.ceil(values - 0.5), -np.ceil(np.abs(values) - 0.5))
+
+
+def _polygon_row_spans(vertices: np.ndarray, row_lo: np.ndarray, rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """볼록 사각형 (B, 4, 2)의 행 row_lo[b] + [0, rows)별 좌우 경계 (B, rows) 계산
+    
+    사각형이 지나지 않는 행은 left=inf, right=-inf가 된다.
+    """
+    ys = (row_lo[:, None] + np.arange(rows)[None, :]).astype(np.float32)
+    left = np.full((len(vertices), rows), np.inf, dtype=np.float32)
+    right = np.full((len(vertices), rows), -np.inf, dtype=np.float32)
+    
+    for k in range(4):
+        x0, y0 = vertices[:, k, 0][:, None], vertices[:, k, 1][:, None]
+        x1, y1 = vertices[:, (k + 1) % 4, 0][:, None], vertices[:, (k + 1) % 4, 1][:, None]
+        flat = y0 == y1
+        slope = (np.where(flat, 0, x1 - x0).astype(np.float32)
+                 / np.where(flat, 1, y1 - y0).astype(np.float32))
+        crossing = (ys - y0).astype(np.float32) * slope + x0.astype(np.float32)
+        inside = (ys >= np.minimum(y0, y1)) & (ys <= np.maximum(y0, y1))
+        span_lo = np.where(flat, np.minimum(x0, x1), crossing)
+        span_hi = np.where(flat, np.maximum(x0, x1), crossing)
+        left = np.where(inside, np.minimum(left, span_lo), left)
+        right = np.where(inside, np.maximum(right, span_hi), right)
+    
+    return left, right
+
+
+def _span_pixels(left: np.ndarray, right: np.ndarray, row_lo: np.ndarray,
+                 size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """행 row_lo[b]부터 시작하는 정수 행 구간 [left, right]를 픽셀 좌표 (items, ys, xs)로 펼침"""
+    rows = row_lo[:, None] + np.arange(left.shape[1])[None, :]
+    filled = np.isfinite(left) & np.isfinite(right) & (rows < size)
+    left = np.clip(np.where(filled, left, 0), 0, size - 1).astype(np.int64)
+    right = np.clip(np.where(filled, right, -1), -1, size - 1).astype(np.int64)
+    lengths = np.maximum(right - left + 1, 0).ravel()
+    
+    starts = left.ravel()
+    run_ids = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return run_ids // left.shape[1], rows.ravel()[run_ids], starts[run_ids] + offsets
+
+
+def _hand_rows(vertices: np.ndarray, size: int) -> Tuple[np.ndarray, int]:
+    """바늘 사각형 (B, 4, 2)마다 bbox 첫 행 row_lo (B,)와 모든 바늘을 덮는 행 수
+    
+    행 범위를 바늘마다 bbox로 잡으므로, 가로로 누운 바늘은 몇 행만 계산한다.
+    """
+    top = np.clip(np.floor(vertices[:, :, 1].min(axis=1)), 0, size - 1).astype(np.int64)
+    bottom = np.clip(np.ceil(vertices[:, :, 1].max(axis=1)), 0, size - 1).astype(np.int64)
+    return top, int((bottom - top).max(initial=0)) + 1
+
+
+def _hand_pixels_exact(center: int, length: float, end_x: np.ndarray, end_y: np.ndarray,
+                       widths: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ImageDraw.line(width > 1)과 같은 규칙으로 바늘 픽셀 좌표 계산
+    
+    ImageDraw처럼 끝점을 정수로 자르고 선 두께를 비대칭으로 나눈
+    사각형을 만든 뒤, 행마다 반올림한 구간을 채운다.
+    """
+    x1 = np.trunc(end_x).astype(np.int64)
+    y1 = np.trunc(end_y).astype(np.int64)
+    dx = x1 - center
+    dy = y1 - center
+    hypot = np.hypot(dx, dy)
+    small = (widths - 1) / 2.0
+    ratio_max = _round_up(small) / hypot
+    ratio_min = _round_down(small) / hypot
+    dxmin = _round_down(ratio_min * dy).astype(np.int64)
+    dxmax = _round_down(ratio_max * dy).astype(np.int64)
+    dymin = _round_down(ratio_min * dx).astype(np.int64)
+    dymax = _round_down(ratio_max * dx).astype(np.int64)
+    
+    vertices = np.stack([
+        np.stack([center - dxmin, center + dymax], axis=-1),
+        np.stack([x1 - dxmin, y1 + dymax], axis=-1),
+        np.stack([x1 + dxmax, y1 - dymin], axis=-1),
+        np.stack([center + dxmax, center - dymin], axis=-1),
+    ], axis=1)
+    row_lo, rows = _hand_rows(vertices, size)
+    left, right = _polygon_row_spans(vertices, row_lo, rows)
+    filled = np.isfinite(left)
+    left = np.where(filled, _round_up(np.where(filled, left, 0)), np.inf)
+    right = np.where(filled, _round_down(np.where(filled, right, 0)), -np.inf)
+    return _span_pixels(left, right, row_lo, size)
+
+
+def _hand_pixels_smooth(center: int, angles: np.ndarray, length: float, widths: np.ndarray,
+                        size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """안티앨리어싱 바늘 픽셀 좌표와 커버리지 계산
+    
+    커버리지가 0보다 큰 영역(양 옆과 양 끝을 0.5픽셀씩 넓힌 사각형) 안에 중심이 있는
+    픽셀만 바늘 bbox 행에서 골라, 선분까지의 거리장(distance field)을 1픽셀 폭의
+    선형 램프로 커버리지로 바꾼다.
+    """
+    ux = np.cos(angles).astype(np.float32)
+    uy = np.sin(angles).astype(np.float32)
+    half = np.asarray(widths, dtype=np.float32) / 2.0
+    
+    # 후보 영역: 커버리지 램프가 끝나는 곳까지 넓힌 사각형
+    reach = (half + 0.5)[:, None]
+    start_x, start_y = center - 0.5 * ux[:, None], center - 0.5 * uy[:, None]
+    end_x, end_y = center + (length + 0.5) * ux[:, None], center + (length + 0.5) * uy[:, None]
+    nx, ny = -uy[:, None] * reach, ux[:, None] * reach
+    vertices = np.stack([
+        np.concatenate([start_x + nx, start_y + ny], axis=1),
+        np.concatenate([end_x + nx, end_y + ny], axis=1),
+        np.concatenate([end_x - nx, end_y - ny], axis=1),
+        np.concatenate([start_x - nx, start_y - ny], axis=1),
+    ], axis=1)
+    row_lo, rows = _hand_rows(vertices, size)
+    left, right = _polygon_row_spans(vertices, row_lo, rows)
+    items, ys, xs = _span_pixels(np.ceil(left), np.floor(right), row_lo, size)
+    
+    px = (xs - center).astype(np.float32)
+    py = (ys - center).astype(np.float32)
+    along = px * ux[items] + py * uy[items]
+    perp = np.abs(px * uy[items] - py * ux[items])
+    coverage = (np.clip(half[items] + 0.5 - perp, 0.0, 1.0)
+                * np.clip(along + 0.5, 0.0, 1.0)
+                * np.clip(length + 0.5 - along, 0.0, 1.0))
+    keep = coverage > 0
+    return items[keep], ys[keep], xs[keep], coverage[keep].astype(np.float32)
+
+
+# 증강용 색 구성 (면 색, 잉크 색)
+COLOR_SCHEMES = {
+    'classic': ('white', 'black'),
+    'dark': ('black', 'white'),
+    'sepia': ('#f4ecd8', '#5b4636'),
+    'blueprint': ('#1f3b73', '#e8f0ff'),
+    'mint': ('#e6f7ef', '#0b5d3b'),
+    'low-contrast': ('#c8c8c8', '#505050'),
+}
+
+# 기본 증강 범위
+DEFAULT_AUGMENTATION = {
+    'rotation': 15.0,           # 회전 각도 최대값 (±도)
+    'perspective': 0.06,        # 모서리 이동 최대값 (이미지 크기 대비)
+    'noise': 12.0,              # 가우시안 노이즈 표준편차 최대값
+    'blur': 2,                  # 블러 단계 최대값 (0이면 블러 없음)
+    'color_schemes': sorted(COLOR_SCHEMES),
+    'missing_numerals': 0.3,    # 숫자 일부를 지울 확률
+    'hour_width': (3, 6),       # 시침 두께 범위 (px, 양 끝 포함)
+    'minute_width': (2, 4),     # 분침 두께 범위
+}
+
+
+def sample_augmentations(rng: np.random.Generator, count: int,
+                         config: Optional[Dict] = None) -> List[Dict]:
+    """이미지별 증강 파라미터 생성 (메타데이터에 그대로 기록할 수 있는 형태)"""
+    config = {**DEFAULT_AUGMENTATION, **(config or {})}
+    schemes = list(config['color_schemes'])
+    
+    rotation = rng.uniform(-config['rotation'], config['rotation'], count)
+    perspective = rng.uniform(-config['perspective'], config['perspective'], (count, 4, 2))
+    noise = rng.uniform(0, config['noise'], count)
+    blur = rng.integers(0, config['blur'] + 1, count)
+    scheme = rng.integers(0, len(schemes), count)
+    drop = rng.random(count) < config['missing_numerals']
+    keep = rng.random((count, len(ALL_NUMERALS))) < 0.5
+    hour_width = rng.integers(config['hour_width'][0], config['hour_width'][1] + 1, count)
+    minute_width = rng.integers(config['minute_width'][0], config['minute_width'][1] + 1, count)
+    noise_seed = rng.integers(0, 2**31, count)
+    
+    params = []
+    for i in range(count):
+        numerals = [n for n, k in zip(ALL_NUMERALS, keep[i]) if k or not drop[i]]
+        params.append({
+            'rotation': round(float(rotation[i]), 2),
+            'perspective': np.round(perspective[i], 4).tolist(),
+            'noise': round(float(noise[i]), 2),
+            'noise_seed': int(noise_seed[i]),
+            'blur': int(blur[i]),
+            'color_scheme': schemes[scheme[i]],
+            'numerals': numerals,
+            'hour_width': int(hour_width[i]),
+            'minute_width': int(minute_width[i]),
+        })
+    return params
+
+
+def _homographies(rotation: np.ndarray, perspective: np.ndarray, size: int) -> np.ndarray:
+    """출력 좌표 → 입력 좌표 투영 행렬 (N, 3, 3)
+    
+    원본 네 모서리를 중심 기준으로 회전한 뒤 모서리를 흔든 위치로 보내는 변환의 역변환.
+    """
+    count = len(rotation)
+    corners = np.array([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]], dtype=np.float64)
+    center = (size - 1) / 2.0
+    theta = np.radians(rotation)[:, None]
+    rel = corners[None] - center
+    moved = np.stack([rel[..., 0] * np.cos(theta) - rel[..., 1] * np.sin(theta),
+                      rel[..., 0] * np.sin(theta) + rel[..., 1] * np.cos(theta)], axis=-1)
+    moved = moved + center + perspective * size
+    
+    # moved(출력) → corners(입력) 4점 대응으로 8개 미지수 풀기
+    a = np.zeros((count, 8, 8))
+    b = np.zeros((count, 8))
+    for k in range(4):
+        x, y = moved[:, k, 0], moved[:, k, 1]
+        u, v = corners[k]
+        a[:, 2 * k] = np.stack([x, y, np.ones(count), np.zeros(count), np.zeros(count),
+                                np.zeros(count), -u * x, -u * y], axis=-1)
+        a[:, 2 * k + 1] = np.stack([np.zeros(count), np.zeros(count), np.zeros(count), x, y,
+                                    np.ones(count), -v * x, -v * y], axis=-1)
+        b[:, 2 * k] = u
+        b[:, 2 * k + 1] = v
+    h = np.linalg.solve(a, b[..., None])[..., 0]
+    return np.concatenate([h, np.ones((count, 1))], axis=1).reshape(count, 3, 3)
+
+
+# 투영 변환에서 건너뛸지 판단하는 출력 타일 크기 (잉크 판정이 8바이트 단위라 8의 배수)
+WARP_TILE = 8
+
+
+def _source_coords(m: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+                   width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """출력 좌표 (xs, ys)의 입력 위치 (1픽셀 테두리 포함 좌표 [0, W+1]로 자름)"""
+    inv = 1.0 / (m[:, 2, 0] * xs + m[:, 2, 1] * ys + m[:, 2, 2])
+    px = (m[:, 0, 0] * xs + m[:, 0, 1] * ys + m[:, 0, 2]) * inv
+    px += 1
+    np.clip(px, 0, width + 1, out=px)
+    py = (m[:, 1, 0] * xs + m[:, 1, 1] * ys + m[:, 1, 2]) * inv
+    py += 1
+    np.clip(py, 0, height + 1, out=py)
+    return px, py
+
+
+def _tile_span(p: np.ndarray, limit: int, tile: int) -> Tuple[np.ndarray, np.ndarray]:
+    """격자점 입력 좌표 (N, R+1, C+1) → 타일마다 bilinear가 읽는 입력 타일 범위 [lo, hi)"""
+    lo = np.minimum(np.minimum(p[:, :-1, :-1], p[:, :-1, 1:]), np.minimum(p[:, 1:, :-1], p[:, 1:, 1:]))
+    hi = np.maximum(np.maximum(p[:, :-1, :-1], p[:, :-1, 1:]), np.maximum(p[:, 1:, :-1], p[:, 1:, 1:]))
+    # 테두리 좌표 p는 입력 픽셀 floor(p) - 1과 floor(p)를 읽는다
+    lo = np.clip(lo.astype(np.int32) - 1, 0, limit - 1) // tile
+    hi = np.clip(hi.astype(np.int32), 0, limit - 1) // tile + 1
+    return lo, hi
+
+
+def _warp(gray: np.ndarray, matrices: np.ndarray, fill: int = 255, tile: int = WARP_TILE) -> np.ndarray:
+    """(N, H, W) 밝기 이미지를 투영 행렬로 bilinear 샘플링 (범위 밖은 fill)
+    
+    시계 면은 대부분 fill이라 출력 타일이 읽는 입력 범위에 잉크가 없으면 그 타일은 fill 그대로다.
+    투영 변환은 볼록 사각형을 볼록 사각형으로 보내므로 타일 격자점만 변환해 입력 bbox를 구하고,
+    입력 타일 잉크 누적합으로 bbox 안에 잉크가 있는 타일만 골라 스택 전체를 한 번에 모은다
+    (고른 타일의 결과는 전체를 샘플링한 것과 픽셀 단위로 같다).
+    fill 1픽셀 테두리를 두르고 좌표를 테두리 안으로 자르면 범위 검사 없이
+    네 이웃을 take로 모을 수 있다. 큰 임시 배열을 줄이려고 가능한 곳은 제자리 연산을 쓴다.
+    """
+    count, height, width = gray.shape
+    rows, cols = -(-height // tile), -(-width // tile)
+    padded = np.full((count, rows * tile + 2, cols * tile + 2), fill, dtype=np.uint8)
+    padded[:, 1:height + 1, 1:width + 1] = gray
+    m = matrices.astype(np.float32)
+    
+    # 입력 타일별 잉크 여부의 2차원 누적합 (타일 한 줄 8픽셀을 uint64 하나로 보고 OR)
+    words = (padded[:, 1:-1, 1:-1] != fill).view(np.uint64).reshape(count, rows, tile, cols, tile // 8)
+    ink = np.zeros((count, rows + 1, cols + 1), dtype=np.int32)
+    ink[:, 1:, 1:] = np.bitwise_or.reduce(words, axis=2).any(axis=-1)
+    ink = ink.cumsum(axis=1).cumsum(axis=2)
+    
+    # 출력 타일 격자점 → 타일마다 읽는 입력 타일 범위 → 잉크가 있는 타일만
+    grid = np.arange(max(rows, cols) + 1, dtype=np.float32) * tile
+    px, py = _source_coords(m[:, :, :, None, None], grid[None, None, :cols + 1], grid[None, :rows + 1, None],
+                            width, height)
+    x_lo, x_hi = _tile_span(px, width, tile)
+    y_lo, y_hi = _tile_span(py, height, tile)
+    image = np.arange(count)[:, None, None]
+    found = ink[image, y_hi, x_hi] - ink[image, y_lo, x_hi] - ink[image, y_hi, x_lo] + ink[image, y_lo, x_lo]
+    items, tile_y, tile_x = np.nonzero(found)
+    
+    out = np.full((count, rows * tile, cols * tile), fill, dtype=np.uint8)
+    if len(items) == 0:
+        return np.ascontiguousarray(out[:, :height, :width])
+    
+    steps = np.arange(tile, dtype=np.float32)
+    xs = (tile_x * tile).astype(np.float32)[:, None, None] + steps[None, None, :]
+    ys = (tile_y * tile).astype(np.float32)[:, None, None] + steps[None, :, None]
+    px, py = _source_coords(m[items][:, :, :, None, None], xs, ys, width, height)
+    
+    # 왼쪽/위 이웃 위치와 비율
+    x0 = np.minimum(px.astype(np.int32), width)
+    y0 = np.minimum(py.astype(np.int32), height)
+    px -= x0
+    py -= y0
+    
+    stride = cols * tile + 2
+    index = y0 * stride
+    index += x0
+    index += (items.astype(np.int32) * ((rows * tile + 2) * stride))[:, None, None]
+    flat = padded.ravel()
+    top = flat.take(index).astype(np.float32)
+    index += 1
+    top_right = flat.take(index).astype(np.float32)
+    index += stride
+    bottom_right = flat.take(index).astype(np.float32)
+    index -= 1
+    bottom = flat.take(index).astype(np.float32)
+    
+    top_right -= top
+    top_right *= px
+    top += top_right
+    bottom_right -= bottom
+    bottom_right *= px
+    bottom += bottom_right
+    bottom -= top
+    bottom *= py
+    top += bottom
+    top += 0.5
+    # (N, R, tile, C, tile) 뷰로 골라 둔 타일 자리에 흩어 넣음
+    out.reshape(count, rows, tile, cols, tile)[items, tile_y, :, tile_x, :] = top.astype(np.uint8)
+    return np.ascontiguousarray(out[:, :height, :width])
+
+
+def _blur(gray: np.ndarray, steps: np.ndarray) -> np.ndarray:
+    """[1, 2, 1] 이항 필터를 이미지별 steps번 가로/세로로 적용 (제자리)"""
+    for step in range(1, int(steps.max(initial=0)) + 1):
+        mask = steps >= step
+        work = gray[mask].astype(np.uint16)
+        
+        # 세로 방향 (가장자리는 복제)
+        blurred = work * 2
+        blurred[:, 1:] += work[:, :-1]
+        blurred[:, 0] += work[:, 0]
+        blurred[:, :-1] += work[:, 1:]
+        blurred[:, -1] += work[:, -1]
+        work = (blurred + 2) >> 2
+        
+        # 가로 방향
+        blurred = work * 2
+        blurred[:, :, 1:] += work[:, :, :-1]
+        blurred[:, :, 0] += work[:, :, 0]
+        blurred[:, :, :-1] += work[:, :, 1:]
+        blurred[:, :, -1] += work[:, :, -1]
+        gray[mask] = ((blurred + 2) >> 2).astype(np.uint8)
+    return gray
+
+
+# 크기별 고정 노이즈 필드 (이미지마다 noise_seed로 정한 위치를 잘라 씀)
+_NOISE_BANKS = {}
+
+# 색 구성별 (밝기, 노이즈) → RGB 표 (노이즈는 더한 뒤 자르므로 ±255 밖은 ±255와 같다)
+NOISE_RANGE = 255
+_COLOR_TABLES = {}
+
+
+def _noise_bank(height: int, width: int) -> np.ndarray:
+    key = (height, width)
+    if key not in _NOISE_BANKS:
+        _NOISE_BANKS[key] = np.random.default_rng(0).standard_normal((2 * height, 2 * width),
+                                                                      dtype=np.float32)
+    return _NOISE_BANKS[key]
+
+
+def _color_table(scheme: str) -> np.ndarray:
+    """밝기 g, 정수 노이즈 n → clip(LUT[g] + n) 표 ((256 * 511, 3) uint8, 행 = g * 511 + n + 255)"""
+    if scheme not in _COLOR_TABLES:
+        face, ink = (np.array(ImageColor.getrgb(c), dtype=np.float32) for c in COLOR_SCHEMES[scheme])
+        levels = np.linspace(0.0, 1.0, 256, dtype=np.float32)[:, None]
+        # 밝기 0 → 잉크, 255 → 면
+        lut = np.rint(ink + (face - ink) * levels).astype(np.int16)
+        noise = np.arange(-NOISE_RANGE, NOISE_RANGE + 1, dtype=np.int16)
+        table = np.clip(lut[:, None, :] + noise[None, :, None], 0, 255).astype(np.uint8)
+        _COLOR_TABLES[scheme] = table.reshape(-1, 3)
+    return _COLOR_TABLES[scheme]
+
+
+def _colorize(gray: np.ndarray, schemes: Sequence[str], sigmas: Sequence[float], seeds: Sequence[int],
+              out: np.ndarray) -> np.ndarray:
+    """밝기 (N, H, W)를 색 구성별로 칠하고 밝기 가우시안 노이즈를 더해 out (N, H, W, 3)에 씀
+    
+    매번 난수를 뽑지 않고 고정 노이즈 필드에서 noise_seed로 정한 창을 잘라 쓰므로
+    배치 구성과 무관하게 같은 노이즈가 재현된다. 노이즈를 내림한 정수로 만들면
+    정수 픽셀에 더하고 자르는 일이 표 한 번 찾기가 되므로, 이미지마다 take 한 번으로
+    색 입히기와 노이즈를 같이 끝낸다 (세 채널을 따로 계산하지 않음).
+    """
+    height, width = gray.shape[1:3]
+    bank = _noise_bank(height, width)
+    index = np.empty((height, width), dtype=np.int32)
+    for image, target, scheme, sigma, seed in zip(gray, out, schemes, sigmas, seeds):
+        np.multiply(image, 2 * NOISE_RANGE + 1, out=index, dtype=np.int32)
+        index += NOISE_RANGE
+        if sigma > 0:
+            top, left = seed % height, (seed // height) % width
+            noise = np.floor(bank[top:top + height, left:left + width] * np.float32(sigma))
+            np.clip(noise, -NOISE_RANGE, NOISE_RANGE, out=noise)
+            index += noise.astype(np.int32)
+        _color_table(scheme).take(index, axis=0, out=target)
+    return out
+
 
 class ClockDatasetGenerator:
-    def __init__(self, output_dir: str = "dataset"):
+    def __init__(self, output_dir: str = "dataset", face_cache: Optional[FaceTemplateCache] = None,
+                 glyph_cache: Optional[GlyphCache] = None):
         self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+        self.face_cache = face_cache or _FACE_CACHE
+        self.glyph_cache = glyph_cache or _GLYPH_CACHE
         
-    def generate_analog_clock(self, hour: int, minute: int, size: int = 256) -> Image.Image:
-        """아날로그 시계 이미지 생성"""
-        img = Image.new('RGB', (size, size), 'white')
+    def generate_analog_clock(self, hour: int, minute: int, size: int = 256,
+                              style: str = 'classic') -> Image.Image:
+        """아날로그 시계 이미지 생성 (캐시된 시계판 위에 바늘만 그림)"""
+        spec = CLOCK_STYLES[style]
+        img = self.face_cache.image(size, style).copy()
         draw = ImageDraw.Draw(img)
         
-        # 원형 시계 테두리
         center = size // 2
         radius = center - 20
-        draw.ellipse([center-radius, center-radius, center+radius, center+radius], 
-                    outline='black', width=3)
-        
-        # 시간 표시 (12, 3, 6, 9)
-        for i in range(0, 12, 3):
-            angle = np.radians(i * 30 - 90)
-            x = center + (radius - 15) * np.cos(angle)
-            y = center + (radius - 15) * np.sin(angle)
-            number = 12 if i == 0 else i
-            draw.text((x-5, y-5), str(number), fill='black')
         
         # 시침 (짧고 굵음)
         hour_angle = np.radians((hour % 12) * 30 + minute * 0.5 - 90)
         hour_length = radius * 0.5
         hour_x = center + hour_length * np.cos(hour_angle)
         hour_y = center + hour_length * np.sin(hour_angle)
-        draw.line([center, center, hour_x, hour_y], fill='black', width=4)
+        draw.line([center, center, hour_x, hour_y], fill=spec['ink'], width=spec['hour_width'])
         
         # 분침 (길고 얇음)
         minute_angle = np.radians(minute * 6 - 90)
         minute_length = radius * 0.8
         minute_x = center + minute_length * np.cos(minute_angle)
         minute_y = center + minute_length * np.sin(minute_angle)
-        draw.line([center, center, minute_x, minute_y], fill='black', width=2)
+        draw.line([center, center, minute_x, minute_y], fill=spec['ink'], width=spec['minute_width'])
         
         # 중심점
-        draw.ellipse([center-3, center-3, center+3, center+3], fill='black')
+        draw.ellipse([center-3, center-3, center+3, center+3], fill=spec['ink'])
         
         return img
     
-    def generate_digital_clock(self, hour: int, minute: int, size: int = 256) -> Image.Image:
-        """디지털 시계 이미지 생성"""
-        img = Image.new('RGB', (size, size), 'black')
-        draw = ImageDraw.Draw(img)
+    def generate_analog_batch(self, hours: Sequence[int], minutes: Sequence[int],
+                              size: int = 256,
+                              styles: Union[str, Sequence[str]] = 'classic',
+                              antialias: bool = True,
+                              chunk_size: int = 256,
+                              numerals: Optional[Sequence[Tuple[int, ...]]] = None,
+                              hour_widths: Optional[Sequence[float]] = None,
+                              minute_widths: Optional[Sequence[float]] = None) -> np.ndarray:
+        """아날로그 시계 이미지 일괄 생성 → (N, size, size, 3) uint8
         
-        # 시간 텍스트 (24시간 형식과 12시간 형식 랜덤)
-        if random.choice([True, False]):
-            time_str = f"{hour:02d}:{minute:02d}"
-        else:
-            hour_12 = hour % 12
-            if hour_12 == 0:
-                hour_12 = 12
-            am_pm = "AM" if hour < 12 else "PM"
-            time_str = f"{hour_12}:{minute:02d} {am_pm}"
+        정적 시계판은 스타일별로 한 번만 그리고, 바늘은 모든 이미지를
+        한 번에 래스터화한다. antialias=True면 거리장 기반 부드러운 선,
+        False면 generate_analog_clock과 같은 픽셀을 만든다.
+        numerals/hour_widths/minute_widths로 이미지별 표시 숫자와 바늘 두께를 바꿀 수 있다.
+        """
+        hours = np.asarray(hours, dtype=np.int64)
+        minutes = np.asarray(minutes, dtype=np.int64)
+        if hours.shape != minutes.shape or hours.ndim != 1:
+            raise ValueError("hours and minutes must be 1-D arrays of equal length")
         
-        # 텍스트 크기 계산
-        bbox = draw.textbbox((0, 0), time_str)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+        count = len(hours)
+        if isinstance(styles, str):
+            styles = [styles] * count
+        if len(styles) != count:
+            raise ValueError("styles must match the number of clocks")
+        if numerals is None:
+            numerals = [ALL_NUMERALS] * count
         
-        # 중앙에 텍스트 배치
-        x = (size - text_width) // 2
-        y = (size - text_height) // 2
+        # (스타일, 숫자)별 시계판과 스타일별 색상/두께 테이블
+        face_keys = sorted(set(zip(styles, map(tuple, numerals))))
+        key_index = {key: k for k, key in enumerate(face_keys)}
+        style_index = np.array([key_index[key] for key in zip(styles, map(tuple, numerals))], dtype=np.int64)
+        faces = np.stack([self.face_cache.array(size, style, keep) for style, keep in face_keys])
+        inks = np.array([ImageColor.getrgb(CLOCK_STYLES[s]['ink']) for s in styles], dtype=np.uint8)
+        if hour_widths is None:
+            hour_widths = [CLOCK_STYLES[s]['hour_width'] for s in styles]
+        if minute_widths is None:
+            minute_widths = [CLOCK_STYLES[s]['minute_width'] for s in styles]
+        hour_widths = np.asarray(hour_widths, dtype=np.float32)
+        minute_widths = np.asarray(minute_widths, dtype=np.float32)
+        
+        center = size // 2
+        radius = center - 20
+        dot_ys, dot_xs = _center_pixels(size)
+        hour_angles, minute_angles = _hand_angles(hours, minutes)
+        out = np.empty((count, size, size, 3), dtype=np.uint8)
         
-        draw.text((x, y), time_str, fill='green')
+        # 시계판을 복사한 뒤 바늘이 지나는 픽셀만 덮어쓴다
+        for start in range(0, count, chunk_size):
+            stop = min(start + chunk_size, count)
+            idx = style_index[start:stop]
+            chunk = out[start:stop]
+            for k in range(len(face_keys)):
+                chunk[idx == k] = faces[k]
+            ink = inks[start:stop]
+            
+            hands = [(hour_angles[start:stop], radius * 0.5, hour_widths[start:stop]),
+                     (minute_angles[start:stop], radius * 0.8, minute_widths[start:stop])]
+            for angles, length, widths in hands:
+                if antialias:
+                    items, ys, xs, coverage = _hand_pixels_smooth(center, angles, length, widths, size)
+                    # 세 인덱스 대신 (픽셀, 3) 뷰의 평탄 인덱스 하나로 모으고 씀
+                    flat = (items * size + ys) * size + xs
+                    pixels = chunk.reshape(-1, 3)
+                    base = pixels.take(flat, axis=0).astype(np.float32)
+                    blended = base + (ink.take(items, axis=0).astype(np.float32) - base) * coverage[:, None]
+                    pixels[flat] = np.rint(blended).astype(np.uint8)
+                else:
+                    end_x, end_y = _hand_endpoints(angles, center, length)
+                    items, ys, xs = _hand_pixels_exact(center, length, end_x, end_y, widths, size)
+                    chunk[items, ys, xs] = ink[items]
+            
+            # 중심점
+            chunk[:, dot_ys, dot_xs] = ink[:, None, :]
         
-        return img
+        return out
+    
+    def generate_augmented_batch(self, hours: Sequence[int], minutes: Sequence[int],
+                                 params: Sequence[Dict], size: int = 256,
+                                 chunk_size: int = 64) -> np.ndarray:
+        """증강된 아날로그 시계 일괄 생성 → (N, size, size, 3) uint8
+        
+        params는 sample_augmentations 형식. 숫자/바늘 두께는 렌더링 단계에서,
+        회전/원근 → 블러 → 색 구성 → 노이즈는 NumPy 스택 전체에 한 번에 적용한다.
+        
+        기본 일괄 렌더링과 같은 속도가 아니다: 256px, 단일 CPU에서 증강 약 450장/초,
+        기본 generate_analog_batch 약 10,000장/초 (0.03-0.05x). 이미지마다 다른 투영 변환의
+        픽셀별 bilinear 샘플링(약 1.3ms/장)과 색/노이즈(약 0.5ms/장)가 대부분이다
+        (단계별 시간은 benchmark_rendering.py).
+        """
+        count = len(params)
+        # 흰 면/검은 잉크로 그린 밝기 채널에서 변형한 뒤 마지막에 색을 입힌다
+        gray = self.generate_analog_batch(hours, minutes, size, 'classic', antialias=True,
+                                          numerals=[tuple(p['numerals']) for p in params],
+                                          hour_widths=[p['hour_width'] for p in params],
+                                          minute_widths=[p['minute_width'] for p in params])[..., 0]
+        out = np.empty((count, size, size, 3), dtype=np.uint8)
+        
+        for start in range(0, count, chunk_size):
+            chunk_params = params[start:start + chunk_size]
+            chunk = np.ascontiguousarray(gray[start:start + chunk_size])
+            
+            rotation = np.array([p['rotation'] for p in chunk_params])
+            perspective = np.array([p['perspective'] for p in chunk_params])
+            if np.any(rotation) or np.any(perspective):
+                chunk = _warp(chunk, _homographies(rotation, perspective, size))
+            _blur(chunk, np.array([p['blur'] for p in chunk_params]))
+            
+            _colorize(chunk, [p['color_scheme'] for p in chunk_params], [p['noise'] for p in chunk_params],
+                      [p['noise_seed'] for p in chunk_params], out[start:start + chunk_size])
+        
+        return out
+    
+    def _place_text(self, clock_type: str, text: str, out: np.ndarray):
+        """배경이 칠해진 out 중앙에 캐시된 텍스트 조각 복사"""
+        spec = TEXT_CLOCK_STYLES[clock_type]
+        tile, bbox = self.glyph_cache.patch(text, spec['ink'], spec['background'], spec['font'])
+        height, width = out.shape[:2]
+        
+        # draw.text((x, y))가 bbox만큼 밀려 그리는 것과 같은 위치
+        x = (width - (bbox[2] - bbox[0])) // 2 + bbox[0]
+        y = (height - (bbox[3] - bbox[1])) // 2 + bbox[1]
+        top, left = max(y, 0), max(x, 0)
+        bottom, right = min(y + tile.shape[0], height), min(x + tile.shape[1], width)
+        if bottom > top and right > left:
+            out[top:bottom, left:right] = tile[top - y:bottom - y, left - x:right - x]
+    
+    def _text_batch(self, clock_type: str, texts: Sequence[str], size: int) -> np.ndarray:
+        """단색 배경을 한 번에 칠하고 텍스트 조각만 복사 → (N, size, size, 3) uint8"""
+        # (r, g, b) 브로드캐스트보다 배경 한 장을 복사하는 편이 훨씬 빠르다
+        background = np.empty((size, size, 3), dtype=np.uint8)
+        background[:] = ImageColor.getrgb(TEXT_CLOCK_STYLES[clock_type]['background'])
+        out = np.empty((len(texts), size, size, 3), dtype=np.uint8)
+        out[:] = background
+        for image, text in zip(out, texts):
+            self._place_text(clock_type, text, image)
+        return out
+    
+    def generate_digital_clock(self, hour: int, minute: int, size: int = 256) -> Image.Image:
+        """디지털 시계 이미지 생성 (24시간 형식과 12시간 형식 랜덤)"""
+        text = _digital_text(hour, minute, random.choice([False, True]))
+        return Image.fromarray(self._text_batch('digital', [text], size)[0])
+    
+    def generate_digital_batch(self, hours: Sequence[int], minutes: Sequence[int],
+                               twelve_hour: Union[bool, Sequence[bool]] = False,
+                               size: int = 256) -> np.ndarray:
+        """디지털 시계 일괄 생성 → (N, size, size, 3) uint8 (twelve_hour는 항목별 지정 가능)"""
+        twelve_hour = np.broadcast_to(np.asarray(twelve_hour, dtype=bool), (len(hours),))
+        texts = [_digital_text(int(h), int(m), bool(t)) for h, m, t in zip(hours, minutes, twelve_hour)]
+        return self._text_batch('digital', texts, size)
     
     def generate_word_clock(self, hour: int, minute: int, size: int = 256) -> Image.Image:
-        """문자로 된 시계 이미지 생성"""
-        img = Image.new('RGB', (size, size), 'white')
-        draw = ImageDraw.Draw(img)
+        """문자로 된 시계 이미지 생성 (한글 글꼴 사용)"""
+        return Image.fromarray(self._text_batch('word', [_word_text(hour, minute)], size)[0])
+    
+    def generate_word_batch(self, hours: Sequence[int], minutes: Sequence[int],
+                            size: int = 256) -> np.ndarray:
+        """문자 시계 일괄 생성 → (N, size, size, 3) uint8"""
+        return self._text_batch('word', [_word_text(int(h), int(m)) for h, m in zip(hours, minutes)], size)
+    
+    def generate_dataset(self, num_samples: int = 1000, num_workers: int = 1,
+                         seed: Optional[int] = None, dedupe: bool = False,
+                         resume: bool = False, payloads: bool = False,
+                         augment: Union[bool, Dict, None] = None,
+                         clock_type: str = 'analog') -> List[Dict]:
+        """데이터셋 생성 (clock_type: 'analog' / 'digital' / 'word')
+        
+        샘플 범위를 SHARD_SIZE 단위 샤드로 나누고 샤드마다 (seed, 샤드 번호)로
+        난수를 만들기 때문에, 같은 seed면 num_workers와 관계없이 같은 데이터셋이 생성된다.
+        dedupe=True면 이미지를 ImageStore에 콘텐츠 해시로 한 번만 저장하고,
+        메타데이터 filename이 공유 blob을 가리킨다 (13:05와 01:05는 같은 이미지).
+        
+        resume=True면 이미지를 저장할 때마다 샤드별 JSONL 저널에 한 줄씩 추가하고,
+        다시 실행하면 저널에 있는 샘플은 건너뛴다. seed는 generation.json에 기록되므로
+        중단된 생성을 이어 가거나 더 큰 num_samples로 기존 데이터셋을 늘릴 수 있다.
+        
+        payloads=True면 PNG 옆에 요청에 바로 넣을 data URL(`<filename>.b64`)을 함께 저장하고
+        메타데이터 'payload'에 경로를 기록한다. DatasetLoader는 이 payload를 그대로 돌려주므로
+        평가 때마다 파일을 다시 읽고 base64로 인코딩하지 않는다.
         
-        # 시간을 문자로 변환
-        hour_words = {
-            1: "한시", 2: "두시", 3: "세시", 4: "네시", 5: "다섯시", 6: "여섯시",
-            7: "일곱시", 8: "여덟시", 9: "아홉시", 10: "열시", 11: "열한시", 12: "열두시",
-            13: "한시", 14: "두시", 15: "세시", 16: "네시", 17: "다섯시", 18: "여섯시",
-            19: "일곱시", 20: "여덟시", 21: "아홉시", 22: "열시", 23: "열한시", 0: "열두시"
-        }
-        
-        if minute == 0:
-            time_text = f"{hour_words[hour]} 정각"
-        elif minute == 30:
-            time_text = f"{hour_words[hour]} 반"
+        augment=True(기본 범위) 또는 DEFAULT_AUGMENTATION 형식 dict면 회전/원근/노이즈/블러/
+        색 구성/숫자 누락/바늘 두께를 적용하고 파라미터를 메타데이터 'augmentation'에 기록한다.
+        
+        digital/word 시계는 GlyphCache의 텍스트 조각을 복사해 만들므로 아날로그와 같은 속도로 생성된다.
+        """
+        augment = _augment_config(augment)
+        if augment is not None and dedupe:
+            raise ValueError("augment cannot be combined with dedupe (augmented images are unique)")
+        _check_clock_type(clock_type, augment, dedupe)
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        settings = {'dedupe': dedupe, 'payloads': payloads, 'augment': augment, 'clock_type': clock_type}
+        if resume:
+            seed = _load_generation_manifest(self.output_dir, seed, settings)
         else:
-            time_text = f"{hour_words[hour]} {minute}분"
+            # 이전 실행의 저널은 이번에 덮어쓰는 파일과 맞지 않으므로 지우고 설정을 새로 기록
+            shutil.rmtree(os.path.join(self.output_dir, JOURNAL_DIR), ignore_errors=True)
+            if seed is None:
+                seed = random.randrange(2**32)
+            _write_generation_manifest(self.output_dir, seed, settings)
+        shard_fn = (_generate_shard_deduped if dedupe
+                    else partial(_generate_shard, augment=augment, clock_type=clock_type))
         
-        # 텍스트 중앙 배치
-        bbox = draw.textbbox((0, 0), time_text)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        x = (size - text_width) // 2
-        y = (size - text_height) // 2
+        shards = [(shard_index, shard_index * SHARD_SIZE, min((shard_index + 1) * SHARD_SIZE, num_samples))
+                  for shard_index in range((num_samples + SHARD_SIZE - 1) // SHARD_SIZE)]
+        shard_rows = {}
         
-        draw.text((x, y), time_text, fill='black')
+        # 저널에 기록된 샘플은 다시 만들지 않음
+        existing = {}
+        journals = {}
+        if resume:
+            for shard_index, start, stop in shards:
+                journals[shard_index] = _journal_path(self.output_dir, shard_index)
+                existing[shard_index] = {i: row for i, row in _read_journal(journals[shard_index]).items()
+                                         if start <= i < stop
+                                         and all(os.path.exists(os.path.join(self.output_dir, row[key]))
+                                                 for key in ('filename', 'payload') if key in row)}
+        skipped = sum(len(rows) for rows in existing.values())
+        if skipped:
+            print(f"Resuming: {skipped}/{num_samples} samples already generated")
         
-        return img
-    
-    def generate_dataset(self, num_samples: int = 1000) -> List[Dict]:
-        """데이터셋 생성 (아날로그 시계만)"""
-        dataset = []
+        def shard_args(shard_index, start, stop):
+            done = sorted(existing.get(shard_index, {}))
+            return (self.output_dir, seed, shard_index, start, stop, journals.get(shard_index), done, payloads)
         
-        for i in range(num_samples):
-            # 랜덤 시간 생성
-            hour = random.randint(0, 23)
-            minute = random.randint(0, 59)
-            
-            # 아날로그 시계만 생성
-            clock_type = 'analog'
-            img = self.generate_analog_clock(hour, minute)
-            
-            # 이미지 저장
-            filename = f"clock_{i:04d}_{clock_type}.png"
-            filepath = os.path.join(self.output_dir, filename)
-            img.save(filepath)
-            
-            # 메타데이터 저장
-            dataset.append({
-                'filename': filename,
-                'clock_type': clock_type,
-                'hour': hour,
-                'minute': minute,
-                'time_string': f"{hour:02d}:{minute:02d}"
-            })
-            
-            if (i + 1) % 100 == 0:
-                print(f"Generated {i + 1}/{num_samples} samples")
+        def merge(shard_index, start, stop, rows):
+            done = existing.get(shard_index, {})
+            new_rows = iter(rows)
+            shard_rows[shard_index] = [done[i] if i in done else next(new_rows) for i in range(start, stop)]
+        
+        todo = []
+        for shard in shards:
+            if len(existing.get(shard[0], {})) < shard[2] - shard[1]:
+                todo.append(shard)
+            else:
+                merge(*shard, [])
+        generated = skipped
+        
+        if num_workers <= 1:
+            for shard in todo:
+                rows = shard_fn(*shard_args(*shard))
+                merge(*shard, rows)
+                generated += len(rows)
+                print(f"Generated {generated}/{num_samples} samples")
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as pool:
+                futures = {pool.submit(shard_fn, *shard_args(*shard)): shard for shard in todo}
+                for future in as_completed(futures):
+                    rows = future.result()
+                    merge(*futures[future], rows)
+                    generated += len(rows)
+                    print(f"Generated {generated}/{num_samples} samples")
+        
+        # 샤드별 메타데이터를 순서대로 병합
+        dataset = [row for shard_index in sorted(shard_rows) for row in shard_rows[shard_index]]
         
         # 메타데이터 JSON 파일로 저장
         with open(os.path.join(self.output_dir, 'metadata.json'), 'w', encoding='utf-8') as f:
             json.dump(dataset, f, ensure_ascii=False, indent=2)
         
+        # 같은 디렉터리의 이전 packed 데이터셋은 로더가 먼저 읽으므로 지움
+        from packed_dataset import remove_packed_dataset
+        if remove_packed_dataset(self.output_dir):
+            print(f"Removed stale packed dataset in {self.output_dir}")
+        
+        if dedupe:
+            stats = ImageStore(self.output_dir).stats()
+            print(f"Stored {stats['blobs']} unique images ({stats['bytes'] / 1024:.1f} KB) "
+                  f"for {len(dataset)} samples")
+        
         return dataset
+    
+    def iter_samples(self, num_samples: Optional[int] = None, seed: Optional[int] = None,
+                     as_array: bool = False, prefetch: int = 4,
+                     batch_size: int = 64,
+                     augment: Union[bool, Dict, None] = None,
+                     clock_type: str = 'analog') -> Iterator[Tuple[Union[bytes, np.ndarray], Dict]]:
+        """디스크를 거치지 않고 (이미지, 메타데이터)를 하나씩 생성
+        
+        generate_dataset과 같은 seed면 같은 순서로 같은 샘플이 나온다.
+        백그라운드 스레드가 batch_size 단위로 렌더링(및 PNG 인코딩)해 최대 prefetch개
+        배치만 미리 만들어 두므로 메모리 사용량이 일정하다. num_samples=None이면 끝없이 생성한다.
+        augment와 clock_type은 generate_dataset과 같다.
+        """
+        if seed is None:
+            seed = random.randrange(2**32)
+        augment = _augment_config(augment)
+        _check_clock_type(clock_type, augment)
+        
+        batches = queue.Queue(maxsize=max(1, prefetch))
+        stop = threading.Event()
+        done = object()
+        
+        def produce():
+            try:
+                index = 0
+                while not stop.is_set() and (num_samples is None or index < num_samples):
+                    shard_index = index // SHARD_SIZE
+                    hours, minutes = _shard_times(seed, shard_index)
+                    offset = index - shard_index * SHARD_SIZE
+                    count = min(batch_size, SHARD_SIZE - offset)
+                    if num_samples is not None:
+                        count = min(count, num_samples - index)
+                    
+                    batch_hours = hours[offset:offset + count]
+                    batch_minutes = minutes[offset:offset + count]
+                    rows = [_sample_metadata(index + i, int(hour), int(minute), clock_type)
+                            for i, (hour, minute) in enumerate(zip(batch_hours, batch_minutes))]
+                    params = None
+                    if augment is not None:
+                        params = _shard_augmentations(seed, shard_index, augment)[offset:offset + count]
+                        for row, param in zip(rows, params):
+                            row['augmentation'] = param
+                    images = _render_batch(self, batch_hours, batch_minutes, clock_type,
+                                           _shard_formats(seed, shard_index)[offset:offset + count], params)
+                    payloads = list(images) if as_array else [_encode_png(image) for image in images]
+                    
+                    # 소비자가 멈추면 stop 이벤트를 확인하며 대기
+                    while not stop.is_set():
+                        try:
+                            batches.put(list(zip(payloads, rows)), timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    index += count
+                batches.put(done)
+            except Exception as e:
+                batches.put(e)
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                yield from batch
+        finally:
+            stop.set()
+            # 생산자가 put에서 막히지 않도록 남은 배치를 비움
+            while producer.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def generate_packed_dataset(self, num_samples: int = 1000, seed: Optional[int] = None,
+                                shard_size: int = 65536, with_tensor: bool = False,
+                                augment: Union[bool, Dict, None] = None,
+                                clock_type: str = 'analog') -> List[Dict]:
+        """작은 PNG 파일 대신 packed 샤드 형식으로 데이터셋 생성 (packed_dataset.py 참고)
+
+        같은 seed의 generate_dataset과 샘플 순서와 내용이 같다.
+        with_tensor=True면 원본 uint8 텐서 샤드도 함께 기록한다.
+        """
+        from packed_dataset import PackedDatasetWriter
+
+        print(f"Generating {num_samples} packed clock samples...")
+        dataset = []
+        with PackedDatasetWriter(self.output_dir, shard_size, with_tensor) as writer:
+            for payload, row in self.iter_samples(num_samples, seed, as_array=with_tensor, augment=augment,
+                                                    clock_type=clock_type):
+                if with_tensor:
+                    writer.add(_encode_png(payload), row, payload)
+                else:
+                    writer.add(payload, row)
+                dataset.append(row)
+
+                if len(dataset) % 100 == 0:
+                    print(f"Generated {len(dataset)}/{num_samples} samples")
+
+        print(f"Packed dataset saved to {self.output_dir} ({len(writer.shards)} shards)")
+        return dataset
+
+
+def _shard_times(seed: int, shard_index: int) -> Tuple[np.ndarray, np.ndarray]:
+    """샤드의 (시, 분) 배열 생성
+    
+    항상 SHARD_SIZE개를 뽑아 두므로 마지막 샤드가 잘려도 앞쪽 값은 변하지 않는다.
+    """
+    rng = np.random.default_rng([seed, shard_index])
+    hours = rng.integers(0, 24, SHARD_SIZE)
+    minutes = rng.integers(0, 60, SHARD_SIZE)
+    return hours, minutes
+
+
+def _shard_formats(seed: int, shard_index: int) -> np.ndarray:
+    """샤드의 디지털 시계 12시간 형식 여부 (항상 SHARD_SIZE개)"""
+    return np.random.default_rng([seed, shard_index, 2]).random(SHARD_SIZE) < 0.5
+
+
+def _check_clock_type(clock_type: str, augment: Optional[Dict] = None, dedupe: bool = False):
+    if clock_type != 'analog' and clock_type not in TEXT_CLOCK_STYLES:
+        raise ValueError(f"Unknown clock type: {clock_type}")
+    if clock_type != 'analog' and (augment is not None or dedupe):
+        raise ValueError("augment and dedupe are only supported for analog clocks")
+
+
+def _render_batch(generator: 'ClockDatasetGenerator', hours: np.ndarray, minutes: np.ndarray,
+                  clock_type: str = 'analog', twelve_hour: Optional[np.ndarray] = None,
+                  params: Optional[List[Dict]] = None) -> np.ndarray:
+    """시계 종류에 맞는 일괄 렌더러로 (N, H, W, 3) 배열 생성"""
+    if clock_type == 'digital':
+        return generator.generate_digital_batch(hours, minutes, twelve_hour)
+    if clock_type == 'word':
+        return generator.generate_word_batch(hours, minutes)
+    if params is not None:
+        return generator.generate_augmented_batch(hours, minutes, params)
+    return generator.generate_analog_batch(hours, minutes, antialias=False)
+
+
+def _augment_config(augment: Union[bool, Dict, None]) -> Optional[Dict]:
+    """augment 인자를 전체 설정 dict(JSON 형태)로 정리 (사용 안 하면 None)"""
+    if not augment:
+        return None
+    config = {**DEFAULT_AUGMENTATION, **(augment if isinstance(augment, dict) else {})}
+    return json.loads(json.dumps(config))
+
+
+def _shard_augmentations(seed: int, shard_index: int, config: Dict) -> List[Dict]:
+    """샤드의 증강 파라미터 (_shard_times처럼 항상 SHARD_SIZE개를 뽑아 앞쪽 값이 고정됨)"""
+    rng = np.random.default_rng([seed, shard_index, 1])
+    return sample_augmentations(rng, SHARD_SIZE, config)
+
+
+def _sample_metadata(index: int, hour: int, minute: int, clock_type: str = 'analog') -> Dict:
+    """샘플 메타데이터 행 생성"""
+    return {
+        'filename': f"clock_{index:04d}_{clock_type}.png",
+        'clock_type': clock_type,
+        'hour': hour,
+        'minute': minute,
+        'time_string': f"{hour:02d}:{minute:02d}"
+    }
+
+
+def _save_png(image: np.ndarray, filepath: str, payload: bool = False):
+    """이미지 배열을 PNG로 저장 (payload=True면 data URL 파일도 저장)"""
+    if not payload:
+        Image.fromarray(image).save(filepath)
+        return
+    
+    png = _encode_png(image)
+    with open(filepath, "wb") as f:
+        f.write(png)
+    _save_payload(png, filepath + PAYLOAD_SUFFIX)
+
+
+def _encode_png(image: np.ndarray) -> bytes:
+    """이미지 배열을 PNG 바이트로 인코딩"""
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# 요청용 data URL 파일 확장자 (PNG 파일명 뒤에 붙임)
+PAYLOAD_SUFFIX = '.b64'
+
+
+def _save_payload(png: bytes, filepath: str):
+    """PNG 바이트를 data URL 텍스트로 저장"""
+    with open(filepath, "wb") as f:
+        f.write(b"data:image/png;base64," + base64.b64encode(png))
+
+
+# 프로세스별 렌더링 키 (output_dir, style, hour % 12, minute) → blob 해시
+# (디렉터리를 지우고 다시 만들 수 있으므로 쓰기 전에 blob이 아직 있는지 확인)
+_BLOB_MEMO = {}
+
+
+def _generate_shard(output_dir: str, seed: int, shard_index: int, start: int, stop: int,
+                    journal_path: Optional[str] = None, done: Sequence[int] = (),
+                    payloads: bool = False, augment: Optional[Dict] = None,
+                    clock_type: str = 'analog', render_batch: int = 64) -> List[Dict]:
+    """샤드 하나 생성 (프로세스 풀 워커)
+    
+    렌더링은 일괄로 하고, PNG 인코딩/저장은 스레드에 넘겨 다음 배치 렌더링과 겹친다.
+    done에 있는 샘플은 건너뛰고, journal_path가 있으면 저장이 끝난 샘플을 순서대로 기록한다.
+    """
+    generator = ClockDatasetGenerator(output_dir)
+    hours, minutes = _shard_times(seed, shard_index)
+    offset = shard_index * SHARD_SIZE
+    done = set(done)
+    indices = [i for i in range(start, stop) if i not in done]
+    params = _shard_augmentations(seed, shard_index, augment) if augment is not None else None
+    formats = _shard_formats(seed, shard_index)
+    rows = []
+    
+    with ThreadPoolExecutor(max_workers=2) as writer, _open_journal(journal_path) as journal:
+        pending = []
+        for batch_start in range(0, len(indices), render_batch):
+            batch = np.array(indices[batch_start:batch_start + render_batch]) - offset
+            images = _render_batch(generator, hours[batch], minutes[batch], clock_type, formats[batch],
+                                   None if params is None else [params[i] for i in batch])
+            
+            for i, image in zip(batch, images):
+                row = _sample_metadata(int(i) + offset, int(hours[i]), int(minutes[i]), clock_type)
+                if params is not None:
+                    row['augmentation'] = params[i]
+                if payloads:
+                    row['payload'] = row['filename'] + PAYLOAD_SUFFIX
+                pending.append((int(i) + offset, row,
+                                writer.submit(_save_png, image, os.path.join(output_dir, row['filename']), payloads)))
+                rows.append(row)
+            
+            # 저장이 끝난 앞쪽 샘플부터 저널에 기록 (마지막 배치는 계속 렌더링과 겹침)
+            while len(pending) > render_batch:
+                _append_journal(journal, *_saved(pending.pop(0)))
+        
+        while pending:
+            _append_journal(journal, *_saved(pending.pop(0)))
+    
+    return rows
+
+
+def _generate_shard_deduped(output_dir: str, seed: int, shard_index: int, start: int, stop: int,
+                            journal_path: Optional[str] = None, done: Sequence[int] = (),
+                            payloads: bool = False, style: str = 'classic') -> List[Dict]:
+    """샤드 하나 생성 (콘텐츠 주소 저장소 사용)
+    
+    아날로그 시계 이미지는 (style, hour % 12, minute)로 결정되므로, 프로세스 안에서
+    아직 저장하지 않았거나 blob이 지워진 키만 렌더링/인코딩하고 나머지 행은 기존 blob을 가리킨다.
+    """
+    generator = ClockDatasetGenerator(output_dir)
+    store = ImageStore(output_dir)
+    hours, minutes = _shard_times(seed, shard_index)
+    offset = shard_index * SHARD_SIZE
+    done = set(done)
+    indices = [i for i in range(start, stop) if i not in done]
+    
+    keys = [(os.path.abspath(output_dir), style, int(hours[i - offset]) % 12, int(minutes[i - offset]))
+            for i in indices]
+    missing = sorted({key for key in keys if key not in _BLOB_MEMO or not store.contains(_BLOB_MEMO[key])})
+    if missing:
+        images = generator.generate_analog_batch([key[2] for key in missing], [key[3] for key in missing],
+                                                 styles=style, antialias=False)
+        for key, image in zip(missing, images):
+            _BLOB_MEMO[key] = store.put(_encode_png(image))
+    
+    if payloads:
+        for digest in {_BLOB_MEMO[key] for key in keys}:
+            if not os.path.exists(store.path(digest) + PAYLOAD_SUFFIX):
+                _save_payload(store.get(digest), store.path(digest) + PAYLOAD_SUFFIX)
+    
+    rows = []
+    with _open_journal(journal_path) as journal:
+        for i, key in zip(indices, keys):
+            digest = _BLOB_MEMO[key]
+            row = _sample_metadata(i, int(hours[i - offset]), int(minutes[i - offset]))
+            row['filename'] = store.relative_path(digest)
+            row['blob'] = digest
+            if payloads:
+                row['payload'] = row['filename'] + PAYLOAD_SUFFIX
+            _append_journal(journal, i, row)
+            rows.append(row)
+    
+    return rows
+
+
+GENERATION_MANIFEST = 'generation.json'
+JOURNAL_DIR = 'journal'
+
+# 예전 generation.json에 없는 설정의 기본값
+_GENERATION_DEFAULTS = {'dedupe': False, 'payloads': False, 'augment': None, 'clock_type': 'analog'}
+
+
+def _load_generation_manifest(output_dir: str, seed: Optional[int], settings: Dict) -> int:
+    """이어 쓰기용 생성 설정을 읽거나 새로 기록하고 사용할 seed 반환"""
+    path = os.path.join(output_dir, GENERATION_MANIFEST)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if seed is not None and seed != manifest['seed']:
+            raise ValueError(f"Dataset in {output_dir} was generated with seed {manifest['seed']}, not {seed}")
+        if (manifest['shard_size'] != SHARD_SIZE
+                or any(manifest.get(key, _GENERATION_DEFAULTS[key]) != value for key, value in settings.items())):
+            raise ValueError(f"Dataset in {output_dir} was generated with different settings: {manifest}")
+        return manifest['seed']
+    
+    if seed is None:
+        seed = random.randrange(2**32)
+    _write_generation_manifest(output_dir, seed, settings)
+    return seed
+
+
+def _write_generation_manifest(output_dir: str, seed: int, settings: Dict):
+    with open(os.path.join(output_dir, GENERATION_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({'seed': seed, **settings, 'shard_size': SHARD_SIZE}, f, indent=2)
+
+
+def _journal_path(output_dir: str, shard_index: int) -> str:
+    return os.path.join(output_dir, JOURNAL_DIR, f"shard-{shard_index:05d}.jsonl")
+
+
+def _read_journal(path: str) -> Dict[int, Dict]:
+    """샤드 저널 읽기 (중간에 끊긴 마지막 줄은 잘라 낸다)"""
+    if not os.path.exists(path):
+        return {}
+    
+    with open(path, 'rb+') as f:
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            f.truncate(complete)
+    
+    entries = {}
+    for line in data[:complete].splitlines():
+        entry = json.loads(line)
+        entries[entry.pop('index')] = entry
+    return entries
+
+
+def _open_journal(path: Optional[str]):
+    if path is None:
+        return nullcontext()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, 'a', encoding='utf-8')
+
+
+def _append_journal(journal, index: int, row: Dict):
+    """저장이 끝난 샘플 한 줄 기록 (프로세스가 죽어도 남도록 바로 flush)"""
+    if journal is None:
+        return
+    journal.write(json.dumps({'index': index, **row}, ensure_ascii=False) + '\n')
+    journal.flush()
+
+
+def _saved(entry: Tuple[int, Dict, object]) -> Tuple[int, Dict]:
+    """PNG 저장 완료를 기다린 뒤 (index, row) 반환"""
+    index, row, future = entry
+    future.result()
+    return index, row
+
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate the clock dataset')
+    parser.add_argument('--samples', type=int, default=500, help='Number of clock images to generate')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes (0 = one per CPU)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip samples already in the dataset journal (continue or extend a previous run)')
+    args = parser.parse_args()
+
     generator = ClockDatasetGenerator()
-    dataset = generator.generate_dataset(500)  # 500개 샘플 생성
+    dataset = generator.generate_dataset(args.samples, num_workers=args.workers or os.cpu_count() or 1,
+                                         resume=args.resume)  # 기본 500개 샘플 생성
     print(f"Dataset generated with {len(dataset)} samples")
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+데이터셋 메타데이터 인덱스
+시/분/사분면/스타일/시계 종류별로 샘플 위치를 묶어 두고,
+seed 기반 층화 비복원 샘플링과 고정 부분집합을 제공합니다.
+"""
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+# 기본 층: 시침 사분면(0-3) × 분침 사분면(0-3) = 16칸
+DEFAULT_STRATA = ('quadrant', 'minute_quadrant')
+
+# np.random.default_rng에 넘기는 seed (정수 또는 [seed, 반복 번호, ...])
+Seed = Optional[Union[int, Sequence[int]]]
+
+def _style(sample: Dict) -> str:
+    """샘플 스타일 (증강 색 구성 → style → classic)"""
+    return sample.get('augmentation', {}).get('color_scheme', sample.get('style', 'classic'))
+
+class DatasetIndex:
+    """메타데이터 목록 위의 층화 샘플링 인덱스 (원본 목록은 바꾸지 않음)"""
+
+    def __init__(self, samples: Sequence[Dict], positions: Optional[np.ndarray] = None,
+                 columns: Optional[Dict[str, np.ndarray]] = None):
+        self._all = samples
+        self.positions = np.arange(len(samples)) if positions is None else positions
+
+        if columns is None:
+            hours = np.array([s['hour'] for s in samples], dtype=np.int16)
+            minutes = np.array([s['minute'] for s in samples], dtype=np.int16)
+            _, styles = np.unique([_style(s) for s in samples], return_inverse=True)
+            _, clock_types = np.unique([s.get('clock_type', 'analog') for s in samples], return_inverse=True)
+            columns = {
+                'hour': hours,
+                'hour12': hours % 12,
+                'minute': minutes,
+                'quadrant': (hours % 12) // 3,
+                'minute_quadrant': minutes // 15,
+                'style': styles,
+                'clock_type': clock_types,
+            }
+        self._columns = columns
+        self._groups = {}
+        self._subsets = {}
+        self._lookup = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self._all[p] for p in self.positions)
+
+    def __getitem__(self, i: int) -> Dict:
+        return self._all[self.positions[i]]
+
+    @property
+    def samples(self) -> List[Dict]:
+        return [self._all[p] for p in self.positions]
+
+    def _take(self, local: np.ndarray) -> 'DatasetIndex':
+        """로컬 위치 배열로 하위 인덱스 생성 (열은 다시 계산하지 않음)"""
+        return DatasetIndex(self._all, self.positions[local], self._columns)
+
+    def groups(self, by: Sequence[str] = DEFAULT_STRATA) -> Dict[Tuple, np.ndarray]:
+        """층 키 → 로컬 위치 배열"""
+        by = tuple(by)
+        if by not in self._groups:
+            if len(self) == 0:
+                self._groups[by] = {}
+            else:
+                keys = np.stack([self._columns[name][self.positions] for name in by], axis=1)
+                unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+                order = np.argsort(inverse.ravel(), kind='stable')
+                bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(unique)))[:-1]
+                self._groups[by] = {tuple(int(v) for v in key): members
+                                    for key, members in zip(unique, np.split(order, bounds))}
+        return self._groups[by]
+
+    def select(self, **conditions: Union[int, Sequence[int]]) -> 'DatasetIndex':
+        """조건에 맞는 샘플만 담은 하위 인덱스 (예: select(hour12=3, minute_quadrant=[0, 1]))"""
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            column = self._columns[name][self.positions]
+            mask &= np.isin(column, np.atleast_1d(value))
+        return self._take(np.nonzero(mask)[0])
+
+    def _allocate(self, sizes: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+        """k개를 층마다 최대한 고르게 배분 (작은 층이 차면 남은 층에 나눔)"""
+        alloc = np.zeros(len(sizes), dtype=np.int64)
+        remaining = min(k, int(sizes.sum()))
+        while remaining > 0:
+            open_strata = np.nonzero(alloc < sizes)[0]
+            share = remaining // len(open_strata)
+            if share == 0:
+                # 나머지는 무작위 층에 하나씩
+                alloc[rng.choice(open_strata, remaining, replace=False)] += 1
+                break
+            added = np.minimum(share, sizes[open_strata] - alloc[open_strata])
+            alloc[open_strata] += added
+            remaining -= int(added.sum())
+        return alloc
+
+    def sample(self, k: int, seed: Seed = 0, by: Sequence[str] = DEFAULT_STRATA) -> List[Dict]:
+        """층화 비복원 샘플링 (같은 seed면 같은 결과, 층 수 + k에 비례하는 비용)"""
+        return self.sample_index(k, seed, by).samples
+
+    def sample_index(self, k: int, seed: Seed = 0,
+                     by: Sequence[str] = DEFAULT_STRATA) -> 'DatasetIndex':
+        """sample과 같지만 하위 인덱스로 반환"""
+        rng = np.random.default_rng(seed)
+        groups = list(self.groups(by).values())
+        if not groups:
+            return self._take(np.array([], dtype=np.int64))
+
+        alloc = self._allocate(np.array([len(g) for g in groups]), k, rng)
+        # 층 안 위치에서 바로 뽑기 (큰 층에서 적게 뽑을 때 numpy가 층 크기만큼 섞지 않음)
+        chosen = [rng.choice(members, n, replace=False)
+                  for members, n in zip(groups, alloc) if n > 0]
+        return self._take(rng.permutation(np.concatenate(chosen)))
+
+    def subset(self, name: str, k: int, seed: Seed = 0, by: Sequence[str] = DEFAULT_STRATA) -> List[Dict]:
+        """이름 붙은 고정 부분집합 (한 번 뽑으면 재사용, 프롬프트끼리 같은 샘플로 비교)"""
+        key = (name, k, str(seed), tuple(by))
+        if key not in self._subsets:
+            self._subsets[key] = self.sample(k, seed, by)
+        return self._subsets[key]
+
+    def split(self, train_fraction: float = 0.7, seed: Seed = 0,
+              by: Sequence[str] = DEFAULT_STRATA) -> Tuple['DatasetIndex', 'DatasetIndex']:
+        """층마다 같은 비율로 나눈 (훈련, 검증) 인덱스"""
+        rng = np.random.default_rng(seed)
+        train, val = [], []
+        for members in self.groups(by).values():
+            shuffled = rng.permutation(members)
+            cut = int(round(len(members) * train_fraction))
+            train.append(shuffled[:cut])
+            val.append(shuffled[cut:])
+
+        empty = np.array([], dtype=np.int64)
+        train = rng.permutation(np.concatenate(train)) if train else empty
+        val = rng.permutation(np.concatenate(val)) if val else empty
+        return self._take(train), self._take(val)
+
+    def _positions_of(self, samples: Sequence[Dict]) -> np.ndarray:
+        """샘플 dict → 원본 목록 위치 (이 인덱스의 원본에 없는 샘플은 건너뜀)"""
+        if isinstance(samples, DatasetIndex) and samples._all is self._all:
+            return samples.positions
+        if self._lookup is None:
+            self._lookup = {id(s): p for p, s in enumerate(self._all)}
+        found = (self._lookup.get(id(s)) for s in samples)
+        return np.array([p for p in found if p is not None], dtype=np.int64)
+
+    def coverage(self, samples: Sequence[Dict], by: Sequence[str] = DEFAULT_STRATA) -> float:
+        """샘플이 채운 층 비율 (0.0-1.0, 층 키는 이 인덱스의 열 코드로 계산)"""
+        strata = self.groups(by)
+        if not strata:
+            return 0.0
+        positions = self._positions_of(samples)
+        if len(positions) == 0:
+            return 0.0
+        keys = np.stack([self._columns[name][positions] for name in by], axis=1)
+        covered = {tuple(int(v) for v in key) for key in np.unique(keys, axis=0)}
+        return len(covered & set(strata)) / len(strata)
+
+def as_index(data: Union[Sequence[Dict], DatasetIndex]) -> DatasetIndex:
+    """목록이면 인덱스로 감싸고 인덱스면 그대로 반환"""
+    return data if isinstance(data, DatasetIndex) else DatasetIndex(data)
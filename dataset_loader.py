@@ -0,0 +1,103 @@
+"""
+데이터셋 로더
+PNG 디렉터리(metadata.json)와 packed 샤드 형식을 같은 방식으로 읽습니다.
+os.path.join("dataset", filename) + json.load 대신 사용합니다.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Union
+from packed_dataset import PackedDataset, is_packed_dataset
+from dataset_index import DatasetIndex
+from image_cache import EncodedImageCache
+
+# 이미지 경로, 미리 인코딩된 data URL, 또는 packed 샤드 위의 PNG 바이트 (memoryview)
+ImageRef = Union[str, memoryview]
+
+class DatasetLoader:
+    """데이터셋 메타데이터와 이미지 접근 (처음 사용할 때 데이터셋을 연다)"""
+
+    def __init__(self, root: str = "dataset", payload_cache: Optional[EncodedImageCache] = None):
+        self.root = root
+        self._packed = None
+        self._samples = None
+        self._positions = None
+        # 미리 인코딩된 data URL (바이트 합으로 제한, 넘치면 오래된 것부터 다시 읽음)
+        self._payloads = payload_cache or EncodedImageCache()
+        self._index = None
+
+    def exists(self) -> bool:
+        """metadata.json 또는 packed manifest가 있는지 확인"""
+        return is_packed_dataset(self.root) or os.path.exists(os.path.join(self.root, 'metadata.json'))
+
+    @property
+    def packed(self) -> Optional[PackedDataset]:
+        if self._packed is None and is_packed_dataset(self.root):
+            self._packed = PackedDataset(self.root)
+        return self._packed
+
+    def _load_samples(self) -> List[Dict]:
+        if self._samples is None:
+            if self.packed is not None:
+                self._samples = self.packed.metadata
+            else:
+                with open(os.path.join(self.root, 'metadata.json'), 'r', encoding='utf-8') as f:
+                    self._samples = json.load(f)
+        return self._samples
+
+    @property
+    def samples(self) -> List[Dict]:
+        """샘플 메타데이터 목록 (metadata.json 형식, 섞어도 되도록 새 리스트로 반환)"""
+        return list(self._load_samples())
+
+    @property
+    def deduplicated(self) -> bool:
+        """중복 제거된 데이터셋인지 (같은 blob을 가리키는 샘플끼리 읽기 결과를 재사용해도 됨)"""
+        return any('blob' in sample for sample in self._load_samples())
+
+    @property
+    def index(self) -> DatasetIndex:
+        """층화 샘플링 인덱스 (처음 사용할 때 한 번 만듦)"""
+        if self._index is None:
+            self._index = DatasetIndex(self._load_samples())
+        return self._index
+
+    def image(self, sample: Dict) -> ImageRef:
+        """샘플 이미지
+        
+        payload가 있으면 data URL 문자열(크기 제한 LRU 캐시에 유지), PNG 디렉터리면
+        파일 경로, packed면 복사 없는 PNG 바이트를 돌려준다.
+        """
+        if 'payload' in sample:
+            return self.payload(sample['payload'])
+        if self.packed is None:
+            return os.path.join(self.root, sample['filename'])
+
+        if self._positions is None:
+            self._positions = {row['filename']: i for i, row in enumerate(self._load_samples())}
+        return self.packed.image_bytes(self._positions[sample['filename']])
+
+    def payload(self, relative_path: str) -> str:
+        """미리 인코딩된 data URL 읽기 (같은 blob을 가리키는 샘플끼리 공유)"""
+        payload = self._payloads.get(relative_path)
+        if payload is None:
+            with open(os.path.join(self.root, relative_path), 'r', encoding='ascii') as f:
+                payload = f.read()
+            self._payloads.put(relative_path, payload)
+        return payload
+
+    def images(self, samples: List[Dict]) -> List[ImageRef]:
+        return [self.image(sample) for sample in samples]
+
+    def reload(self):
+        """데이터셋을 다시 생성한 뒤 캐시된 메타데이터 비우기"""
+        if self._packed is not None:
+            self._packed.close()
+        self._packed = None
+        self._samples = None
+        self._positions = None
+        self._payloads.clear()
+        self._index = None
+
+    def __len__(self) -> int:
+        return len(self._load_samples())
@@ -9,6 +9,7 @@ import seaborn as sns
 from typing import Dict, List, Tuple
 import os
 from datetime import datetime
+from dataset_loader import DatasetLoader
 
 class SeparateEvaluationSystem:
     def __init__(self):
@@ -273,20 +274,20 @@ if __name__ == "__main__":
     evaluator = SeparateEvaluationSystem()
     
     # 샘플 데이터로 테스트
-    if os.path.exists("dataset/metadata.json"):
+    loader = DatasetLoader()
+    if loader.exists():
         from gpt4o_time_reader import GPT4oTimeReader
         
         reader = GPT4oTimeReader()
         
-        with open("dataset/metadata.json", 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        metadata = loader.samples
         
         # 처음 20개 샘플로 테스트
         test_samples = metadata[:20]
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+        image_paths = loader.images(test_samples)
         
         print("Reading times from sample images...")
-        predictions = reader.batch_read_times(image_paths)
+        predictions = reader.batch_read_times(image_paths, reuse_duplicates=loader.deduplicated)
         
         print("Evaluating results...")
         evaluation = evaluator.comprehensive_evaluation(predictions, test_samples)
@@ -2,22 +2,261 @@
 GPT-4o를 사용한 시계 시간 읽기
 """
 
+import asyncio
+import contextvars
 import openai
 import base64
 import json
 import os
-from typing import Dict, List, Tuple, Optional
+import queue
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Tuple, Optional, Union
+import numpy as np
 from PIL import Image
 import io
 from dotenv import load_dotenv
+from dataset_loader import DatasetLoader
+from image_cache import EncodedImageCache
+from openai.types.chat import ChatCompletion
+from backends import Backend, default_backend
+from cassette import REPLAY_HEADER, CassetteMiss
+from rate_limiter import shared_limiter
+from response_cache import ResponseCache, cache_key, content_hash, shared_cache
+from response_parser import packed_format, parse_reading, parse_readings, reading_format
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable, is_timeout, shared_breaker
+from telemetry import record_call
 
 load_dotenv()
 
+# 이미지 입력: 파일 경로, data URL 문자열, PNG 바이트, 또는 (H, W, 3) uint8 배열
+ImageInput = Union[str, bytes, np.ndarray]
+
+DATA_URL_PREFIX = "data:image/png;base64,"
+
+# 동시에 보내는 최대 요청 수 기본값
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '8'))
+
+# 분당 요청/토큰 한도 (없으면 응답 헤더에서 학습)
+DEFAULT_RPM = float(os.getenv('OPENAI_RPM')) if os.getenv('OPENAI_RPM') else None
+DEFAULT_TPM = float(os.getenv('OPENAI_TPM')) if os.getenv('OPENAI_TPM') else None
+
+# 429를 받고 다시 줄을 서는 최대 횟수
+MAX_RATE_LIMIT_WAITS = 20
+
+# 요청 하나의 최대 시간(초), 배치 전체 기한(초, None이면 없음)
+DEFAULT_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+DEFAULT_BATCH_DEADLINE = float(os.getenv('OPENAI_BATCH_DEADLINE')) if os.getenv('OPENAI_BATCH_DEADLINE') else None
+
+# 비전 입력 detail 수준 (None이면 요청에 넣지 않음 = API 기본값 auto)
+DETAIL_LEVELS = ('low', 'high', 'auto')
+
+# GPT-4o 이미지 토큰 계산 상수 (low는 크기와 무관하게 기본 토큰만)
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+IMAGE_TILE_SIZE = 512
+
+# 한 요청에 넣는 이미지 수 기본값 (1이면 이미지마다 요청)
+DEFAULT_PACK_SIZE = int(os.getenv('OPENAI_PACK_SIZE', '1'))
+
+# 묶음 요청 응답 토큰: 기본 + 이미지당
+PACK_BASE_MAX_TOKENS = 100
+PACK_ITEM_MAX_TOKENS = 60
+
+PACK_INSTRUCTIONS = """
+
+이번 요청에는 시계 이미지가 {count}개 있습니다. 각 이미지 앞에 "이미지 N" 번호가 붙어 있습니다.
+이미지마다 위 형식의 객체를 만들고 "index"에 이미지 번호(1-{count})를 넣어,
+{count}개 객체의 JSON 배열 하나로만 답변하세요.
+예: [{{"index": 1, "hour": 3, "minute": 15, "confidence": 0.9}}, ...]"""
+
+# JSON schema 구조화 출력 사용 여부 기본값 (지원하지 않는 백엔드는 관대한 파서로 처리)
+DEFAULT_STRUCTURED_OUTPUT = os.getenv('OPENAI_STRUCTURED_OUTPUT', '').lower() in ('1', 'true', 'yes')
+
+# 배치 작업이 동시성 제한(세마포어) 앞에 줄 선 시각 (텔레메트리의 queue_time 계산용)
+_QUEUED_AT: contextvars.ContextVar = contextvars.ContextVar('queued_at', default=None)
+
+# 요청을 보내는 단계의 실패 (전송, 상태 코드/할당량, 서킷 열림, 카세트에 없음, 타임아웃)
+# 묶음 요청이 이렇게 실패하면 한 장씩 다시 보내도 같은 이유로 실패하므로 되풀이하지 않는다
+REQUEST_ERRORS = (openai.OpenAIError, CircuitOpenError, CassetteMiss, TimeoutError)
+
+class _DeadlineExceeded(Exception):
+    """배치 전체 기한 초과 (요청 하나의 TimeoutError와 구분)"""
+
+# 배치 진행 상황 출력 간격(초)
+PROGRESS_INTERVAL = float(os.getenv('OPENAI_PROGRESS_INTERVAL', '5'))
+
+# 프로세스 전체에서 공유하는 기본 인코딩 캐시
+_ENCODED_CACHE = EncodedImageCache()
+
+# Batch API 설정 (요청/파일 크기 한도는 API 한도보다 조금 작게)
+BATCH_DIR = 'batches'
+BATCH_MANIFEST = 'manifest.json'
+BATCH_ENDPOINT = '/v1/chat/completions'
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 190 * 1024 * 1024
+BATCH_DONE = ('completed', 'failed', 'expired', 'cancelled')
+
+def _read_json(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_json(path: str, data: Dict):
+    """임시 파일에 쓰고 교체 (중간에 죽어도 manifest가 깨지지 않음)"""
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+def is_data_url(image) -> bool:
+    """이미 인코딩된 data URL 문자열인지 확인"""
+    return isinstance(image, str) and image.startswith("data:")
+
+def _image_label(i: int, image) -> str:
+    """결과에 남길 표시용 이름 (메모리 이미지는 경로 대신 번호)"""
+    if is_data_url(image):
+        return f"<encoded image {i}>"
+    if isinstance(image, str):
+        return image
+    return f"<in-memory image {i}>"
+
+def run_sync(coroutine):
+    """코루틴을 동기로 실행 (이미 이벤트 루프 안이면 별도 스레드에서 실행)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
+def png_size(png: bytes) -> Tuple[int, int]:
+    """PNG 헤더(IHDR)에서 (너비, 높이) 읽기"""
+    return int.from_bytes(png[16:20], 'big'), int.from_bytes(png[20:24], 'big')
+
+def estimate_text_tokens(text: str) -> int:
+    """텍스트 토큰 추정치 (UTF-8 3바이트당 1토큰, 한글 한 글자 ≈ 1토큰으로 넉넉하게)"""
+    return -(-len(text.encode('utf-8')) // 3)
+
+def estimate_image_tokens(width: int, height: int, detail: Optional[str] = None) -> int:
+    """이미지 한 장의 입력 토큰 추정치
+    
+    low는 85토큰 고정. high/auto는 2048 안으로 줄이고 짧은 변을 768 이하로
+    맞춘 뒤 512 타일 수 × 170 + 85 (작은 이미지는 확대하지 않음).
+    """
+    if detail == 'low':
+        return IMAGE_BASE_TOKENS
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = -(-int(width) // IMAGE_TILE_SIZE) * -(-int(height) // IMAGE_TILE_SIZE)
+    return IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+
+class BatchProgress:
+    """배치 진행 상황: interval초마다 완료 수, 처리량(이미지/초), 남은 시간 추정을 한 줄 출력"""
+    
+    def __init__(self, total: int, interval: float = PROGRESS_INTERVAL, enabled: bool = True):
+        self.total = total
+        self.interval = interval
+        self.enabled = enabled
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._last_print = self.started
+    
+    def update(self, result: Dict):
+        self.done += 1
+        if 'error' in result:
+            self.failed += 1
+        now = time.monotonic()
+        if self.enabled and now - self._last_print >= self.interval and self.done < self.total:
+            self._last_print = now
+            print(self.line(now))
+    
+    def line(self, now: Optional[float] = None) -> str:
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        text = f"Progress: {self.done}/{self.total} ({self.failed} failed), {rate:.1f} img/s"
+        if self.done < self.total and rate > 0:
+            text += f", ETA {(self.total - self.done) / rate:.0f}s"
+        return text + f", {elapsed:.1f}s elapsed"
+    
+    def finish(self):
+        if self.enabled and self.total:
+            print(self.line())
+
 class GPT4oTimeReader:
-    def __init__(self, api_key: Optional[str] = None):
-        self.client = openai.OpenAI(
-            api_key=api_key or os.getenv('OPENAI_API_KEY')
-        )
+    def __init__(self, api_key: Optional[str] = None, image_size: Optional[int] = None,
+                 detail: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rpm: Optional[float] = DEFAULT_RPM, tpm: Optional[float] = DEFAULT_TPM,
+                 timeout: float = DEFAULT_TIMEOUT, batch_deadline: Optional[float] = DEFAULT_BATCH_DEADLINE,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 cache: Union[bool, ResponseCache, None] = None,
+                 encoded_cache: Optional[EncodedImageCache] = None,
+                 base_url: Optional[str] = None,
+                 pack_size: int = DEFAULT_PACK_SIZE,
+                 structured_output: bool = DEFAULT_STRUCTURED_OUTPUT,
+                 backend: Optional[Backend] = None):
+        """image_size: 보내기 전 이 크기(정사각형 한 변)로 축소, None이면 원본 그대로
+        detail: 'low' / 'high' / 'auto' (None이면 API 기본값)
+        max_concurrency: batch_read_times가 동시에 보내는 최대 요청 수
+        rpm/tpm: 분당 요청/토큰 한도 (같은 API 키를 쓰는 리더끼리 공유, None이면 헤더에서 학습)
+        timeout: 요청 하나의 최대 시간(초), batch_deadline: batch_read_times 전체 기한(초)
+        retry_policy: 일시적 오류(5xx, 타임아웃, 연결 오류) 재시도 정책
+        circuit_breaker: 연속 실패 시 바로 실패시키는 서킷 (기본은 같은 API 키끼리 공유)
+        cache: 응답 디스크 캐시 (True/ResponseCache면 사용, None이면 TEXTGRAD_CACHE_DIR이 있을 때만)
+        encoded_cache: 파일/payload 인코딩 결과 캐시 (기본은 프로세스 공용)
+        base_url: API 주소 (기본은 OPENAI_BASE_URL 또는 OpenAI, 로컬 대역 서버 테스트용)
+        pack_size: batch_read_times가 한 요청에 넣는 이미지 수 (1이면 이미지마다 요청)
+        structured_output: response_format에 JSON schema를 넣어 형식이 맞는 응답만 받음
+        backend: chat.completions를 보낼 곳 (기본은 api_key/base_url의 OpenAIBackend,
+                 공용 카세트가 있으면 녹화/재생으로 감쌈,
+                 backends.LocalBackend면 네트워크 없이 대역 응답과 장애 주입)
+        """
+        if detail is not None and detail not in DETAIL_LEVELS:
+            raise ValueError(f"Unknown detail level: {detail} (expected one of {DETAIL_LEVELS})")
+        # 같은 키/주소의 리더와 최적화기가 연결 풀을 공유 (Batch API 파일/배치 호출은 self.client 사용)
+        self.backend = backend or default_backend(api_key, base_url, timeout)
+        self.client = self.backend.client
+        self.rate_limiter = shared_limiter(self.backend.key, rpm, tpm)
+        self.circuit_breaker = circuit_breaker or shared_breaker(self.backend.key)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeout = timeout
+        self.batch_deadline = batch_deadline
+        if cache is None:
+            cache = bool(os.getenv('TEXTGRAD_CACHE_DIR'))
+        self.cache = shared_cache() if cache is True else (cache or None)
+        self.encoded_cache = encoded_cache or _ENCODED_CACHE
+        
+        # 재시도/타임아웃 카운터 (실패한 시도에 쓴 시간과 재시도 대기 시간 포함)
+        self.reliability = {
+            "attempts": 0,
+            "retries": 0,
+            "retry_wait_seconds": 0.0,
+            "failed_attempt_seconds": 0.0,
+            "timeouts": 0,
+            "rate_limited": 0,
+            "circuit_rejections": 0,
+            "deadline_exceeded": 0,
+            "failures": 0,
+            "pack_fallbacks": 0
+        }
+        self.image_size = image_size
+        self.detail = detail
+        self.max_concurrency = max_concurrency
+        self.pack_size = max(1, pack_size)
+        self.structured_output = structured_output
+        
+        # 설정별 누적 사용량 (요청 수, 토큰, 지연 시간)
+        self.usage = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "image_tokens": 0,
+            "latency": 0.0
+        }
         
         # 기본 프롬프트
         self.base_prompt = """이 시계 이미지를 보고 정확한 시간을 읽어주세요.
@@ -35,16 +274,124 @@ class GPT4oTimeReader:
 - 시간은 24시간 형식으로 답변하세요
 - JSON 형식으로만 답변하세요"""
     
-    def encode_image(self, image_path: str) -> str:
-        """이미지를 base64로 인코딩"""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+    def _encoded(self, key, encode) -> str:
+        """encoded_cache에서 data URL을 찾고 없으면 encode()로 만들어 저장"""
+        url = self.encoded_cache.get(key)
+        if url is None:
+            url = encode()
+            self.encoded_cache.put(key, url)
+        return url
+    
+    def _file_url(self, path: str, image_size: Optional[int]) -> str:
+        """파일의 data URL (image_size가 있으면 축소), (경로, mtime, 크기)로 캐시"""
+        stat = os.stat(path)
+        
+        def encode() -> str:
+            with open(path, "rb") as image_file:
+                png = image_file.read()
+            if image_size is not None:
+                png = self.resize_image(png, image_size)
+            return DATA_URL_PREFIX + base64.b64encode(png).decode('utf-8')
+        return self._encoded(('file', path, stat.st_mtime_ns, stat.st_size, image_size), encode)
+    
+    def encode_image(self, image: ImageInput) -> str:
+        """이미지를 base64로 인코딩 (경로, data URL, PNG 바이트, 배열 모두 지원, 파일은 캐시)"""
+        if is_data_url(image):
+            return image.split(",", 1)[1]
+        if isinstance(image, str):
+            return self._file_url(image, None)[len(DATA_URL_PREFIX):]
+        if isinstance(image, np.ndarray):
+            buffer = io.BytesIO()
+            Image.fromarray(image).save(buffer, format='PNG')
+            return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return base64.b64encode(image).decode('utf-8')
+    
+    def image_bytes(self, image: ImageInput) -> bytes:
+        """이미지를 PNG 바이트로 (경로, data URL, PNG 바이트, 배열 모두 지원)"""
+        if is_data_url(image):
+            return base64.b64decode(image.split(",", 1)[1])
+        if isinstance(image, np.ndarray):
+            buffer = io.BytesIO()
+            Image.fromarray(image).save(buffer, format='PNG')
+            return buffer.getvalue()
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return bytes(image)
+        
+        with open(image, "rb") as image_file:
+            return image_file.read()
+    
+    def resize_image(self, png: bytes, image_size: Optional[int] = None) -> bytes:
+        """image_size(기본 self.image_size)보다 크면 LANCZOS로 축소한 PNG (작거나 같으면 그대로)"""
+        image_size = image_size or self.image_size
+        with Image.open(io.BytesIO(png)) as image:
+            if max(image.size) <= image_size:
+                return png
+            scale = image_size / max(image.size)
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            buffer = io.BytesIO()
+            image.convert('RGB').resize(size, Image.LANCZOS).save(buffer, format='PNG')
+            return buffer.getvalue()
+    
+    def image_url(self, image: ImageInput) -> str:
+        """요청에 넣을 data URL (미리 인코딩된 payload는 축소가 필요 없으면 그대로 사용)
+        
+        파일 경로와 축소할 payload는 encoded_cache에 저장해 같은 이미지를 다시 읽거나 인코딩하지 않는다.
+        """
+        if isinstance(image, str) and not is_data_url(image):
+            return self._file_url(image, self.image_size)
+        if self.image_size is not None:
+            def encode() -> str:
+                return DATA_URL_PREFIX + base64.b64encode(
+                    self.resize_image(self.image_bytes(image))).decode('utf-8')
+            if is_data_url(image):
+                return self._encoded(('payload', content_hash(image), self.image_size), encode)
+            return encode()
+        if is_data_url(image):
+            return image
+        return DATA_URL_PREFIX + self.encode_image(image)
+    
+    def image_tokens(self, image_url: str) -> int:
+        """data URL 이미지의 입력 토큰 추정치 (헤더 24바이트만 디코딩)"""
+        header = base64.b64decode(image_url.split(",", 1)[1][:32])
+        width, height = png_size(header)
+        return estimate_image_tokens(width, height, self.detail)
     
-    def read_time_from_image(self, image_path: str, prompt: Optional[str] = None) -> Dict:
-        """이미지에서 시간 읽기"""
-        base64_image = self.encode_image(image_path)
+    def _record_usage(self, response, image_tokens: int, latency: float) -> Dict:
+        """응답의 usage를 누적하고 결과에 붙일 사용량 dict 반환"""
+        usage = getattr(response, 'usage', None)
+        record = {
+            "prompt_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+            "completion_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+            "image_tokens": image_tokens,
+            "latency": latency
+        }
+        self.usage["requests"] += 1
+        for key, value in record.items():
+            self.usage[key] += value
+        return record
+    
+    def usage_summary(self) -> Dict:
+        """현재 설정의 요청당 평균 사용량"""
+        requests = max(1, self.usage["requests"])
+        return {
+            "image_size": self.image_size,
+            "detail": self.detail,
+            "requests": self.usage["requests"],
+            "avg_prompt_tokens": self.usage["prompt_tokens"] / requests,
+            "avg_completion_tokens": self.usage["completion_tokens"] / requests,
+            "avg_image_tokens": self.usage["image_tokens"] / requests,
+            "avg_latency": self.usage["latency"] / requests
+        }
+    
+    def _request(self, image_path: ImageInput, prompt: Optional[str] = None) -> Tuple[Dict, str]:
+        """chat.completions.create 인자와 이미지 data URL"""
+        image_url = self.image_url(image_path)
+        image_content = {"url": image_url}
+        if self.detail is not None:
+            image_content["detail"] = self.detail
         
-        response = self.client.chat.completions.create(
+        request = dict(
             model="gpt-4o",
             messages=[
                 {
@@ -56,58 +403,723 @@ class GPT4oTimeReader:
                         },
                         {
                             "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            }
+                            "image_url": image_content
                         }
                     ]
                 }
             ],
             max_tokens=300
         )
+        if self.structured_output:
+            request["response_format"] = reading_format()
+        return request, image_url
+    
+    def _parse_response(self, response, image_tokens: int, latency: float) -> Dict:
+        """응답에서 시간 읽기 (실패하면 기본값), 결과의 'usage'에 사용량 기록
         
+        설명 문장이나 코드 블록이 섞여 있어도 첫 JSON 객체를 꺼내 숫자/범위를 확인한다.
+        """
+        usage = self._record_usage(response, image_tokens, latency)
+        message = response.choices[0].message
+        result = parse_reading(message.content)
+        if result is not None:
+            result["usage"] = usage
+            return result
+        
+        # 파싱 실패시 기본값 반환
+        return {
+            "hour": -1,
+            "minute": -1,
+            "confidence": 0.0,
+            "error": "Model refused to answer" if getattr(message, 'refusal', None) else "Failed to parse response",
+            "raw_response": message.content or getattr(message, 'refusal', None),
+            "usage": usage
+        }
+    
+    def _packed_request(self, image_paths: List[ImageInput],
+                        prompt: Optional[str] = None) -> Tuple[Dict, List[str]]:
+        """이미지 여러 장을 번호를 붙여 한 메시지에 넣은 요청과 이미지 data URL 목록"""
+        count = len(image_paths)
+        content = [{"type": "text", "text": (prompt or self.base_prompt) + PACK_INSTRUCTIONS.format(count=count)}]
+        image_urls = []
+        for n, image_path in enumerate(image_paths, 1):
+            image_url = self.image_url(image_path)
+            image_content = {"url": image_url}
+            if self.detail is not None:
+                image_content["detail"] = self.detail
+            content.append({"type": "text", "text": f"이미지 {n}"})
+            content.append({"type": "image_url", "image_url": image_content})
+            image_urls.append(image_url)
+        
+        request = dict(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": content}],
+            max_tokens=PACK_BASE_MAX_TOKENS + PACK_ITEM_MAX_TOKENS * count
+        )
+        if self.structured_output:
+            request["response_format"] = packed_format()
+        return request, image_urls
+    
+    def _parse_packed(self, response, image_tokens: List[int], latency: float) -> List[Optional[Dict]]:
+        """묶음 응답의 읽기를 이미지 순서대로 (읽지 못한 이미지는 None)
+        
+        사용량은 요청 하나로 누적하고 각 결과의 'usage'에는 이미지 수로 나눈 몫과 pack_size를 남긴다.
+        """
+        count = len(image_tokens)
+        usage = self._record_usage(response, sum(image_tokens), latency)
+        results = parse_readings(response.choices[0].message.content, count)
+        for index, reading in enumerate(results):
+            if reading is None:
+                continue
+            reading["usage"] = {
+                "prompt_tokens": usage["prompt_tokens"] / count,
+                "completion_tokens": usage["completion_tokens"] / count,
+                "image_tokens": image_tokens[index],
+                "latency": latency,
+                "pack_size": count
+            }
+        return results
+    
+    def _cache_lookup(self, request: Dict, image_url: str,
+                      lookup: bool = True) -> Tuple[Optional[str], Optional[Dict]]:
+        """(캐시 키, 캐시된 결과) — 캐시를 안 쓰면 (None, None), lookup=False면 키만 (결과는 None)"""
+        if self.cache is None:
+            return None, None
+        image_content = request["messages"][0]["content"][1]["image_url"]
+        params = {
+            "model": request["model"],
+            "temperature": request.get("temperature"),
+            "max_tokens": request["max_tokens"],
+            "detail": image_content.get("detail")
+        }
+        if "response_format" in request:
+            params["response_format"] = request["response_format"]["json_schema"]["name"]
+        key = cache_key(content_hash(image_url), request["messages"][0]["content"][0]["text"], params)
+        cached = self.cache.get(key) if lookup else None
+        return key, (None if cached is None else dict(cached, cached=True))
+    
+    def _cache_store(self, key: Optional[str], result: Dict) -> Dict:
+        """파싱에 성공한 결과만 캐시에 저장"""
+        if key is not None and 'error' not in result:
+            self.cache.put(key, result)
+        return result
+    
+    def _estimate_tokens(self, request: Dict, image_url: str) -> int:
+        """한도 계산용 요청 토큰 추정치 (텍스트 + 이미지 + max_tokens)"""
+        text = request["messages"][0]["content"][0]["text"]
+        return estimate_text_tokens(text) + self.image_tokens(image_url) + request["max_tokens"]
+    
+    def _before_attempt(self, tokens: int, call: Dict) -> float:
+        """시도 전 확인: 서킷이 열렸으면 CircuitOpenError, 아니면 한도 대기 시간 반환
+
+        half_open의 시험 요청이면 call["probe"]에 번호를 남긴다 (시도가 끝나면 _after_attempt로 풂).
+        """
         try:
-            # JSON 응답 파싱 (코드 블록 제거)
-            content = response.choices[0].message.content.strip()
-            if content.startswith('```json'):
-                content = content[7:]  # ```json 제거
-            if content.endswith('```'):
-                content = content[:-3]  # ``` 제거
-            content = content.strip()
+            call["probe"] = self.circuit_breaker.allow()
+        except Exception:
+            self.reliability["circuit_rejections"] += 1
+            raise
+        self.reliability["attempts"] += 1
+        return self.rate_limiter.reserve(tokens)
+    
+    def _after_attempt(self, call: Dict):
+        """시도가 어떻게 끝났든 (429, 400, 취소 포함) 이 시도가 잡은 시험 요청을 풂"""
+        self.circuit_breaker.release(call.pop("probe", 0))
+    
+    def _failed(self, error: Exception, state: Dict, elapsed: float) -> float:
+        """실패한 시도 처리 후 다시 보내기 전 기다릴 시간 반환 (포기할 때는 error를 다시 던짐)
+        
+        429는 공용 제한기가 retry-after만큼 모두를 멈추고 다시 줄 세운다 (재시도 횟수에 안 셈).
+        5xx/타임아웃/연결 오류는 서킷에 실패로 기록하고 retry_policy대로 백오프한다.
+        그 밖의 오류(400, 인증 등)는 바로 실패 (4xx 응답은 서버에 닿았다는 뜻이므로 서킷에는 성공).
+        """
+        self.reliability["failed_attempt_seconds"] += elapsed
+        if isinstance(error, openai.RateLimitError):
+            self.reliability["rate_limited"] += 1
+            state["waits"] += 1
+            if getattr(error, 'code', None) == 'insufficient_quota' or state["waits"] > MAX_RATE_LIMIT_WAITS:
+                self.reliability["failures"] += 1
+                raise error
+            self.rate_limiter.rate_limited(error.response.headers)
+            return 0.0
+        
+        if is_timeout(error):
+            self.reliability["timeouts"] += 1
+        if is_retryable(error):
+            self.circuit_breaker.record_failure()
+        elif isinstance(error, openai.APIStatusError):
+            self.circuit_breaker.record_success()
+        if not self.retry_policy.should_retry(error, state["retries"]):
+            self.reliability["failures"] += 1
+            raise error
+        
+        delay = self.retry_policy.delay(state["retries"])
+        state["retries"] += 1
+        self.reliability["retries"] += 1
+        self.reliability["retry_wait_seconds"] += delay
+        return delay
+    
+    def _succeeded(self, headers, call: Dict) -> None:
+        self.circuit_breaker.record_success()
+        self.rate_limiter.update(headers)
+        if REPLAY_HEADER in headers:
+            call["replayed"] = True
+    
+    def read_time_from_image(self, image_path: ImageInput, prompt: Optional[str] = None) -> Dict:
+        """이미지에서 시간 읽기 (결과의 'usage'에 토큰 수와 지연 시간 기록)
+        
+        요청 전에 RPM/TPM 한도를 예약하고, 429를 받으면 실패 대신 retry-after 뒤에 다시 보낸다.
+        일시적 오류는 retry_policy대로 재시도하고, 서킷이 열려 있으면 바로 실패한다.
+        캐시를 쓰면 같은 (이미지, 프롬프트, 파라미터)는 API를 부르지 않고 'cached': True 결과를 돌려준다.
+        """
+        request, image_url = self._request(image_path, prompt)
+        call = self._new_call(request)
+        key, cached = self._cache_lookup(request, image_url)
+        if cached is not None:
+            self._log_call(call, outcome='cached')
+            return cached
+        response, latency = self._create(request, self._estimate_tokens(request, image_url), call)
+        return self._finish_single(call, key, response, self.image_tokens(image_url), latency)
+    
+    def _finish_single(self, call: Dict, key: Optional[str], response, image_tokens: int,
+                       latency: Optional[float]) -> Dict:
+        """응답 파싱, 텔레메트리 기록, 캐시 저장"""
+        result = self._parse_response(response, image_tokens, latency or 0.0)
+        self._log_call(call, response, latency, 'parse_error' if 'error' in result else 'ok')
+        return self._cache_store(key, result)
+    
+    def _new_call(self, request: Dict, images: int = 1) -> Dict:
+        """호출 하나의 텔레메트리/재시도 상태 (배치 안이면 세마포어 대기부터 queue_time으로 셈)"""
+        now = time.perf_counter()
+        queued_at = _QUEUED_AT.get()
+        return {"model": request["model"], "images": images, "started": now,
+                "queue_time": 0.0 if queued_at is None else now - queued_at,
+                "attempts": 0, "retries": 0, "waits": 0}
+    
+    def _log_call(self, call: Dict, response=None, latency: Optional[float] = None,
+                  outcome: str = 'ok', error: Optional[BaseException] = None, **extra):
+        record_call('reader', call["model"], response, time.perf_counter() - call["started"], latency,
+                    call["queue_time"], call["attempts"], call["retries"], outcome, error,
+                    images=call["images"], **({"replayed": True} if call.get("replayed") else {}), **extra)
+    
+    def _create(self, request: Dict, tokens: int, call: Dict):
+        """한도 대기, 재시도, 서킷을 거쳐 요청하고 (응답, 성공한 시도의 지연 시간) 반환"""
+        try:
+            while True:
+                delay = self._before_attempt(tokens, call)
+                try:
+                    call["attempts"] += 1
+                    call["queue_time"] += delay
+                    time.sleep(delay)
+                    started = time.perf_counter()
+                    try:
+                        response, headers = self.backend.create(request, self.timeout)
+                    except Exception as e:
+                        wait = self._failed(e, call, time.perf_counter() - started)
+                    else:
+                        self._succeeded(headers, call)
+                        return response, time.perf_counter() - started
+                finally:
+                    self._after_attempt(call)
+                time.sleep(wait)
+        except Exception as e:
+            self._log_call(call, error=e)
+            raise
+    
+    async def aread_time_from_image(self, image_path: ImageInput, prompt: Optional[str] = None,
+                                    client=None, lookup: bool = True) -> Dict:
+        """read_time_from_image의 비동기 버전 (client는 백엔드 비동기 세션, 없으면 요청마다 새로 만듦)
+        
+        lookup=False면 이미 캐시에 없다고 확인한 이미지이므로 다시 찾지 않는다 (결과 저장은 함).
+        """
+        if client is None:
+            async with self._async_client() as client:
+                return await self.aread_time_from_image(image_path, prompt, client, lookup)
+        
+        request, image_url = self._request(image_path, prompt)
+        call = self._new_call(request)
+        key, cached = self._cache_lookup(request, image_url, lookup)
+        if cached is not None:
+            self._log_call(call, outcome='cached')
+            return cached
+        response, latency = await self._acreate(request, self._estimate_tokens(request, image_url), client, call)
+        return self._finish_single(call, key, response, self.image_tokens(image_url), latency)
+    
+    async def aread_packed(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                           client=None) -> List[Optional[Dict]]:
+        """이미지 여러 장을 요청 하나로 읽기 (읽지 못한 이미지는 None, 응답 캐시는 쓰지 않음)"""
+        if client is None:
+            async with self._async_client() as client:
+                return await self.aread_packed(image_paths, prompt, client)
+        
+        request, image_urls = self._packed_request(image_paths, prompt)
+        text = request["messages"][0]["content"][0]["text"]
+        image_tokens = [self.image_tokens(image_url) for image_url in image_urls]
+        tokens = estimate_text_tokens(text) + sum(image_tokens) + request["max_tokens"]
+        call = self._new_call(request, len(image_urls))
+        response, latency = await self._acreate(request, tokens, client, call)
+        results = self._parse_packed(response, image_tokens, latency)
+        parsed = sum(1 for result in results if result is not None)
+        self._log_call(call, response, latency, 'ok' if parsed == len(results) else 'parse_error', parsed=parsed)
+        return results
+    
+    async def _acreate(self, request: Dict, tokens: int, client: openai.AsyncOpenAI, call: Dict):
+        """_create의 비동기 버전 (시도마다 timeout 기한)"""
+        try:
+            while True:
+                delay = self._before_attempt(tokens, call)
+                try:
+                    call["attempts"] += 1
+                    call["queue_time"] += delay
+                    await asyncio.sleep(delay)
+                    started = time.perf_counter()
+                    try:
+                        # 소켓이 멈춰도 timeout 안에 반드시 끝나도록 전체 요청에 기한을 건다
+                        response, headers = await asyncio.wait_for(self.backend.acreate(request, client),
+                                                                   self.timeout)
+                    except asyncio.TimeoutError:
+                        error = TimeoutError(f"Request timed out after {self.timeout:g}s")
+                        wait = self._failed(error, call, time.perf_counter() - started)
+                    except Exception as e:
+                        wait = self._failed(e, call, time.perf_counter() - started)
+                    else:
+                        self._succeeded(headers, call)
+                        return response, time.perf_counter() - started
+                finally:
+                    # 취소(배치 기한, 소비자 중단)로 끝나도 시험 요청을 풂
+                    self._after_attempt(call)
+                await asyncio.sleep(wait)
+        except Exception as e:
+            self._log_call(call, error=e)
+            raise
+    
+    def _async_client(self):
+        """백엔드의 비동기 세션 (이벤트 루프마다 새로 만들어 닫아야 함, 풀 크기는 동시 요청 수 이상)"""
+        return self.backend.async_client(self.max_concurrency)
+    
+    def reliability_summary(self) -> Dict:
+        """재시도/타임아웃 카운터, 서킷 상태, 한도 대기 통계"""
+        return {**self.reliability,
+                "circuit": self.circuit_breaker.summary(),
+                "rate_limiter": self.rate_limiter.summary(),
+                "cache": None if self.cache is None else self.cache.summary(),
+                "image_cache": self.encoded_cache.stats(),
+                "backend": self.backend.summary()}
+    
+    async def aiter_read_times(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                               reuse_duplicates: bool = False,
+                               max_concurrency: Optional[int] = None,
+                               deadline: Optional[float] = None,
+                               pack_size: Optional[int] = None,
+                               progress: bool = True) -> AsyncIterator[Tuple[int, Dict]]:
+        """여러 이미지를 동시에 최대 max_concurrency개씩 요청하고 끝나는 대로 (입력 번호, 결과) 산출
+        
+        중간에 반복을 멈추면 아직 끝나지 않은 요청은 취소된다.
+        progress=True면 PROGRESS_INTERVAL초마다 처리량과 남은 시간을 한 줄씩 출력한다.
+        실패한 항목은 batch_read_times와 같은 기본값 dict로 남고 나머지 요청은 계속된다.
+        deadline(초, 기본 batch_deadline)이 지나면 끝나지 않은 항목은 기한 초과 오류로 남는다.
+        reuse_duplicates=True면 같은 경로는 첫 요청 결과를 기다렸다가 성공했으면 재사용하고,
+        실패했으면 직접 다시 요청한다.
+        pack_size(기본 self.pack_size)가 2 이상이면 캐시에 없는 이미지를 그 수만큼 묶어
+        요청 하나로 읽고, 묶음 응답에서 읽지 못한 이미지만 한 장씩 다시 요청한다.
+        """
+        limit = asyncio.Semaphore(max(1, max_concurrency or self.max_concurrency))
+        pack_size = max(1, pack_size or self.pack_size)
+        first = {}
+        total = len(image_paths)
+        deadline = self.batch_deadline if deadline is None else deadline
+        loop = asyncio.get_running_loop()
+        end = None if deadline is None else loop.time() + deadline
+        retries, backoff = self.reliability["retries"], self.reliability["retry_wait_seconds"]
+        fallbacks = self.reliability["pack_fallbacks"]
+        reporter = BatchProgress(total, enabled=progress)
+        
+        def failure(label: str, error: str) -> Dict:
+            return {"image_path": label, "hour": -1, "minute": -1, "confidence": 0.0, "error": error}
+        
+        def expired(label: str) -> Dict:
+            self.reliability["deadline_exceeded"] += 1
+            return failure(label, f"Batch deadline of {deadline:g}s exceeded")
+        
+        async def before_deadline(coro):
+            """end가 지나면 coro를 취소하고 _DeadlineExceeded (요청 하나의 TimeoutError는 그대로 전파)"""
+            if end is None:
+                return await coro
+            if loop.time() >= end:
+                coro.close()
+                raise _DeadlineExceeded
+            task = asyncio.ensure_future(coro)
+            timed_out = []
+            
+            def cancel():
+                timed_out.append(True)
+                task.cancel()
+            
+            timer = loop.call_at(end, cancel)
+            try:
+                return await task
+            except asyncio.CancelledError:
+                if timed_out:
+                    raise _DeadlineExceeded
+                raise
+            finally:
+                timer.cancel()
+        
+        async def read(i: int, image_path: ImageInput, label: str, client, lookup: bool = True) -> Dict:
+            _QUEUED_AT.set(time.perf_counter())
+            async with limit:
+                try:
+                    result = await before_deadline(self.aread_time_from_image(image_path, prompt, client,
+                                                                              lookup=lookup))
+                    result['image_path'] = label
+                    return result
+                except _DeadlineExceeded:
+                    return expired(label)
+                except Exception as e:
+                    return failure(label, str(e))
+        
+        async def read_pack(items: List[Tuple[int, ImageInput]], client) -> List[Optional[Dict]]:
+            """묶음 결과 (읽지 못한 이미지는 None이라 한 장씩 다시 요청)
             
-            result = json.loads(content)
+            기한이 지났으면 모두 기한 초과 결과, 요청 자체가 실패했으면(REQUEST_ERRORS) 모두 그 오류 결과.
+            그 밖의 예외(요청을 만들지 못함)만 None으로 돌려 한 장씩 읽게 한다.
+            """
+            _QUEUED_AT.set(time.perf_counter())
+            async with limit:
+                try:
+                    return await before_deadline(
+                        self.aread_packed([image_path for _, image_path in items], prompt, client))
+                except _DeadlineExceeded:
+                    return [expired(_image_label(i, image_path)) for i, image_path in items]
+                except REQUEST_ERRORS as e:
+                    return [failure(_image_label(i, image_path), str(e)) for i, image_path in items]
+                except Exception:
+                    return [None] * len(items)
+        
+        async def unpack(i: int, image_path: ImageInput, label: str, client, pack, position: int) -> Dict:
+            result = (await pack)[position]
+            if result is None:
+                # 묶음에 넣었다면 캐시에 없었으므로 다시 찾지 않음
+                self.reliability["pack_fallbacks"] += 1
+                return await read(i, image_path, label, client, lookup=False)
+            result['image_path'] = label
             return result
-        except json.JSONDecodeError:
-            # JSON 파싱 실패시 기본값 반환
-            return {
-                "hour": -1,
-                "minute": -1,
-                "confidence": 0.0,
-                "error": "Failed to parse response",
-                "raw_response": response.choices[0].message.content
-            }
+        
+        def cache_hit(image_path: ImageInput) -> Optional[Dict]:
+            """응답 캐시에 있으면 그 결과 (묶기 전에 한 번만 찾고 그 결과를 그대로 씀)"""
+            if self.cache is None:
+                return None
+            request, image_url = self._request(image_path, prompt)
+            cached = self._cache_lookup(request, image_url)[1]
+            if cached is not None:
+                self._log_call(self._new_call(request), outcome='cached')
+            return cached
+        
+        async def done(result: Dict, label: str) -> Dict:
+            return dict(result, image_path=label)
+        
+        async def reuse(i: int, image_path: ImageInput, label: str, client, original) -> Dict:
+            result = await original
+            if 'error' not in result:
+                return dict(result, image_path=label)
+            return await read(i, image_path, label, client)
+        
+        async def indexed(i: int, task) -> Tuple[int, Dict]:
+            return i, await task
+        
+        async with self._async_client() as client:
+            tasks, packs = [], []
+            group = None
+            
+            async def send(group):
+                future, items = group
+                future.set_result(await read_pack(items, client))
+            
+            for i, image_path in enumerate(image_paths):
+                label = _image_label(i, image_path)
+                key = image_path if isinstance(image_path, (str, bytes)) else None
+                if reuse_duplicates and key is not None and key in first:
+                    tasks.append(asyncio.ensure_future(reuse(i, image_path, label, client, first[key])))
+                    continue
+                hit = cache_hit(image_path) if pack_size > 1 else None
+                if hit is not None:
+                    task = asyncio.ensure_future(done(hit, label))
+                elif pack_size > 1:
+                    # 묶음이 차면 한 요청으로 보내고, 항목마다 묶음 결과에서 자기 자리를 꺼낸다
+                    if group is None:
+                        group = (loop.create_future(), [])
+                    group[1].append((i, image_path))
+                    task = asyncio.ensure_future(unpack(i, image_path, label, client, group[0], len(group[1]) - 1))
+                    if len(group[1]) == pack_size:
+                        packs.append(asyncio.ensure_future(send(group)))
+                        group = None
+                else:
+                    task = asyncio.ensure_future(read(i, image_path, label, client))
+                if key is not None:
+                    first[key] = task
+                tasks.append(task)
+            if group is not None:
+                packs.append(asyncio.ensure_future(send(group)))
+            try:
+                for finished in asyncio.as_completed([indexed(i, task) for i, task in enumerate(tasks)]):
+                    i, result = await finished
+                    reporter.update(result)
+                    yield i, result
+            finally:
+                for task in tasks + packs:
+                    task.cancel()
+                await asyncio.gather(*tasks, *packs, return_exceptions=True)
+        
+        reporter.finish()
+        retries = self.reliability["retries"] - retries
+        fallbacks = self.reliability["pack_fallbacks"] - fallbacks
+        if fallbacks:
+            print(f"Packed requests: {fallbacks} images re-read one at a time")
+        if retries or reporter.failed:
+            print(f"Batch done: {reporter.failed}/{total} failed, {retries} retries "
+                  f"({self.reliability['retry_wait_seconds'] - backoff:.1f}s backoff), "
+                  f"circuit {self.circuit_breaker.state}")
     
-    def batch_read_times(self, image_paths: List[str], prompt: Optional[str] = None) -> List[Dict]:
-        """여러 이미지에서 시간 읽기"""
-        results = []
+    async def abatch_read_times(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                                reuse_duplicates: bool = False,
+                                max_concurrency: Optional[int] = None,
+                                deadline: Optional[float] = None,
+                                pack_size: Optional[int] = None,
+                                progress: bool = True) -> List[Dict]:
+        """aiter_read_times의 결과를 입력 순서대로 모은 목록"""
+        results: List[Optional[Dict]] = [None] * len(image_paths)
+        async for i, result in self.aiter_read_times(image_paths, prompt, reuse_duplicates, max_concurrency,
+                                                     deadline, pack_size, progress):
+            results[i] = result
+        return results
+    
+    def iter_read_times(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                        reuse_duplicates: bool = False,
+                        max_concurrency: Optional[int] = None,
+                        deadline: Optional[float] = None,
+                        pack_size: Optional[int] = None,
+                        progress: bool = True) -> Iterator[Tuple[int, Dict]]:
+        """aiter_read_times의 동기 제너레이터 버전 (요청은 별도 스레드의 이벤트 루프에서 진행)
         
-        for i, image_path in enumerate(image_paths):
-            print(f"Processing {i+1}/{len(image_paths)}: {image_path}")
+        결과가 나오는 대로 평가/로그/체크포인트를 할 수 있다:
+            for i, result in reader.iter_read_times(paths):
+                ...
+        """
+        items = queue.Queue()
+        running = {}
+        finished = object()
+        
+        async def pump():
+            running["loop"], running["task"] = asyncio.get_running_loop(), asyncio.current_task()
+            stream = self.aiter_read_times(image_paths, prompt, reuse_duplicates, max_concurrency,
+                                           deadline, pack_size, progress)
             try:
-                result = self.read_time_from_image(image_path, prompt)
-                result['image_path'] = image_path
-                results.append(result)
-            except Exception as e:
-                results.append({
-                    "image_path": image_path,
-                    "hour": -1,
-                    "minute": -1,
-                    "confidence": 0.0,
-                    "error": str(e)
-                })
+                async for item in stream:
+                    items.put(item)
+            finally:
+                await stream.aclose()
         
+        def run():
+            try:
+                asyncio.run(pump())
+            except asyncio.CancelledError:
+                pass
+            except BaseException as e:
+                items.put(e)
+            finally:
+                items.put(finished)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # 소비자가 중간에 멈추면 남은 요청 취소
+            if thread.is_alive() and "task" in running:
+                running["loop"].call_soon_threadsafe(running["task"].cancel)
+            thread.join()
+    
+    def batch_read_times(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                         reuse_duplicates: bool = False,
+                         max_concurrency: Optional[int] = None,
+                         deadline: Optional[float] = None,
+                         pack_size: Optional[int] = None,
+                         progress: bool = True) -> List[Dict]:
+        """여러 이미지에서 시간 읽기 (abatch_read_times의 동기 래퍼)
+        
+        reuse_duplicates=True면 같은 경로(중복 제거된 데이터셋의 같은 blob)는
+        한 번만 요청하고 성공한 결과를 재사용한다. 기본은 같은 경로도 매번 읽으며
+        (응답의 비결정성까지 평가), DatasetLoader.deduplicated인 데이터셋에서만 켠다.
+        """
+        return run_sync(self.abatch_read_times(image_paths, prompt, reuse_duplicates, max_concurrency,
+                                               deadline, pack_size, progress))
+    
+    def prepare_batch(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                      work_dir: Optional[str] = None, reuse_duplicates: bool = False) -> str:
+        """Batch API용 요청 JSONL과 manifest.json을 work_dir에 쓰고 manifest 경로 반환
+        
+        응답 캐시에 있는 이미지는 요청하지 않고, 같은 경로는 요청 하나를 같이 쓴다.
+        요청 수/파일 크기 한도를 넘으면 여러 배치 파일로 나눈다.
+        """
+        work_dir = work_dir or os.path.join(BATCH_DIR, datetime.now().strftime('%Y-%m-%d_%H-%M-%S'))
+        os.makedirs(work_dir, exist_ok=True)
+        items, batches, first = [], [], {}
+        current = None
+        
+        for i, image_path in enumerate(image_paths):
+            item = {"label": _image_label(i, image_path)}
+            items.append(item)
+            key = image_path if reuse_duplicates and isinstance(image_path, (str, bytes)) else None
+            if key is not None and key in first:
+                item["same_as"] = first[key]
+                continue
+            
+            request, image_url = self._request(image_path, prompt)
+            cache_key_, cached = self._cache_lookup(request, image_url)
+            if cached is not None:
+                item["result"] = cached
+                continue
+            if key is not None:
+                first[key] = i
+            
+            line = json.dumps({"custom_id": f"request-{i}", "method": "POST",
+                               "url": BATCH_ENDPOINT, "body": request}) + "\n"
+            if (current is None or current["requests"] >= BATCH_MAX_REQUESTS
+                    or current["bytes"] + len(line) > BATCH_MAX_BYTES):
+                if current is not None:
+                    current["file"].close()
+                current = {"input": f"requests-{len(batches):03d}.jsonl", "requests": 0, "bytes": 0}
+                current["file"] = open(os.path.join(work_dir, current["input"]), "w", encoding="utf-8")
+                batches.append(current)
+            current["file"].write(line)
+            current["requests"] += 1
+            current["bytes"] += len(line)
+            item.update(custom_id=f"request-{i}", cache_key=cache_key_, image_tokens=self.image_tokens(image_url))
+        
+        if current is not None:
+            current["file"].close()
+        manifest = {"created": datetime.now().isoformat(), "items": items,
+                    "batches": [{"input": b["input"], "requests": b["requests"]} for b in batches]}
+        path = os.path.join(work_dir, BATCH_MANIFEST)
+        _write_json(path, manifest)
+        print(f"Prepared {sum(b['requests'] for b in batches)} batch requests in {len(batches)} file(s) "
+              f"for {len(items)} images ({work_dir})")
+        return path
+    
+    def submit_batch(self, manifest_path: str) -> List[str]:
+        """아직 제출하지 않은 배치 파일을 업로드하고 배치 생성 (배치 ID를 manifest에 기록)"""
+        if self.client is None:
+            raise ValueError("The Batch API needs an OpenAI backend")
+        manifest = _read_json(manifest_path)
+        work_dir = os.path.dirname(manifest_path)
+        for batch in manifest["batches"]:
+            if batch.get("id"):
+                continue
+            with open(os.path.join(work_dir, batch["input"]), "rb") as f:
+                uploaded = self.client.files.create(file=f, purpose="batch")
+            created = self.client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT,
+                                                 completion_window="24h")
+            batch.update(id=created.id, input_file_id=uploaded.id, status=created.status)
+            _write_json(manifest_path, manifest)
+            print(f"Submitted {batch['input']} as {created.id}")
+        return [batch["id"] for batch in manifest["batches"]]
+    
+    def wait_for_batch(self, manifest_path: str, poll_interval: float = 30.0,
+                       timeout: Optional[float] = None) -> bool:
+        """모든 배치가 끝날 때까지 폴링하고 결과 파일을 work_dir에 내려받음 (timeout이면 False)"""
+        manifest = _read_json(manifest_path)
+        work_dir = os.path.dirname(manifest_path)
+        started = time.monotonic()
+        while True:
+            pending = 0
+            for batch in manifest["batches"]:
+                if batch.get("status") in BATCH_DONE and "output" in batch:
+                    continue
+                info = self.client.batches.retrieve(batch["id"])
+                batch["status"] = info.status
+                counts = info.request_counts
+                if info.status not in BATCH_DONE:
+                    pending += 1
+                    if counts is not None:
+                        print(f"{batch['id']}: {info.status} ({counts.completed + counts.failed}/{counts.total})")
+                    continue
+                for kind, file_id in (("output", info.output_file_id), ("errors", info.error_file_id)):
+                    batch[kind] = None
+                    if file_id:
+                        batch[kind] = f"{kind}-{batch['input'][len('requests-'):]}"
+                        with open(os.path.join(work_dir, batch[kind]), "wb") as f:
+                            f.write(self.client.files.content(file_id).content)
+                print(f"{batch['id']}: {info.status}")
+            _write_json(manifest_path, manifest)
+            if pending == 0:
+                return True
+            if timeout is not None and time.monotonic() - started + poll_interval > timeout:
+                return False
+            time.sleep(poll_interval)
+    
+    def collect_batch(self, manifest_path: str) -> List[Dict]:
+        """내려받은 배치 결과를 batch_read_times와 같은 예측 dict 목록으로 (입력 순서대로)"""
+        manifest = _read_json(manifest_path)
+        work_dir = os.path.dirname(manifest_path)
+        lines = {}
+        for batch in manifest["batches"]:
+            for kind in ("output", "errors"):
+                if batch.get(kind):
+                    with open(os.path.join(work_dir, batch[kind]), "r", encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                lines[entry["custom_id"]] = entry
+        
+        def failure(label: str, message: str) -> Dict:
+            return {"image_path": label, "hour": -1, "minute": -1, "confidence": 0.0, "error": message}
+        
+        results = []
+        for item in manifest["items"]:
+            if "same_as" in item:
+                original = results[item["same_as"]]
+                results.append(dict(original, image_path=item["label"]))
+                continue
+            if "result" in item:
+                results.append(dict(item["result"], image_path=item["label"]))
+                continue
+            
+            entry = lines.get(item["custom_id"])
+            response = entry and entry.get("response")
+            if response is None or response.get("status_code") != 200:
+                error = (entry or {}).get("error") or (response or {}).get("body", {}).get("error")
+                message = (error or {}).get("message", "No batch output")
+                record_call('batch', 'gpt-4o', error=message, batch=True, images=1)
+                results.append(failure(item["label"], message))
+                continue
+            completion = ChatCompletion.model_validate(response["body"])
+            result = self._parse_response(completion, item["image_tokens"], 0.0)
+            record_call('batch', completion.model, completion, outcome='parse_error' if 'error' in result else 'ok',
+                        batch=True, images=1)
+            result = self._cache_store(item.get("cache_key"), result)
+            result["image_path"] = item["label"]
+            results.append(result)
         return results
     
+    def batch_read_times_offline(self, image_paths: List[ImageInput], prompt: Optional[str] = None,
+                                 work_dir: Optional[str] = None, poll_interval: float = 30.0,
+                                 reuse_duplicates: bool = False) -> List[Dict]:
+        """Batch API로 읽기 (지연 대신 비용/처리량 우선, 야간 전체 평가용)
+        
+        준비 → 제출 → 완료까지 폴링 → 결과 수집. 중간에 멈추면 같은 manifest로
+        submit_batch / wait_for_batch / collect_batch를 다시 부르면 이어진다.
+        """
+        manifest_path = self.prepare_batch(image_paths, prompt, work_dir, reuse_duplicates)
+        self.submit_batch(manifest_path)
+        self.wait_for_batch(manifest_path, poll_interval)
+        return self.collect_batch(manifest_path)
+    
     def evaluate_results(self, results: List[Dict], ground_truth: List[Dict]) -> Dict:
         """결과 평가"""
         correct_hours = 0
@@ -153,13 +1165,13 @@ if __name__ == "__main__":
     reader = GPT4oTimeReader()
     
     # 샘플 이미지로 테스트 (데이터셋 생성 후 실행)
-    if os.path.exists("dataset/metadata.json"):
-        with open("dataset/metadata.json", 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+    loader = DatasetLoader()
+    if loader.exists():
+        metadata = loader.samples
         
         # 처음 10개 샘플로 테스트
         test_samples = metadata[:10]
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+        image_paths = loader.images(test_samples)
         
         results = reader.batch_read_times(image_paths)
         evaluation = reader.evaluate_results(results, test_samples)
@@ -0,0 +1,61 @@
+"""
+인코딩된 이미지 캐시
+data URL 문자열을 바이트 합 기준 LRU로 메모리에 유지합니다 (시간 읽기와 데이터셋 로더가 함께 사용).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# 인코딩된 이미지 캐시 크기 (MB)
+DEFAULT_IMAGE_CACHE_MB = float(os.getenv('OPENAI_IMAGE_CACHE_MB', '128'))
+
+class EncodedImageCache:
+    """인코딩된 data URL LRU 캐시 (항목 수가 아니라 문자열 바이트 합으로 제한)
+    
+    파일은 (경로, mtime, 크기, 축소 크기)를 키로 쓰므로 파일이 바뀌면 자동으로 다시 인코딩된다.
+    """
+    
+    def __init__(self, max_bytes: int = int(DEFAULT_IMAGE_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value: str):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+    
+    def stats(self) -> Dict:
+        """캐시 통계"""
+        return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
@@ -0,0 +1,133 @@
+"""
+이미지 크기 / detail 설정 스윕
+설정마다 같은 층화 샘플을 읽혀 정확도 vs 토큰 vs 지연 시간을 비교하고,
+정확도를 유지하는 가장 저렴한 설정을 추천합니다.
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from gpt4o_time_reader import GPT4oTimeReader, DETAIL_LEVELS, estimate_image_tokens, png_size
+from dataset_loader import DatasetLoader
+
+def parse_config(text: str) -> Tuple[Optional[int], Optional[str]]:
+    """'128:low' / 'full:high' / '256' 형식을 (image_size, detail)로"""
+    size, _, detail = text.partition(':')
+    size = None if size in ('', 'full') else int(size)
+    detail = detail or None
+    if detail is not None and detail not in DETAIL_LEVELS:
+        raise argparse.ArgumentTypeError(f"unknown detail level: {detail}")
+    return size, detail
+
+def config_name(size: Optional[int], detail: Optional[str]) -> str:
+    return f"{size or 'full'}:{detail or 'default'}"
+
+def run_config(api_key: Optional[str], size: Optional[int], detail: Optional[str],
+               images: List, samples: List[Dict], prompt: Optional[str] = None) -> Dict:
+    """한 설정으로 샘플을 읽고 정확도와 사용량 요약"""
+    reader = GPT4oTimeReader(api_key, image_size=size, detail=detail)
+    results = reader.batch_read_times(images, prompt, reuse_duplicates=False)
+    evaluation = reader.evaluate_results(results, samples)
+    latencies = [r['usage']['latency'] for r in results if 'usage' in r]
+
+    summary = reader.usage_summary()
+    summary.update({
+        "config": config_name(size, detail),
+        "exact_match_accuracy": evaluation['exact_match_accuracy'],
+        "hour_accuracy": evaluation['hour_accuracy'],
+        "minute_accuracy": evaluation['minute_accuracy'],
+        "errors": sum(1 for r in results if 'error' in r),
+        "p50_latency": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_latency": float(np.percentile(latencies, 95)) if latencies else 0.0
+    })
+    return summary
+
+def estimate_config(size: Optional[int], detail: Optional[str], native_size: int) -> Dict:
+    """API 호출 없이 이미지 토큰만 추정 (--estimate-only)"""
+    side = min(size, native_size) if size else native_size
+    return {
+        "config": config_name(size, detail),
+        "image_size": size,
+        "detail": detail,
+        "avg_image_tokens": estimate_image_tokens(side, side, detail)
+    }
+
+def recommend(summaries: Sequence[Dict], tolerance: float) -> Optional[Dict]:
+    """최고 정확도에서 tolerance 이내인 설정 중 프롬프트 토큰이 가장 적은 것"""
+    if not summaries:
+        return None
+    best = max(s['exact_match_accuracy'] for s in summaries)
+    eligible = [s for s in summaries if s['exact_match_accuracy'] >= best - tolerance]
+    return min(eligible, key=lambda s: (s['avg_prompt_tokens'], s['avg_latency']))
+
+def print_table(summaries: Sequence[Dict]):
+    if 'exact_match_accuracy' not in summaries[0]:
+        print(f"{'config':<16}{'image tokens':>14}")
+        for s in summaries:
+            print(f"{s['config']:<16}{s['avg_image_tokens']:>14.0f}")
+        return
+
+    print(f"{'config':<16}{'exact':>8}{'hour':>8}{'minute':>8}"
+          f"{'prompt tok':>12}{'image tok':>11}{'avg s':>8}{'p95 s':>8}{'errors':>8}")
+    for s in summaries:
+        print(f"{s['config']:<16}{s['exact_match_accuracy']:>8.1%}{s['hour_accuracy']:>8.1%}"
+              f"{s['minute_accuracy']:>8.1%}{s['avg_prompt_tokens']:>12.0f}{s['avg_image_tokens']:>11.0f}"
+              f"{s['avg_latency']:>8.2f}{s['p95_latency']:>8.2f}{s['errors']:>8d}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep image size / vision detail settings')
+    parser.add_argument('--configs', type=parse_config, nargs='+',
+                        default=[parse_config(c) for c in
+                                 ('full:high', 'full:low', '192:high', '128:high', '128:low')],
+                        help="Settings as SIZE:DETAIL (SIZE = pixels or 'full', DETAIL = low/high/auto)")
+    parser.add_argument('--samples', type=int, default=30, help='Stratified samples per setting')
+    parser.add_argument('--seed', type=int, default=0, help='Sampling seed')
+    parser.add_argument('--dataset', default='dataset', help='Dataset directory')
+    parser.add_argument('--prompt-file', help='Read the prompt from this file instead of the default')
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help='Accuracy drop allowed when picking the cheapest setting')
+    parser.add_argument('--estimate-only', action='store_true', help='Only estimate image tokens, no API calls')
+    parser.add_argument('--output', default='image_detail_sweep.json', help='Where to save the results')
+    args = parser.parse_args()
+
+    loader = DatasetLoader(args.dataset)
+    if not loader.exists():
+        print("Dataset not found. Please run dataset_generator.py first.")
+        return
+
+    # 모든 설정이 같은 샘플을 읽도록 고정 부분집합 사용
+    samples = loader.index.subset('image_detail_sweep', args.samples, args.seed)
+    images = loader.images(samples)
+    print(f"{len(samples)} samples, {len(args.configs)} settings")
+
+    if args.estimate_only:
+        native_size = max(png_size(GPT4oTimeReader('-').image_bytes(images[0]))) if images else 256
+        summaries = [estimate_config(size, detail, native_size) for size, detail in args.configs]
+    else:
+        prompt = None
+        if args.prompt_file:
+            with open(args.prompt_file, 'r', encoding='utf-8') as f:
+                prompt = f.read()
+        api_key = os.getenv('OPENAI_API_KEY')
+        summaries = []
+        for size, detail in args.configs:
+            print(f"\n=== {config_name(size, detail)} ===")
+            summaries.append(run_config(api_key, size, detail, images, samples, prompt))
+
+    print()
+    print_table(summaries)
+
+    choice = None if args.estimate_only else recommend(summaries, args.tolerance)
+    if choice is not None:
+        print(f"\nCheapest setting within {args.tolerance:.0%} of best accuracy: {choice['config']} "
+              f"({choice['exact_match_accuracy']:.1%}, {choice['avg_prompt_tokens']:.0f} prompt tokens)")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"samples": len(samples), "seed": args.seed, "results": summaries,
+                   "recommended": choice and choice['config']}, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+콘텐츠 주소 기반 이미지 저장소
+같은 내용의 이미지는 해시(sha256) 하나에 파일 하나로만 저장합니다.
+"""
+
+import hashlib
+import os
+import threading
+from typing import Dict
+
+class ImageStore:
+    """sha256 해시 → blob 파일 하나로 이미지를 저장하는 저장소"""
+
+    def __init__(self, root: str, blob_dir: str = "blobs", extension: str = ".png"):
+        self.root = root
+        self.blob_dir = blob_dir
+        self.extension = extension
+        self.writes = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, blob_dir), exist_ok=True)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """이미지 바이트의 콘텐츠 해시"""
+        return hashlib.sha256(data).hexdigest()
+
+    def relative_path(self, digest: str) -> str:
+        """root 기준 blob 경로 (메타데이터 filename으로 사용)"""
+        return f"{self.blob_dir}/{digest[:2]}/{digest}{self.extension}"
+
+    def path(self, digest: str) -> str:
+        """blob 파일의 전체 경로"""
+        return os.path.join(self.root, self.relative_path(digest))
+
+    def contains(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        """이미지 저장 후 해시 반환 (이미 있으면 다시 쓰지 않음)"""
+        digest = self.digest(data)
+        path = self.path(digest)
+
+        if os.path.exists(path):
+            with self._lock:
+                self.duplicates += 1
+            return digest
+
+        # 여러 프로세스가 같은 blob을 동시에 써도 안전하도록 임시 파일 후 교체
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.writes += 1
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """blob 바이트 읽기"""
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def stats(self) -> Dict:
+        """저장소 통계 (blob 수와 디스크 사용량 포함)"""
+        blob_root = os.path.join(self.root, self.blob_dir)
+        blobs = 0
+        total_bytes = 0
+        for dirpath, _, filenames in os.walk(blob_root):
+            for filename in filenames:
+                if filename.endswith(self.extension):
+                    blobs += 1
+                    total_bytes += os.path.getsize(os.path.join(dirpath, filename))
+
+        return {
+            'blobs': blobs,
+            'bytes': total_bytes,
+            'writes': self.writes,
+            'duplicates': self.duplicates
+        }
@@ -0,0 +1,118 @@
+"""
+로컬 대역 백엔드 부하 테스트
+네트워크와 API 키 없이 동시성, 재시도, 캐시 동작과 클라이언트 쪽 오버헤드를 측정합니다.
+기본은 프로세스 안의 LocalBackend, --http면 local_openai_server를 띄워 HTTP로 보냅니다.
+
+사용법:
+    python load_test.py --repeat 20 --concurrency 1 8 32            # --latency 0: 순수 클라이언트 오버헤드
+    python load_test.py --latency 0.8 --jitter 0.5 --rate-limit 0.05 --timeout 0.02 --concurrency 8 32
+    python load_test.py --http --latency 0.2 --server-error 0.05 --cache
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from backends import LocalBackend
+from dataset_loader import DatasetLoader
+from gpt4o_time_reader import GPT4oTimeReader
+from local_openai_server import (DatasetOracle, LocalOpenAIServer, add_model_arguments,
+                                 error_model_from_args, fault_model_from_args)
+from resilience import CircuitBreaker
+from response_cache import ResponseCache
+
+def run_load(reader: GPT4oTimeReader, images: List, samples: List[Dict],
+             pack_size: Optional[int] = None) -> Dict:
+    """한 설정으로 전체 이미지를 읽고 처리량, 지연 시간, 신뢰성 지표 요약
+
+    samples는 대역이 오류 없이 돌려줄 정답 (DatasetOracle.expected), 그래서 오류 모델이 없으면 exact가 100%.
+    """
+    started = time.perf_counter()
+    results = reader.batch_read_times(images, reuse_duplicates=False, progress=False, pack_size=pack_size)
+    elapsed = time.perf_counter() - started
+    latencies = [r['usage']['latency'] for r in results if 'usage' in r]
+    reliability = reader.reliability_summary()
+    return {
+        "concurrency": reader.max_concurrency,
+        "images": len(results),
+        "seconds": elapsed,
+        "images_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "ms_per_image": elapsed / max(1, len(results)) * 1000,
+        "p50_latency": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_latency": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        "exact_match_accuracy": reader.evaluate_results(results, samples)['exact_match_accuracy'],
+        "errors": sum(1 for r in results if 'error' in r),
+        "cached": sum(1 for r in results if r.get('cached')),
+        "attempts": reliability["attempts"],
+        "retries": reliability["retries"],
+        "rate_limited": reliability["rate_limited"],
+        "timeouts": reliability["timeouts"],
+        "circuit_trips": reliability["circuit"]["trips"]
+    }
+
+def print_table(summaries: List[Dict]):
+    print(f"{'conc':>5}{'img/s':>9}{'ms/img':>9}{'p50 s':>8}{'p95 s':>8}{'exact':>8}{'errors':>8}"
+          f"{'cached':>8}{'retries':>9}{'429':>6}{'timeouts':>10}{'trips':>7}")
+    for s in summaries:
+        print(f"{s['concurrency']:>5}{s['images_per_second']:>9.1f}{s['ms_per_image']:>9.2f}"
+              f"{s['p50_latency']:>8.3f}{s['p95_latency']:>8.3f}{s['exact_match_accuracy']:>8.1%}"
+              f"{s['errors']:>8d}{s['cached']:>8d}{s['retries']:>9d}{s['rate_limited']:>6d}"
+              f"{s['timeouts']:>10d}{s['circuit_trips']:>7d}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the time reader against a local stand-in backend')
+    parser.add_argument('--dataset', default='dataset', help='Dataset directory')
+    parser.add_argument('--samples', type=int, default=50, help='Stratified samples to read')
+    parser.add_argument('--repeat', type=int, default=1, help='Read the samples this many times per run')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Settings to compare')
+    parser.add_argument('--pack-size', type=int, help='Images per request')
+    parser.add_argument('--request-timeout', type=float, default=2.0, help='Reader timeout per request (s)')
+    parser.add_argument('--http', action='store_true', help='Go through the local HTTP server instead')
+    parser.add_argument('--cache', action='store_true',
+                        help='Use a fresh response cache shared by all runs (later runs hit it)')
+    parser.add_argument('--output', default='load_test.json', help='Where to save the results')
+    add_model_arguments(parser)
+    args = parser.parse_args()
+
+    loader = DatasetLoader(args.dataset)
+    if not loader.exists():
+        print("Dataset not found. Please run dataset_generator.py first.")
+        return
+    samples = loader.index.subset('load_test', args.samples, args.seed) * args.repeat
+    images = loader.images(samples)
+    oracle = DatasetOracle(args.dataset, error_model_from_args(args))
+    # h시와 h+12시가 같은 이미지로 그려지면 대역은 한쪽만 답하므로 그 답을 기준으로 채점
+    samples = oracle.expected(samples, images)
+    faults = fault_model_from_args(args)
+    cache = ResponseCache(tempfile.mkdtemp(prefix='load_test_cache_')) if args.cache else False
+    print(f"{len(images)} requests per run, {'HTTP' if args.http else 'in-process'} backend")
+
+    server = LocalOpenAIServer(oracle, faults=faults).start() if args.http else None
+    summaries = []
+    try:
+        for concurrency in args.concurrency:
+            # 설정마다 새 서킷 (앞 설정의 실패가 다음 설정에 넘어가지 않도록)
+            options = dict(max_concurrency=concurrency, timeout=args.request_timeout, cache=cache,
+                           circuit_breaker=CircuitBreaker())
+            if server is not None:
+                reader = GPT4oTimeReader('local', base_url=server.base_url, **options)
+            else:
+                reader = GPT4oTimeReader(backend=LocalBackend(oracle, faults, args.request_timeout), **options)
+            summaries.append(run_load(reader, images, samples, args.pack_size))
+    finally:
+        if server is not None:
+            server.stop()
+
+    print()
+    print_table(summaries)
+    if faults is not None:
+        print(f"Injected: {faults.counts}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"requests": len(images), "http": args.http, "results": summaries}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+"""
+로컬 OpenAI API 대역 서버 (네트워크 없이 테스트용)
+/v1/chat/completions, /v1/files, /v1/batches 일부를 흉내 냅니다.
+
+응답은 responder가 만듭니다. 기본 DatasetOracle은 데이터셋 메타데이터에서
+이미지 내용 해시로 정답 시간을 찾아 JSON으로 답하므로, 파이프라인을 끝까지 돌려 볼 수 있습니다.
+ErrorModel로 정답을 일정 비율로 틀리게 하고, FaultModel로 지연 시간, 429, 타임아웃, 500을 주입합니다.
+
+사용법:
+    python local_openai_server.py --dataset dataset --port 8000
+    python local_openai_server.py --latency 0.8 --rate-limit 0.05 --timeout 0.01 --hour-error 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=local python main_pipeline.py ...
+"""
+
+import argparse
+import base64
+import email.parser
+import email.policy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 요청 body(dict) → 응답 텍스트
+Responder = Callable[[Dict], str]
+
+_DATA_URL = re.compile(r'^data:[^;]+;base64,')
+
+def request_images(body: Dict) -> list:
+    """chat.completions 요청 body에 들어 있는 이미지 PNG 바이트 목록"""
+    images = []
+    for message in body.get('messages', []):
+        content = message.get('content')
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get('type') == 'image_url':
+                url = part['image_url']['url']
+                images.append(base64.b64decode(_DATA_URL.sub('', url, count=1)))
+    return images
+
+def constant_responder(body: Dict) -> str:
+    """항상 같은 답 (00:00)"""
+    return json.dumps({"hour": 0, "minute": 0, "confidence": 0.0})
+
+class ErrorModel:
+    """정답을 일정 확률로 틀리게 바꾸는 읽기 오류 모델 (seed와 이미지가 같으면 항상 같은 답)
+
+    hour_error: 시를 ±1 틀릴 확률 (시침이 두 숫자 사이에 있을 때 흔한 실수)
+    minute_error: 분을 ±1~minute_spread 틀릴 확률
+    swap_hands: 시침과 분침을 바꿔 읽을 확률
+    parse_error: JSON 없이 설명만 답할 확률
+    """
+
+    def __init__(self, hour_error: float = 0.0, minute_error: float = 0.0, minute_spread: int = 5,
+                 swap_hands: float = 0.0, parse_error: float = 0.0, seed: int = 0):
+        self.hour_error = hour_error
+        self.minute_error = minute_error
+        self.minute_spread = minute_spread
+        self.swap_hands = swap_hands
+        self.parse_error = parse_error
+        self.seed = seed
+
+    def apply(self, hour: int, minute: int, key: str) -> Optional[Dict]:
+        """정답 (hour, minute)에 대한 읽기 (None이면 파싱할 수 없는 답)"""
+        rng = random.Random(f"{self.seed}:{key}")
+        if rng.random() < self.parse_error:
+            return None
+        confidence = 1.0
+        if rng.random() < self.swap_hands:
+            hour, minute = (minute // 5) % 12 + (12 if hour >= 12 else 0), (hour % 12) * 5
+            confidence = 0.5
+        if rng.random() < self.hour_error:
+            hour = (hour + rng.choice((-1, 1))) % 24
+            confidence = 0.5
+        if rng.random() < self.minute_error:
+            minute = (minute + rng.choice((-1, 1)) * rng.randint(1, max(1, self.minute_spread))) % 60
+            confidence = 0.5
+        return {"hour": hour, "minute": minute, "confidence": confidence}
+
+class FaultModel:
+    """응답 지연과 오류 주입 (요청 내용과 그 요청의 시도 번호로 정해지므로 순서와 무관하게 재현됨)
+
+    latency: 평균 응답 시간(초), jitter: 지연 시간의 ± 비율
+    rate_limit / server_error: 429 / 500을 돌려줄 확률
+    timeout: 응답하지 않고 hang초 동안 멈출 확률, retry_after: 429의 retry-after(초)
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0.0,
+                 timeout: float = 0.0, server_error: float = 0.0, hang: float = 120.0,
+                 retry_after: float = 0.1, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        self.server_error = server_error
+        self.hang = hang
+        self.retry_after = retry_after
+        self.seed = seed
+        self.counts = {'ok': 0, 'rate_limit': 0, 'timeout': 0, 'server_error': 0}
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def draw(self, body: Dict) -> Tuple[str, float]:
+        """(결과 종류, 응답 전 지연 시간) — 종류는 'ok' / 'rate_limit' / 'timeout' / 'server_error'"""
+        key = hashlib.sha256(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        delay = max(0.0, self.latency * (1 + self.jitter * rng.uniform(-1, 1)))
+        roll = rng.random()
+        kind = 'ok'
+        for name, probability in (('rate_limit', self.rate_limit), ('timeout', self.timeout),
+                                  ('server_error', self.server_error)):
+            if roll < probability:
+                kind = name
+                break
+            roll -= probability
+        with self._lock:
+            self.counts[kind] += 1
+        return kind, delay
+
+    def error_body(self, kind: str) -> Dict:
+        if kind == 'rate_limit':
+            return {"error": {"message": "Rate limit reached (injected)", "type": "requests",
+                              "code": "rate_limit_exceeded"}}
+        return {"error": {"message": "The server had an error (injected)", "type": "server_error"}}
+
+    def headers(self, kind: str) -> Dict:
+        if kind == 'rate_limit':
+            return {'retry-after-ms': int(self.retry_after * 1000)}
+        return {}
+
+def _image_bytes(image) -> bytes:
+    """데이터셋 이미지(경로, data URL, PNG 바이트)의 PNG 바이트"""
+    if isinstance(image, str) and image.startswith('data:'):
+        return base64.b64decode(_DATA_URL.sub('', image, count=1))
+    if isinstance(image, str):
+        with open(image, 'rb') as f:
+            return f.read()
+    return bytes(image)
+
+class DatasetOracle:
+    """데이터셋 이미지 해시 → 정답 시간 (모르는 이미지는 00:00, confidence 0)
+
+    h시와 h+12시처럼 같은 바이트로 그려지는 샘플이 있으므로 이미지마다 맞는 답을 모두 기억하고,
+    그중 데이터셋에서 먼저 나온 답을 돌려준다 (정답 비교는 expected로).
+    error_model이 있으면 정답 대신 그 모델이 틀리게 바꾼 읽기를 돌려준다.
+    """
+
+    def __init__(self, dataset_dir: str = "dataset", error_model: Optional[ErrorModel] = None):
+        from dataset_loader import DatasetLoader
+
+        loader = DatasetLoader(dataset_dir)
+        self.error_model = error_model
+        self.answers: Dict[str, List[Tuple[int, int]]] = {}
+        if not loader.exists():
+            return
+        samples = loader.samples
+        for sample, image in zip(samples, loader.images(samples)):
+            answers = self.answers.setdefault(hashlib.sha256(_image_bytes(image)).hexdigest(), [])
+            if (sample['hour'], sample['minute']) not in answers:
+                answers.append((sample['hour'], sample['minute']))
+
+    def expected(self, samples: List[Dict], images: List) -> List[Dict]:
+        """오류 없는 대역이 돌려줄 정답 (이미지가 같은 샘플끼리는 같은 답, 정확도 기준 100%)"""
+        truth = []
+        for sample, image in zip(samples, images):
+            answers = self.answers.get(hashlib.sha256(_image_bytes(image)).hexdigest())
+            hour, minute = answers[0] if answers else (sample['hour'], sample['minute'])
+            truth.append({**sample, "hour": hour, "minute": minute})
+        return truth
+
+    def reading(self, image: bytes) -> Optional[Dict]:
+        """이미지 하나의 읽기 (error_model이 파싱 실패를 고르면 None)"""
+        key = hashlib.sha256(image).hexdigest()
+        answers = self.answers.get(key)
+        if not answers:
+            return {"hour": 0, "minute": 0, "confidence": 0.0}
+        hour, minute = answers[0]
+        if self.error_model is not None:
+            return self.error_model.apply(hour, minute, key)
+        return {"hour": hour, "minute": minute, "confidence": 1.0}
+
+    def __call__(self, body: Dict) -> str:
+        images = request_images(body)
+        if len(images) > 1:
+            # 여러 장을 묶은 요청은 번호를 붙인 JSON 배열로 (읽지 못한 이미지는 빠짐)
+            readings = [(n, self.reading(image)) for n, image in enumerate(images, 1)]
+            return json.dumps([{"index": n, **reading} for n, reading in readings if reading is not None])
+        if not images:
+            return constant_responder(body)
+        reading = self.reading(images[0])
+        if reading is None:
+            return "I'm not able to determine the time from this image."
+        return json.dumps(reading)
+
+def completion(body: Dict, content: str) -> Dict:
+    """chat.completion 응답 객체"""
+    prompt_tokens = len(json.dumps(body.get('messages', []))) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get('model', 'gpt-4o'),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+class LocalOpenAIServer:
+    """백그라운드 스레드에서 도는 대역 서버 (with 문으로 시작/종료)
+
+    batch_delay: 배치를 끝내기 전 기다리는 시간(초) — 폴링 경로 테스트용
+    faults: chat.completions 응답에 넣을 지연 시간과 오류 (배치 요청에는 적용하지 않음)
+    """
+
+    def __init__(self, responder: Optional[Responder] = None, host: str = '127.0.0.1', port: int = 0,
+                 batch_delay: float = 0.0, faults: Optional[FaultModel] = None):
+        self.responder = responder or constant_responder
+        self.batch_delay = batch_delay
+        self.faults = faults
+        self.files: Dict[str, Dict] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'LocalOpenAIServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'LocalOpenAIServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- API 동작 ---
+
+    def chat_completion(self, body: Dict, faults: Optional[FaultModel] = None):
+        """(상태 코드, 응답 dict, 추가 헤더), faults가 있으면 지연/오류 주입"""
+        with self._lock:
+            self.requests += 1
+        if faults is not None:
+            kind, delay = faults.draw(body)
+            time.sleep(delay)
+            if kind == 'timeout':
+                time.sleep(faults.hang)
+            elif kind != 'ok':
+                return (429 if kind == 'rate_limit' else 500), faults.error_body(kind), faults.headers(kind)
+        return 200, completion(body, self.responder(body)), {}
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        entry = {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                 "filename": filename, "purpose": purpose, "status": "processed"}
+        with self._lock:
+            self.files[file_id] = {**entry, "content": content}
+        return entry
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> Dict:
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {"id": batch_id, "object": "batch", "endpoint": endpoint, "input_file_id": input_file_id,
+                 "completion_window": completion_window, "status": "validating",
+                 "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+                 "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+        with self._lock:
+            self.batches[batch_id] = batch
+        threading.Thread(target=self._run_batch, args=(batch_id,), daemon=True).start()
+        return dict(batch)
+
+    def _run_batch(self, batch_id: str):
+        batch = self.batches[batch_id]
+        lines = self.files[batch['input_file_id']]['content'].decode('utf-8').splitlines()
+        batch.update(status="in_progress", in_progress_at=int(time.time()))
+        batch['request_counts']['total'] = len(lines)
+        time.sleep(self.batch_delay)
+
+        outputs, errors = [], []
+        for line in lines:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            try:
+                status, response, _ = self.chat_completion(request['body'])
+                outputs.append({"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": request['custom_id'],
+                                "response": {"status_code": status, "request_id": uuid.uuid4().hex,
+                                             "body": response},
+                                "error": None})
+                batch['request_counts']['completed'] += 1
+            except Exception as e:
+                errors.append({"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": request.get('custom_id'),
+                               "response": None, "error": {"code": "server_error", "message": str(e)}})
+                batch['request_counts']['failed'] += 1
+
+        def jsonl(rows):
+            return ''.join(json.dumps(row) + '\n' for row in rows).encode('utf-8')
+
+        batch['output_file_id'] = self.add_file(jsonl(outputs), f"{batch_id}_output.jsonl", "batch_output")['id']
+        if errors:
+            batch['error_file_id'] = self.add_file(jsonl(errors), f"{batch_id}_error.jsonl", "batch_output")['id']
+        batch.update(status="completed", completed_at=int(time.time()))
+
+    # --- HTTP ---
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive 지원 (응답마다 Content-Length를 보냄)
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload, headers: Optional[Dict] = None,
+                      content_type: str = 'application/json'):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 클라이언트가 요청을 취소함
+
+            def _not_found(self):
+                self._send(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            def do_GET(self):
+                parts = self.path.split('?')[0].strip('/').split('/')
+                if parts[:2] == ['v1', 'batches'] and len(parts) == 3 and parts[2] in server.batches:
+                    return self._send(200, server.batches[parts[2]])
+                if parts[:2] == ['v1', 'files'] and len(parts) >= 3 and parts[2] in server.files:
+                    entry = server.files[parts[2]]
+                    if len(parts) == 4 and parts[3] == 'content':
+                        return self._send(200, entry['content'], content_type='application/octet-stream')
+                    return self._send(200, {k: v for k, v in entry.items() if k != 'content'})
+                self._not_found()
+
+            def do_POST(self):
+                path = self.path.split('?')[0].rstrip('/')
+                body = self._body()
+                if path == '/v1/chat/completions':
+                    status, payload, headers = server.chat_completion(json.loads(body), server.faults)
+                    return self._send(status, payload, headers)
+                if path == '/v1/files':
+                    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                        b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+                    fields, content, filename = {}, b'', 'upload.jsonl'
+                    for part in message.iter_parts():
+                        name = part.get_param('name', header='content-disposition')
+                        if part.get_filename():
+                            content, filename = part.get_payload(decode=True), part.get_filename()
+                        else:
+                            fields[name] = part.get_content().strip()
+                    return self._send(200, server.add_file(content, filename, fields.get('purpose', 'batch')))
+                if path == '/v1/batches':
+                    request = json.loads(body)
+                    if request.get('input_file_id') not in server.files:
+                        return self._send(400, {"error": {"message": "Unknown input_file_id",
+                                                          "type": "invalid_request_error"}})
+                    return self._send(200, server.create_batch(request['input_file_id'], request['endpoint'],
+                                                               request.get('completion_window', '24h')))
+                self._not_found()
+
+        return Handler
+
+def add_model_arguments(parser: argparse.ArgumentParser):
+    """오류 모델 / 장애 주입 인자 (load_test.py와 공유)"""
+    group = parser.add_argument_group('reading errors')
+    group.add_argument('--hour-error', type=float, default=0.0, help='Probability of reading the hour off by one')
+    group.add_argument('--minute-error', type=float, default=0.0, help='Probability of a wrong minute')
+    group.add_argument('--swap-hands', type=float, default=0.0, help='Probability of swapping the hands')
+    group.add_argument('--parse-error', type=float, default=0.0, help='Probability of a non-JSON answer')
+    group = parser.add_argument_group('fault injection')
+    group.add_argument('--latency', type=float, default=0.0, help='Mean response time in seconds')
+    group.add_argument('--jitter', type=float, default=0.0, help='Latency jitter as a fraction of --latency')
+    group.add_argument('--rate-limit', type=float, default=0.0, help='Probability of a 429')
+    group.add_argument('--timeout', type=float, default=0.0, help='Probability of never answering')
+    group.add_argument('--server-error', type=float, default=0.0, help='Probability of a 500')
+    group.add_argument('--hang', type=float, default=120.0, help='Seconds a timed-out request hangs')
+    group.add_argument('--seed', type=int, default=0, help='Seed for errors and faults')
+
+def error_model_from_args(args) -> Optional[ErrorModel]:
+    if not (args.hour_error or args.minute_error or args.swap_hands or args.parse_error):
+        return None
+    return ErrorModel(args.hour_error, args.minute_error, swap_hands=args.swap_hands,
+                      parse_error=args.parse_error, seed=args.seed)
+
+def fault_model_from_args(args) -> Optional[FaultModel]:
+    if not (args.latency or args.rate_limit or args.timeout or args.server_error):
+        return None
+    return FaultModel(args.latency, args.jitter, args.rate_limit, args.timeout, args.server_error,
+                      hang=args.hang, seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the OpenAI chat/files/batches API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--dataset', default='dataset', help='Answer with ground truth from this dataset')
+    parser.add_argument('--batch-delay', type=float, default=0.0, help='Seconds before a batch completes')
+    add_model_arguments(parser)
+    args = parser.parse_args()
+
+    oracle = DatasetOracle(args.dataset, error_model_from_args(args))
+    server = LocalOpenAIServer(oracle, args.host, args.port, args.batch_delay, fault_model_from_args(args))
+    print(f"Serving {len(oracle.answers)} known images at {server.base_url}")
+    print(f"export OPENAI_BASE_URL={server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -8,23 +8,44 @@ import json
 import argparse
 from datetime import datetime
 from dataset_generator import ClockDatasetGenerator
-from gpt4o_time_reader import GPT4oTimeReader
+from gpt4o_time_reader import (GPT4oTimeReader, DEFAULT_MAX_CONCURRENCY, DEFAULT_RPM, DEFAULT_TPM,
+                               DEFAULT_TIMEOUT, DEFAULT_BATCH_DEADLINE)
 from textgrad_optimizer import TimeReadingOptimizer
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
+from cassette import add_cassette_arguments, cassette_from_args
 
 class TimeReadingPipeline:
-    def __init__(self, openai_api_key: str = None):
+    def __init__(self, openai_api_key: str = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 timeout: float = DEFAULT_TIMEOUT, batch_deadline: float = DEFAULT_BATCH_DEADLINE):
         self.openai_api_key = openai_api_key or os.getenv('OPENAI_API_KEY')
+        self.max_concurrency = max_concurrency
+        # 같은 API 키의 리더(최적화기 내부 리더 포함)는 한도를 공유함
+        self.rpm = rpm
+        self.tpm = tpm
+        self.timeout = timeout
+        self.batch_deadline = batch_deadline
         self.results = {}
+        self.loader = DatasetLoader()
     
-    def step1_generate_dataset(self, num_samples: int = 500):
+    def step1_generate_dataset(self, num_samples: int = 500, num_workers: int = 1, seed: int = None,
+                               packed: bool = False, resume: bool = False, payloads: bool = False,
+                               augment: bool = False, clock_type: str = 'analog'):
         """Step 1: 가상 시계 데이터셋 생성"""
         print("=" * 50)
         print("Step 1: Generating Clock Dataset")
         print("=" * 50)
         
-        generator = ClockDatasetGenerator()
-        dataset = generator.generate_dataset(num_samples)
+        generator = ClockDatasetGenerator(self.loader.root)
+        if packed:
+            dataset = generator.generate_packed_dataset(num_samples, seed=seed, augment=augment,
+                                                        clock_type=clock_type)
+        else:
+            dataset = generator.generate_dataset(num_samples, num_workers=num_workers, seed=seed,
+                                                 resume=resume, payloads=payloads, augment=augment,
+                                                 clock_type=clock_type)
+        self.loader.reload()
         
         print(f"✓ Generated {len(dataset)} clock images")
         self.results['dataset_size'] = len(dataset)
@@ -36,15 +57,17 @@ class TimeReadingPipeline:
         print("Step 2: Baseline Evaluation")
         print("=" * 50)
         
-        reader = GPT4oTimeReader(self.openai_api_key)
+        reader = GPT4oTimeReader(self.openai_api_key, max_concurrency=self.max_concurrency,
+                                 rpm=self.rpm, tpm=self.tpm, timeout=self.timeout,
+                                 batch_deadline=self.batch_deadline)
         evaluator = SeparateEvaluationSystem()
         
         # 테스트 샘플 선택
         test_samples = dataset[:sample_size]
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+        image_paths = self.loader.images(test_samples)
         
         print(f"Testing baseline with {len(test_samples)} samples...")
-        predictions = reader.batch_read_times(image_paths)
+        predictions = reader.batch_read_times(image_paths, reuse_duplicates=self.loader.deduplicated)
         
         # 평가
         baseline_eval = evaluator.comprehensive_evaluation(predictions, test_samples)
@@ -101,15 +124,18 @@ class TimeReadingPipeline:
         print("Step 4: Final Evaluation with Optimized Prompt")
         print("=" * 50)
         
-        reader = GPT4oTimeReader(self.openai_api_key)
+        reader = GPT4oTimeReader(self.openai_api_key, max_concurrency=self.max_concurrency,
+                                 rpm=self.rpm, tpm=self.tpm, timeout=self.timeout,
+                                 batch_deadline=self.batch_deadline)
         evaluator = SeparateEvaluationSystem()
         
         # 테스트 샘플 선택 (기본 평가와 다른 샘플 사용)
         test_samples = dataset[-sample_size:] if len(dataset) >= sample_size else dataset
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+        image_paths = self.loader.images(test_samples)
         
         print(f"Testing optimized prompt with {len(test_samples)} samples...")
-        predictions = reader.batch_read_times(image_paths, optimized_prompt)
+        predictions = reader.batch_read_times(image_paths, optimized_prompt,
+                                               reuse_duplicates=self.loader.deduplicated)
         
         # 평가
         final_eval = evaluator.comprehensive_evaluation(predictions, test_samples)
@@ -196,7 +222,14 @@ class TimeReadingPipeline:
     
     def run_full_pipeline(self, num_samples: int = 500, 
                          baseline_samples: int = 50, 
-                         final_samples: int = 100):
+                         final_samples: int = 100,
+                         num_workers: int = 1,
+                         seed: int = None,
+                         packed: bool = False,
+                         resume: bool = False,
+                         payloads: bool = False,
+                         augment: bool = False,
+                         clock_type: str = 'analog'):
         """전체 파이프라인 실행"""
         print("Starting Time Reading Optimization Pipeline")
         print(f"Parameters: {num_samples} samples, baseline: {baseline_samples}, final: {final_samples}")
@@ -205,7 +238,8 @@ class TimeReadingPipeline:
         
         try:
             # Step 1: 데이터셋 생성
-            dataset = self.step1_generate_dataset(num_samples)
+            dataset = self.step1_generate_dataset(num_samples, num_workers, seed, packed, resume, payloads,
+                                                  augment, clock_type)
             
             # Step 2: 기본 평가
             baseline_eval = self.step2_baseline_evaluation(dataset, baseline_samples)
@@ -250,26 +284,70 @@ def main():
                        help='Number of samples for baseline evaluation')
     parser.add_argument('--final-samples', type=int, default=100,
                        help='Number of samples for final evaluation')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of processes for dataset generation (0 = one per CPU)')
+    parser.add_argument('--seed', type=int,
+                       help='Dataset seed (same seed gives the same dataset for any worker count)')
+    parser.add_argument('--packed', action='store_true',
+                       help='Write the dataset as packed shards instead of individual PNG files')
+    parser.add_argument('--resume', action='store_true',
+                       help='Skip samples already in the dataset journal (continue or extend a previous run)')
+    parser.add_argument('--payloads', action='store_true',
+                       help='Store pre-encoded base64 data URLs next to each image')
+    parser.add_argument('--augment', action='store_true',
+                       help='Generate a robustness set (rotation, perspective, noise, blur, colors, missing numerals)')
+    parser.add_argument('--clock-type', choices=['analog', 'digital', 'word'], default='analog',
+                       help='Kind of clock to generate')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                       help='Maximum number of API requests in flight during evaluation')
+    parser.add_argument('--rpm', type=float, default=DEFAULT_RPM,
+                       help='Requests-per-minute quota (default: OPENAI_RPM or learned from response headers)')
+    parser.add_argument('--tpm', type=float, default=DEFAULT_TPM,
+                       help='Tokens-per-minute quota (default: OPENAI_TPM or learned from response headers)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                       help='Per-request timeout in seconds')
+    parser.add_argument('--batch-deadline', type=float, default=DEFAULT_BATCH_DEADLINE,
+                       help='Deadline in seconds for each evaluation batch (unfinished items count as errors)')
     parser.add_argument('--api-key', type=str, 
                        help='OpenAI API key (or set OPENAI_API_KEY env var)')
+    add_cassette_arguments(parser)
     
     args = parser.parse_args()
     
-    # API 키 확인
+    # 녹화/재생 카세트 (재생할 때는 데이터셋을 같은 --seed로 만들어야 요청이 일치)
+    cassette = cassette_from_args(args)
+    
+    # API 키 확인 (재생만 할 때는 필요 없음)
     api_key = args.api_key or os.getenv('OPENAI_API_KEY')
+    if cassette is not None and cassette.mode == 'replay':
+        api_key = api_key or 'cassette-replay'
     if not api_key:
         print("Error: OpenAI API key is required.")
         print("Set OPENAI_API_KEY environment variable or use --api-key argument")
         return
     
     # 파이프라인 실행
-    pipeline = TimeReadingPipeline(api_key)
+    pipeline = TimeReadingPipeline(api_key, max_concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+                                   timeout=args.timeout, batch_deadline=args.batch_deadline)
     success = pipeline.run_full_pipeline(
         num_samples=args.samples,
         baseline_samples=args.baseline_samples,
-        final_samples=args.final_samples
+        final_samples=args.final_samples,
+        num_workers=args.workers or os.cpu_count() or 1,
+        seed=args.seed,
+        packed=args.packed,
+        resume=args.resume,
+        payloads=args.payloads,
+        augment=args.augment,
+        clock_type=args.clock_type
     )
     
+    if cassette is not None:
+        summary = cassette.summary()
+        print(f"\nCassette {summary['path']}: {summary['replayed']} replayed "
+              f"({summary['replayed_latency']:.1f}s of recorded latency), {summary['recorded']} recorded, "
+              f"{summary['misses']} missing")
+    
     if success:
         print("\n🎉 Pipeline completed successfully!")
     else:
@@ -5,18 +5,22 @@ GPT-4o를 이용한 반복적 프롬프트 개선
 
 import os
 import json
-import random
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Union
 from gpt4o_time_reader import GPT4oTimeReader
+from client_registry import shared_client
+from telemetry import logged_completion
 from evaluation_system import SeparateEvaluationSystem
-import openai
+from dataset_loader import DatasetLoader
+from dataset_index import DatasetIndex, Seed, as_index
 
 class ManualPromptOptimizer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, dataset_dir: str = "dataset", seed: int = 0):
         self.api_key = api_key
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = shared_client(api_key)
         self.time_reader = GPT4oTimeReader(api_key)
         self.evaluator = SeparateEvaluationSystem()
+        self.loader = DatasetLoader(dataset_dir)
+        self.seed = seed
         
         # 초기 프롬프트들
         self.initial_prompts = [
@@ -77,11 +81,12 @@ Response format:
 Respond only in JSON format."""
         ]
     
-    def evaluate_prompt(self, prompt: str, test_data: List[Dict], max_samples: int = 15) -> Tuple[float, Dict]:
-        """프롬프트 평가"""
-        # 랜덤 샘플 선택
-        test_samples = random.sample(test_data, min(max_samples, len(test_data)))
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    def evaluate_prompt(self, prompt: str, test_data: Union[List[Dict], DatasetIndex], max_samples: int = 15,
+                        seed: Seed = None) -> Tuple[float, Dict]:
+        """프롬프트 평가 (seed가 없으면 같은 데이터에서는 항상 같은 샘플로 비교)"""
+        # 시간대별 층화 샘플 선택
+        test_samples = as_index(test_data).sample(max_samples, self.seed if seed is None else seed)
+        image_paths = self.loader.images(test_samples)
         
         print(f"Testing prompt with {len(test_samples)} samples...")
         
@@ -133,7 +138,8 @@ Respond only in JSON format."""
 
 개선된 프롬프트만 출력하세요:"""
 
-        response = self.client.chat.completions.create(
+        response = logged_completion(
+            self.client, 'optimizer',
             model="gpt-4o",
             messages=[{"role": "user", "content": improvement_prompt}],
             max_tokens=800,
@@ -170,11 +176,8 @@ Respond only in JSON format."""
         print("🚀 아날로그 시계 프롬프트 최적화 시작!")
         print("=" * 60)
         
-        # 데이터 분할 (70% 훈련, 30% 검증)
-        random.shuffle(dataset)
-        split_idx = int(len(dataset) * 0.7)
-        train_data = dataset[:split_idx]
-        val_data = dataset[split_idx:]
+        # 데이터 분할 (70% 훈련, 30% 검증, 시간대별 층화)
+        train_data, val_data = as_index(dataset).split(0.7, seed=self.seed)
         
         print(f"훈련 데이터: {len(train_data)}개, 검증 데이터: {len(val_data)}개")
         
@@ -207,11 +210,12 @@ Respond only in JSON format."""
             print(f"{'='*50}")
             
             # 현재 프롬프트로 훈련 데이터 평가
-            train_score, train_evaluation = self.evaluate_prompt(current_prompt, train_data, 20)
+            train_score, train_evaluation = self.evaluate_prompt(current_prompt, train_data, 20,
+                                                                 seed=[self.seed, iteration, 0])
             
             # 실패 사례 수집
-            train_samples = random.sample(train_data, 20)
-            train_image_paths = [os.path.join("dataset", s['filename']) for s in train_samples]
+            train_samples = train_data.sample(20, seed=[self.seed, iteration, 1])
+            train_image_paths = self.loader.images(train_samples)
             train_predictions = self.time_reader.batch_read_times(train_image_paths, current_prompt)
             failed_examples = self.collect_failed_examples(train_predictions, train_samples)
             
@@ -281,12 +285,12 @@ Respond only in JSON format."""
 def main():
     api_key = os.getenv('OPENAI_API_KEY')
     
+    optimizer = ManualPromptOptimizer(api_key)
+    
     # 데이터셋 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    dataset = optimizer.loader.samples
     
     # 최적화 실행
-    optimizer = ManualPromptOptimizer(api_key)
     optimized_prompt = optimizer.optimize_prompt(dataset, num_iterations=3)
     
     print(f"\n🎉 최적화 완료!")
@@ -0,0 +1,307 @@
+"""
+묶음(packed) 샤드 데이터셋 형식
+작은 PNG 파일 수백 개 대신, 샤드마다 고정 길이 인덱스 + 이어 붙인 PNG blob
+(+ 선택적으로 원본 uint8 텐서)을 저장하고 mmap으로 복사 없이 읽습니다.
+
+디렉터리 구조:
+    manifest.json          형식/샤드 목록/이미지 크기
+    shard-00000.idx.npy    고정 길이 레코드 (INDEX_DTYPE)
+    shard-00000.bin        이어 붙인 PNG 바이트
+    shard-00000.u8         (선택) (N, H, W, 3) uint8 원본 텐서
+    shard-00000.meta.jsonl (선택) 인덱스에 없는 샘플 필드 (augmentation, style 등) 한 줄에 한 샘플
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+PACKED_FORMAT = "clock-packed-v1"
+MANIFEST_NAME = "manifest.json"
+
+CLOCK_TYPES = ('analog', 'digital', 'word')
+
+# 인덱스 레코드나 filename 규칙으로 다시 만드는 필드 (sidecar에 저장하지 않음)
+# payload는 샤드 밖의 .b64 파일을 가리키므로 제외 (packed 샤드의 PNG 바이트가 대신함)
+INDEXED_FIELDS = ('filename', 'clock_type', 'hour', 'minute', 'time_string', 'payload')
+
+# 샘플 하나당 고정 길이 레코드
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('hour', 'u1'),
+    ('minute', 'u1'),
+    ('clock_type', 'u1'),
+])
+
+def is_packed_dataset(root: str) -> bool:
+    """packed 형식 데이터셋인지 확인"""
+    return os.path.exists(os.path.join(root, MANIFEST_NAME))
+
+def remove_packed_dataset(root: str) -> int:
+    """manifest와 manifest에 적힌 샤드 파일 삭제 (같은 디렉터리에 PNG 데이터셋을 새로 만들 때)
+
+    manifest가 있으면 DatasetLoader가 metadata.json보다 packed 형식을 먼저 읽으므로,
+    남겨 두면 새 데이터셋 대신 이전 샤드가 읽힌다. 삭제한 샤드 수를 돌려준다.
+    """
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8') as f:
+        shards = json.load(f).get('shards', [])
+    # manifest부터 지워 중간에 멈춰도 반쯤 지운 샤드를 packed 데이터셋으로 읽지 않게 함
+    os.remove(path)
+    for shard in shards:
+        for suffix in ('.idx.npy', '.bin', '.u8', '.meta.jsonl'):
+            try:
+                os.remove(os.path.join(root, shard['name'] + suffix))
+            except FileNotFoundError:
+                pass
+    return len(shards)
+
+def packed_filename(index: int, clock_type: str) -> str:
+    """packed 샘플의 식별용 파일 이름 (generate_dataset과 같은 규칙)"""
+    return f"clock_{index:04d}_{clock_type}.png"
+
+class PackedDatasetWriter:
+    """packed 샤드 데이터셋 작성기
+
+    같은 PNG 바이트는 샤드 안에서 한 번만 기록하고 레코드가 같은 위치를 가리킨다.
+    """
+
+    def __init__(self, root: str, shard_size: int = 65536, with_tensor: bool = False):
+        self.root = root
+        self.shard_size = shard_size
+        self.with_tensor = with_tensor
+        self.image_size = None
+        self.shards = []
+        self.count = 0
+        self._records = []
+        self._extras = []
+        self._blob_file = None
+        self._tensor_file = None
+        self._blob_offsets = {}
+        self._blob_size = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _shard_name(self, shard_index: int) -> str:
+        return f"shard-{shard_index:05d}"
+
+    def _open_shard(self):
+        name = self._shard_name(len(self.shards))
+        self._blob_file = open(os.path.join(self.root, f"{name}.bin"), "wb")
+        if self.with_tensor:
+            self._tensor_file = open(os.path.join(self.root, f"{name}.u8"), "wb")
+        self._records = []
+        self._extras = []
+        self._blob_offsets = {}
+        self._blob_size = 0
+
+    def _close_shard(self):
+        if self._blob_file is None:
+            return
+        name = self._shard_name(len(self.shards))
+        self._blob_file.close()
+        if self._tensor_file is not None:
+            self._tensor_file.close()
+        np.save(os.path.join(self.root, f"{name}.idx.npy"), np.array(self._records, dtype=INDEX_DTYPE))
+        if any(self._extras):
+            with open(os.path.join(self.root, f"{name}.meta.jsonl"), 'w', encoding='utf-8') as f:
+                for extra in self._extras:
+                    f.write(json.dumps(extra, ensure_ascii=False) + '\n')
+        self.shards.append({'name': name, 'count': len(self._records)})
+        self._blob_file = None
+        self._tensor_file = None
+
+    def add(self, png: bytes, sample: Dict, image: Optional[np.ndarray] = None):
+        """샘플 하나 추가 (with_tensor=True면 image 배열이 필요)"""
+        if self._blob_file is None:
+            self._open_shard()
+
+        digest = hashlib.sha256(png).digest()
+        if digest not in self._blob_offsets:
+            self._blob_offsets[digest] = self._blob_size
+            self._blob_file.write(png)
+            self._blob_size += len(png)
+
+        self._records.append((self._blob_offsets[digest], len(png), sample['hour'], sample['minute'],
+                              CLOCK_TYPES.index(sample.get('clock_type', 'analog'))))
+        self._extras.append({key: value for key, value in sample.items() if key not in INDEXED_FIELDS})
+
+        if self.with_tensor:
+            if image is None:
+                raise ValueError("image array is required when with_tensor=True")
+            if self.image_size is None:
+                self.image_size = list(image.shape)
+            elif list(image.shape) != self.image_size:
+                raise ValueError("all images in a tensor shard must have the same shape")
+            self._tensor_file.write(np.ascontiguousarray(image, dtype=np.uint8).tobytes())
+
+        self.count += 1
+        if len(self._records) >= self.shard_size:
+            self._close_shard()
+
+    def close(self):
+        """마지막 샤드와 manifest 기록 (manifest가 있어야 완성된 데이터셋으로 인식됨)"""
+        self._close_shard()
+        manifest = {
+            'format': PACKED_FORMAT,
+            'count': self.count,
+            'tensor': self.with_tensor,
+            'image_shape': self.image_size,
+            'shards': self.shards
+        }
+        with open(os.path.join(self.root, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # 중단된 생성은 manifest 없이 남겨 완성된 데이터셋으로 보이지 않게 함
+        if self._blob_file is not None:
+            self._blob_file.close()
+        if self._tensor_file is not None:
+            self._tensor_file.close()
+
+class PackedDataset:
+    """mmap으로 여는 packed 샤드 데이터셋 (읽기 전용, 복사 없음)"""
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != PACKED_FORMAT:
+            raise ValueError(f"Unsupported packed dataset format: {self.manifest.get('format')}")
+
+        self._indexes = []
+        self._blobs = []
+        self._tensors = []
+        self._starts = []
+        self._files = []
+        start = 0
+
+        for shard in self.manifest['shards']:
+            name = shard['name']
+            self._indexes.append(np.load(os.path.join(root, f"{name}.idx.npy"), mmap_mode='r'))
+
+            blob_file = open(os.path.join(root, f"{name}.bin"), "rb")
+            self._files.append(blob_file)
+            if os.path.getsize(blob_file.name) > 0:
+                self._blobs.append(mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                self._blobs.append(b"")
+
+            if self.manifest.get('tensor'):
+                shape = (shard['count'], *self.manifest['image_shape'])
+                self._tensors.append(np.memmap(os.path.join(root, f"{name}.u8"), dtype=np.uint8,
+                                               mode='r', shape=shape))
+
+            self._starts.append(start)
+            start += shard['count']
+
+        self._count = start
+        self._metadata = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """전체 인덱스 → (샤드 번호, 샤드 내 위치)"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        shard = int(np.searchsorted(self._starts, index, side='right')) - 1
+        return shard, index - self._starts[shard]
+
+    def image_bytes(self, index: int) -> memoryview:
+        """PNG 바이트 (mmap 위 memoryview, 복사 없음)"""
+        shard, position = self._locate(index)
+        record = self._indexes[shard][position]
+        offset = int(record['offset'])
+        return memoryview(self._blobs[shard])[offset:offset + int(record['length'])]
+
+    def image_array(self, index: int) -> np.ndarray:
+        """(H, W, 3) uint8 배열 (텐서 샤드가 있으면 memmap 뷰, 없으면 PNG 디코딩)"""
+        shard, position = self._locate(index)
+        if self._tensors:
+            return self._tensors[shard][position]
+
+        import io
+        from PIL import Image
+        return np.asarray(Image.open(io.BytesIO(self.image_bytes(index))).convert('RGB'))
+
+    @property
+    def metadata(self) -> List[Dict]:
+        """metadata.json과 같은 형식의 샘플 목록"""
+        if self._metadata is None:
+            rows = []
+            for shard, index in enumerate(self._indexes):
+                hours = index['hour'].tolist()
+                minutes = index['minute'].tolist()
+                clock_types = index['clock_type'].tolist()
+                extras = self._read_extras(shard, len(hours))
+                for position, (hour, minute, type_code) in enumerate(zip(hours, minutes, clock_types)):
+                    clock_type = CLOCK_TYPES[type_code]
+                    rows.append({
+                        'filename': packed_filename(self._starts[shard] + position, clock_type),
+                        'clock_type': clock_type,
+                        'hour': hour,
+                        'minute': minute,
+                        'time_string': f"{hour:02d}:{minute:02d}",
+                        **extras[position]
+                    })
+            self._metadata = rows
+        return self._metadata
+
+    def _read_extras(self, shard: int, count: int) -> List[Dict]:
+        """샤드 sidecar의 추가 필드 (없으면 빈 dict)"""
+        path = os.path.join(self.root, f"{self.manifest['shards'][shard]['name']}.meta.jsonl")
+        if not os.path.exists(path):
+            return [{}] * count
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def close(self):
+        for blob in self._blobs:
+            if isinstance(blob, mmap.mmap):
+                blob.close()
+        for f in self._files:
+            f.close()
+
+def pack_directory(src_dir: str, dst_dir: str, shard_size: int = 65536, with_tensor: bool = False) -> int:
+    """기존 PNG 디렉터리(metadata.json) 데이터셋을 packed 형식으로 변환"""
+    with open(os.path.join(src_dir, 'metadata.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    with PackedDatasetWriter(dst_dir, shard_size, with_tensor) as writer:
+        for sample in metadata:
+            with open(os.path.join(src_dir, sample['filename']), 'rb') as f:
+                png = f.read()
+            image = None
+            if with_tensor:
+                import io
+                from PIL import Image
+                image = np.asarray(Image.open(io.BytesIO(png)).convert('RGB'))
+            writer.add(png, sample, image)
+
+    return writer.count
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert a PNG dataset directory into packed shards')
+    parser.add_argument('src', help='Dataset directory with metadata.json')
+    parser.add_argument('dst', help='Output directory for packed shards')
+    parser.add_argument('--shard-size', type=int, default=65536, help='Samples per shard')
+    parser.add_argument('--tensor', action='store_true', help='Also write raw uint8 tensor shards')
+    args = parser.parse_args()
+
+    count = pack_directory(args.src, args.dst, args.shard_size, args.tensor)
+    print(f"Packed {count} samples into {args.dst}")
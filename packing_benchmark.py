@@ -0,0 +1,113 @@
+"""
+묶음 요청(한 요청에 시계 K개) 벤치마크
+K마다 같은 층화 샘플을 읽혀 정확도 vs 이미지당 토큰 vs 처리 시간을 비교합니다.
+
+사용법:
+    python packing_benchmark.py --pack-sizes 1 2 4 8 --samples 40
+    python packing_benchmark.py --estimate-only
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+from gpt4o_time_reader import (GPT4oTimeReader, PACK_INSTRUCTIONS, estimate_text_tokens,
+                               estimate_image_tokens, png_size)
+from dataset_loader import DatasetLoader
+
+def run_pack_size(api_key: Optional[str], pack_size: int, images: List, samples: List[Dict],
+                  prompt: Optional[str] = None) -> Dict:
+    """한 K로 샘플을 읽고 정확도와 이미지당 사용량 요약"""
+    reader = GPT4oTimeReader(api_key, pack_size=pack_size, cache=False)
+    started = time.perf_counter()
+    results = reader.batch_read_times(images, prompt, reuse_duplicates=False)
+    elapsed = time.perf_counter() - started
+    evaluation = reader.evaluate_results(results, samples)
+    count = max(1, len(results))
+    return {
+        "pack_size": pack_size,
+        "exact_match_accuracy": evaluation['exact_match_accuracy'],
+        "hour_accuracy": evaluation['hour_accuracy'],
+        "minute_accuracy": evaluation['minute_accuracy'],
+        "requests": reader.usage["requests"],
+        "fallbacks": reader.reliability["pack_fallbacks"],
+        "errors": sum(1 for r in results if 'error' in r),
+        "prompt_tokens_per_image": reader.usage["prompt_tokens"] / count,
+        "completion_tokens_per_image": reader.usage["completion_tokens"] / count,
+        "seconds_per_image": elapsed / count,
+        "avg_request_latency": reader.usage["latency"] / max(1, reader.usage["requests"])
+    }
+
+def estimate_pack_size(pack_size: int, prompt: str, native_size: int) -> Dict:
+    """API 호출 없이 이미지당 입력 토큰 추정 (--estimate-only)"""
+    text = prompt + (PACK_INSTRUCTIONS.format(count=pack_size) if pack_size > 1 else '')
+    image = estimate_image_tokens(native_size, native_size)
+    labels = estimate_text_tokens("이미지 10") * pack_size if pack_size > 1 else 0
+    return {
+        "pack_size": pack_size,
+        "prompt_tokens_per_image": (estimate_text_tokens(text) + labels) / pack_size + image
+    }
+
+def print_table(summaries: Sequence[Dict]):
+    if 'exact_match_accuracy' not in summaries[0]:
+        print(f"{'K':>4}{'prompt tok/img':>16}")
+        for s in summaries:
+            print(f"{s['pack_size']:>4}{s['prompt_tokens_per_image']:>16.0f}")
+        return
+
+    print(f"{'K':>4}{'exact':>8}{'hour':>8}{'minute':>8}{'requests':>10}{'fallback':>10}"
+          f"{'prompt tok/img':>16}{'s/img':>8}{'req s':>8}{'errors':>8}")
+    for s in summaries:
+        print(f"{s['pack_size']:>4}{s['exact_match_accuracy']:>8.1%}{s['hour_accuracy']:>8.1%}"
+              f"{s['minute_accuracy']:>8.1%}{s['requests']:>10d}{s['fallbacks']:>10d}"
+              f"{s['prompt_tokens_per_image']:>16.0f}{s['seconds_per_image']:>8.3f}"
+              f"{s['avg_request_latency']:>8.2f}{s['errors']:>8d}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reading K clocks per chat request')
+    parser.add_argument('--pack-sizes', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Images per request to compare')
+    parser.add_argument('--samples', type=int, default=40, help='Stratified samples per setting')
+    parser.add_argument('--seed', type=int, default=0, help='Sampling seed')
+    parser.add_argument('--dataset', default='dataset', help='Dataset directory')
+    parser.add_argument('--prompt-file', help='Read the prompt from this file instead of the default')
+    parser.add_argument('--estimate-only', action='store_true', help='Only estimate tokens, no API calls')
+    parser.add_argument('--output', default='packing_benchmark.json', help='Where to save the results')
+    args = parser.parse_args()
+
+    loader = DatasetLoader(args.dataset)
+    if not loader.exists():
+        print("Dataset not found. Please run dataset_generator.py first.")
+        return
+
+    samples = loader.index.subset('packing_benchmark', args.samples, args.seed)
+    images = loader.images(samples)
+    print(f"{len(samples)} samples, pack sizes {args.pack_sizes}")
+
+    prompt = None
+    if args.prompt_file:
+        with open(args.prompt_file, 'r', encoding='utf-8') as f:
+            prompt = f.read()
+
+    if args.estimate_only:
+        reader = GPT4oTimeReader('-')
+        native_size = max(png_size(reader.image_bytes(images[0]))) if images else 256
+        summaries = [estimate_pack_size(k, prompt or reader.base_prompt, native_size) for k in args.pack_sizes]
+    else:
+        api_key = os.getenv('OPENAI_API_KEY')
+        summaries = []
+        for pack_size in args.pack_sizes:
+            print(f"\n=== K={pack_size} ===")
+            summaries.append(run_pack_size(api_key, pack_size, images, samples, prompt))
+
+    print()
+    print_table(summaries)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"samples": len(samples), "seed": args.seed, "results": summaries},
+                  f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
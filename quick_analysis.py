@@ -6,6 +6,7 @@ import os
 import json
 from gpt4o_time_reader import GPT4oTimeReader
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
 
 def analyze_prompt_performance():
     api_key = os.getenv('OPENAI_API_KEY')
@@ -72,12 +73,12 @@ Instructions:
 Use these refined instructions to accurately determine and format the time from the analog clock image."""
 
     # 데이터셋 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    loader = DatasetLoader()
+    dataset = loader.samples
     
     # 작은 샘플로 빠른 테스트 (10개만)
     test_samples = dataset[:10]
-    image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    image_paths = loader.images(test_samples)
     
     reader = GPT4oTimeReader(api_key)
     evaluator = SeparateEvaluationSystem()
@@ -6,13 +6,14 @@ import os
 import json
 import random
 from textgrad_fixed import TextGradOptimizer
+from dataset_loader import DatasetLoader
 
 def main():
     api_key = os.getenv('OPENAI_API_KEY')
     
     # 데이터셋 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    loader = DatasetLoader()
+    dataset = loader.samples
     
     print("🚀 빠른 프롬프트 최적화 시작!")
     print(f"전체 데이터셋: {len(dataset)}개")
@@ -0,0 +1,164 @@
+"""
+API 요청 속도 제한기
+분당 요청 수(RPM)와 분당 토큰 수(TPM)를 토큰 버킷 두 개로 관리하고,
+응답의 x-ratelimit-* 헤더와 429 응답의 retry-after로 남은 한도를 맞춥니다.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+# "1s", "6m0s", "20ms", "1h2m3.5s" 형식의 재설정 시간
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNIT_SECONDS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+def parse_duration(text: Optional[str]) -> Optional[float]:
+    """재설정 시간 문자열을 초로 (읽을 수 없으면 None)"""
+    if not text:
+        return None
+    parts = _DURATION.findall(text)
+    if not parts:
+        try:
+            return float(text)
+        except ValueError:
+            return None
+    return sum(float(value) * _UNIT_SECONDS[unit] for value, unit in parts)
+
+def retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """429 응답의 재시도 대기 시간 (retry-after-ms → retry-after → 토큰/요청 재설정 시간)"""
+    if not headers:
+        return None
+    if headers.get('retry-after-ms'):
+        try:
+            return float(headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    for key in ('retry-after', 'x-ratelimit-reset-tokens', 'x-ratelimit-reset-requests'):
+        delay = parse_duration(headers.get(key))
+        if delay is not None:
+            return delay
+    return None
+
+# 버킷에 쌓아 둘 수 있는 양 (초 단위 한도만큼, 서버는 분당 한도를 더 짧은 구간으로 나눠 적용함)
+BURST_SECONDS = 1.0
+
+class TokenBucket:
+    """분당 limit 속도로 채워지는 버킷 (limit=None이면 제한 없음)
+
+    reserve는 잔량을 먼저 빼고 잔량이 0 이상이 될 때까지의 대기 시간을 돌려준다.
+    잔량이 음수가 될 수 있으므로 먼저 예약한 요청이 먼저 나간다.
+    """
+
+    def __init__(self, limit: Optional[float] = None, burst_seconds: float = BURST_SECONDS):
+        self.limit = limit
+        self.burst_seconds = burst_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def capacity(self) -> float:
+        if self.limit is None:
+            return 0.0
+        return max(1.0, self.limit * self.burst_seconds / 60)
+
+    def _refill(self, now: float):
+        if self.limit is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        if self.limit is None:
+            return 0.0
+        # 한 번에 분당 한도보다 큰 요청도 언젠가는 나가도록 한도로 자름
+        self.level -= min(amount, self.limit)
+        return max(0.0, -self.level * 60 / self.limit)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float):
+        """헤더의 한도/잔량에 맞춤 (서버가 본 잔량보다 많이 남았다고 믿지 않음)"""
+        self._refill(now)
+        if limit is not None and limit != self.limit:
+            learned = self.limit is None
+            self.limit = limit
+            if learned:
+                self.level = self.capacity
+        if remaining is not None and self.limit is not None:
+            self.level = min(self.level, remaining)
+
+class RateLimiter:
+    """RPM/TPM 제한기 (스레드와 asyncio 양쪽에서 사용)
+
+    rpm/tpm을 주지 않은 쪽은 첫 응답 헤더의 x-ratelimit-limit-*로 학습한다.
+    사용법: delay = limiter.reserve(tokens) 후 delay만큼 (비)동기로 기다렸다가 요청.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'reserved': 0, 'delayed': 0, 'wait_seconds': 0.0, 'rate_limited': 0}
+
+    def reserve(self, tokens: int) -> float:
+        """요청 1건과 tokens개를 예약하고 기다려야 할 시간(초) 반환"""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now),
+                        self._blocked_until - now)
+            self.stats['reserved'] += 1
+            if delay > 0:
+                self.stats['delayed'] += 1
+                self.stats['wait_seconds'] += delay
+            return delay
+
+    def update(self, headers: Optional[Mapping[str, str]]):
+        """응답 헤더의 x-ratelimit-limit/remaining-{requests,tokens} 반영"""
+        if not headers:
+            return
+
+        def number(key: str) -> Optional[float]:
+            try:
+                return float(headers[key]) if headers.get(key) else None
+            except ValueError:
+                return None
+
+        with self._lock:
+            now = time.monotonic()
+            self.requests.sync(number('x-ratelimit-limit-requests'),
+                               number('x-ratelimit-remaining-requests'), now)
+            self.tokens.sync(number('x-ratelimit-limit-tokens'),
+                             number('x-ratelimit-remaining-tokens'), now)
+
+    def rate_limited(self, headers: Optional[Mapping[str, str]] = None, default_delay: float = 1.0) -> float:
+        """429를 받았을 때 호출: 모든 요청을 retry-after 동안 멈추고 그 시간 반환"""
+        delay = retry_after(headers)
+        delay = default_delay if delay is None else delay
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self.stats['rate_limited'] += 1
+        self.update(headers)
+        return delay
+
+    def summary(self) -> Dict:
+        """통계와 현재 학습된 한도"""
+        return {**self.stats, 'rpm': self.requests.limit, 'tpm': self.tokens.limit}
+
+# 같은 API 키(같은 할당량)를 쓰는 리더끼리 공유하는 제한기
+_SHARED: Dict[str, RateLimiter] = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_limiter(key: str, rpm: Optional[float] = None, tpm: Optional[float] = None) -> RateLimiter:
+    """키별 공용 제한기 (처음 만들 때의 rpm/tpm 사용, 이후 지정하면 갱신)"""
+    with _SHARED_LOCK:
+        limiter = _SHARED.get(key)
+        if limiter is None:
+            limiter = _SHARED[key] = RateLimiter(rpm, tpm)
+        else:
+            with limiter._lock:
+                now = time.monotonic()
+                if rpm is not None:
+                    limiter.requests.sync(rpm, None, now)
+                if tpm is not None:
+                    limiter.tokens.sync(tpm, None, now)
+        return limiter
@@ -0,0 +1,128 @@
+"""
+API 호출 복원력 도구
+지수 백오프 + 지터 재시도 정책, 재시도 가능 오류 분류, 서킷 브레이커를 제공합니다.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+import openai
+
+# 일시적인 서버 측 오류로 보는 HTTP 상태 코드
+RETRYABLE_STATUS = (408, 409, 500, 502, 503, 504)
+
+def is_retryable(error: BaseException) -> bool:
+    """다시 보내면 성공할 수 있는 오류인지 (429는 rate_limiter가 따로 처리)"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError,
+                          asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+def is_timeout(error: BaseException) -> bool:
+    return isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError, TimeoutError))
+
+class RetryPolicy:
+    """지수 백오프 재시도 정책 (full jitter: 0 ~ min(max_delay, base_delay × 2^retry) 균등 분포)"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 20.0,
+                 jitter: bool = True):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """attempt번째(0부터) 시도가 error로 실패했을 때 다시 시도할지"""
+        return attempt + 1 < self.max_attempts and is_retryable(error)
+
+    def delay(self, attempt: int) -> float:
+        """attempt번째 시도 실패 후 기다릴 시간(초)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 요청을 보내지 않고 바로 실패"""
+
+class CircuitBreaker:
+    """연속 실패가 failure_threshold번이면 reset_timeout초 동안 요청을 막는 서킷 브레이커
+
+    closed → (연속 실패) → open → (reset_timeout 경과) → half_open: 시험 요청 하나만 통과
+    → 성공하면 closed, 실패하면 다시 open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+        self._probe_id = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> int:
+        """요청을 보내도 되면 반환, 아니면 CircuitOpenError
+
+        half_open의 시험 요청이면 시험 번호(0보다 큼)를 돌려준다. 시험 요청은 성공/실패를 기록하지
+        못하고 끝나더라도 (429, 400, 취소 등) release(번호)로 반드시 풀어야 한다.
+        """
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'closed':
+                return 0
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                self._probe_id += 1
+                return self._probe_id
+            remaining = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"Circuit open after {self.failures} consecutive failures "
+                               f"(retry in {remaining:.1f}s)")
+
+    def release(self, probe: int):
+        """결과 없이 끝난 시험 요청을 풀어 다음 요청이 다시 시험하게 함 (이미 기록됐으면 아무것도 안 함)"""
+        with self._lock:
+            if probe and probe == self._probe_id and self.state == 'half_open':
+                self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.trips += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def summary(self) -> Dict:
+        return {'state': self.state, 'consecutive_failures': self.failures, 'trips': self.trips}
+
+# 같은 API 키(같은 백엔드)를 쓰는 리더끼리 공유하는 서킷 브레이커
+_SHARED: Dict[str, CircuitBreaker] = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_breaker(key: str, failure_threshold: Optional[int] = None,
+                   reset_timeout: Optional[float] = None) -> CircuitBreaker:
+    """키별 공용 서킷 브레이커 (인자를 주면 설정 갱신)"""
+    with _SHARED_LOCK:
+        breaker = _SHARED.get(key)
+        if breaker is None:
+            breaker = _SHARED[key] = CircuitBreaker()
+        if failure_threshold is not None:
+            breaker.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            breaker.reset_timeout = reset_timeout
+        return breaker
@@ -0,0 +1,187 @@
+"""
+API 응답 디스크 캐시
+(이미지 내용 해시, 프롬프트 해시, 모델 파라미터)를 키로 파싱된 응답을 SQLite(WAL)에 저장합니다.
+여러 프로세스가 같은 캐시를 동시에 써도 안전하며, 크기 한도를 넘으면 오래 안 쓴 항목부터 지웁니다.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+CACHE_FILENAME = 'responses.sqlite3'
+DEFAULT_CACHE_DIR = './textgrad_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 한도 확인은 이만큼 기록할 때마다 한 번 (매번 전체 크기를 세지 않음)
+EVICTION_CHECK_INTERVAL = 64
+
+# 적중 때 사용 시각은 메모리에 모았다가 이만큼 쌓이거나 정리할 때 한 트랜잭션으로 기록
+ACCESS_FLUSH_INTERVAL = 256
+
+def cache_dir() -> str:
+    """TEXTGRAD_CACHE_DIR (없으면 ./textgrad_cache)"""
+    return os.getenv('TEXTGRAD_CACHE_DIR') or DEFAULT_CACHE_DIR
+
+def content_hash(data) -> str:
+    """문자열/바이트 내용의 sha256"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def cache_key(image_hash: str, prompt: str, params: Dict) -> str:
+    """이미지 해시 + 프롬프트 해시 + 모델 파라미터(model, temperature, max_tokens, detail 등) 키"""
+    return content_hash(json.dumps({'image': image_hash, 'prompt': content_hash(prompt), **params},
+                                   sort_keys=True, default=str))
+
+class ResponseCache:
+    """SQLite WAL 응답 캐시 (max_bytes를 넘으면 마지막 사용 시각이 오래된 순으로 90%까지 정리)"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or cache_dir()
+        self.max_bytes = max_bytes
+        self.path = os.path.join(self.directory, CACHE_FILENAME)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._writes_since_check = 0
+        # 아직 기록하지 않은 적중: 키 → (마지막 사용 시각, 적중 수)
+        self._accessed: Dict[str, Tuple[float, int]] = {}
+
+    def get(self, key: str) -> Optional[Dict]:
+        """캐시된 응답 (없으면 None), 찾으면 사용 시각 갱신 (적중마다 쓰지 않고 모아서 기록)"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            _, hits = self._accessed.get(key, (0.0, 0))
+            self._accessed[key] = (time.time(), hits + 1)
+            self.stats['hits'] += 1
+            if len(self._accessed) >= ACCESS_FLUSH_INTERVAL:
+                self._flush_accessed()
+        return json.loads(row[0])
+
+    def _flush_accessed(self):
+        """모아 둔 사용 시각과 적중 수를 한 트랜잭션으로 기록 (_lock 안에서 호출)"""
+        if not self._accessed:
+            return
+        updates = [(accessed, hits, key) for key, (accessed, hits) in self._accessed.items()]
+        self._accessed = {}
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany("UPDATE responses SET accessed = MAX(accessed, ?), hits = hits + ? "
+                                   "WHERE key = ?", updates)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def put(self, key: str, response: Dict):
+        """응답 저장 (같은 키면 덮어씀)"""
+        text = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, response, size, created, accessed) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, text, len(text.encode('utf-8')), now, now))
+            self.stats['writes'] += 1
+            self._writes_since_check += 1
+            if self._writes_since_check >= EVICTION_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict()
+
+    def _evict(self):
+        """크기 한도를 넘었으면 오래 안 쓴 항목부터 90%까지 삭제 (_lock 안에서 호출)"""
+        # 최근 적중이 반영된 사용 시각 순으로 지우도록 먼저 기록
+        self._flush_accessed()
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self.stats['evictions'] += len(keys)
+
+    def evict(self):
+        """지금 바로 크기 한도 적용"""
+        with self._lock:
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._accessed = {}
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("VACUUM")
+
+    def summary(self) -> Dict:
+        """이 프로세스의 적중/실패 통계와 캐시 전체 크기"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {**self.stats, 'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+                'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'path': self.path}
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.close()
+
+# 경로별로 한 프로세스에서 하나만 여는 공용 캐시
+_SHARED: Dict[str, ResponseCache] = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_cache(directory: Optional[str] = None, max_bytes: Optional[int] = None) -> ResponseCache:
+    """디렉터리별 공용 캐시 (리더 여러 개가 연결 하나를 같이 씀)"""
+    directory = os.path.abspath(directory or cache_dir())
+    with _SHARED_LOCK:
+        cache = _SHARED.get(directory)
+        if cache is None:
+            cache = _SHARED[directory] = ResponseCache(directory, max_bytes or DEFAULT_MAX_BYTES)
+        elif max_bytes is not None:
+            cache.max_bytes = max_bytes
+        return cache
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or trim the API response cache')
+    parser.add_argument('--dir', help='Cache directory (default: TEXTGRAD_CACHE_DIR or ./textgrad_cache)')
+    parser.add_argument('--max-mb', type=float, help='Evict down to this size now')
+    parser.add_argument('--clear', action='store_true', help='Delete every cached response')
+    args = parser.parse_args()
+
+    max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb else DEFAULT_MAX_BYTES
+    cache = ResponseCache(args.dir, max_bytes)
+    if args.clear:
+        cache.clear()
+    elif args.max_mb:
+        cache.evict()
+    summary = cache.summary()
+    print(f"{summary['path']}: {summary['entries']} responses, {summary['bytes'] / 1024:.1f} KB "
+          f"(limit {summary['max_bytes'] / 1024 / 1024:.0f} MB), {summary['evictions']} evicted")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
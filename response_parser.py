@@ -0,0 +1,203 @@
+"""
+시간 읽기 응답 파서
+구조화 출력(JSON schema)을 못 쓰는 백엔드의 응답에서도 설명 문장, 코드 블록,
+문자열 숫자가 섞여 있어도 시간을 꺼낼 수 있도록 관대하게 파싱합니다.
+"""
+
+import json
+import math
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 구조화 출력용 JSON schema (strict 모드는 모든 속성이 required, additionalProperties=false)
+READING_PROPERTIES = {
+    "hour": {"type": "integer", "description": "0-23"},
+    "minute": {"type": "integer", "description": "0-59"},
+    "confidence": {"type": "number", "description": "0.0-1.0"}
+}
+
+def reading_format() -> Dict:
+    """시계 하나 응답의 response_format"""
+    return {"type": "json_schema", "json_schema": {
+        "name": "clock_reading",
+        "strict": True,
+        "schema": {"type": "object", "properties": READING_PROPERTIES,
+                   "required": list(READING_PROPERTIES), "additionalProperties": False}
+    }}
+
+def packed_format() -> Dict:
+    """묶음 요청 응답의 response_format (최상위는 객체여야 하므로 readings 배열로 감쌈)"""
+    item = {"type": "object", "properties": {"index": {"type": "integer"}, **READING_PROPERTIES},
+            "required": ["index", *READING_PROPERTIES], "additionalProperties": False}
+    return {"type": "json_schema", "json_schema": {
+        "name": "clock_readings",
+        "strict": True,
+        "schema": {"type": "object", "properties": {"readings": {"type": "array", "items": item}},
+                   "required": ["readings"], "additionalProperties": False}
+    }}
+
+_DECODER = json.JSONDecoder()
+_TIME = re.compile(r'^\s*(\d{1,2})\s*[:시]\s*(\d{1,2})')
+# 괄호 짝 맞추기에 필요한 문자만 (백슬래시는 다음 문자와 함께 건너뜀)
+_STRUCTURE = re.compile(r'\\.|["{}\[\]]', re.DOTALL)
+_OPENERS = {'}': '{', ']': '['}
+
+def _balanced_spans(text: str) -> Iterator[List[Tuple[int, int]]]:
+    """균형 잡힌 {...}/[...] 구간을 한 번 훑어 최상위 묶음마다 (시작, 끝) 목록으로 (시작 위치 순)
+
+    괄호 안의 문자열과 이스케이프는 건너뛴다. 짝이 안 맞는 닫는 괄호나 끝까지 닫히지 않은 괄호를 만나면
+    그때까지 닫힌 안쪽 구간만 내보내고 다시 시작한다.
+    """
+    opened: List[Tuple[str, int]] = []
+    spans: List[Tuple[int, int]] = []
+    in_string = False
+    for match in _STRUCTURE.finditer(text):
+        token = match.group()
+        if in_string:
+            in_string = token != '"'
+            continue
+        char = token[-1]
+        position = match.end() - 1
+        if char == '"':
+            in_string = bool(opened)
+        elif char in '{[':
+            opened.append((char, position))
+        elif char in '}]':
+            if opened and opened[-1][0] == _OPENERS[char]:
+                spans.append((opened.pop()[1], position + 1))
+                if opened:
+                    continue
+            opened = []
+            if spans:
+                yield sorted(spans)
+                spans = []
+    if spans:
+        yield sorted(spans)
+
+def _nested(value: Any) -> Iterator[Any]:
+    """디코딩된 값과 그 안의 객체/배열을 텍스트 순서대로"""
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        yield value
+        children = value.values() if isinstance(value, dict) else value
+        stack.extend(reversed([child for child in children if isinstance(child, (dict, list))]))
+
+def iter_json(text: Optional[str]) -> Iterator[Any]:
+    """텍스트 안의 완결된 JSON 객체/배열을 앞에서부터 차례로
+
+    괄호 짝이 맞는 구간만 한 번 훑어 찾아 디코딩하므로 앞뒤 설명이나 코드 블록은 무시되고,
+    중첩된 객체도 바깥 객체 다음 후보로 나온다. 바깥 구간이 디코딩되면 안쪽은 다시 디코딩하지 않고,
+    실패하면 오류 위치를 품지 않은 안쪽 구간만 시도한다 (같은 위치에서 또 실패하므로).
+    """
+    if not text:
+        return
+    for spans in _balanced_spans(text):
+        # 구간끼리는 중첩되거나 떨어져 있으므로 조상 구간의 (끝, 디코딩됨, 오류 위치)를 스택으로 따라감
+        ancestors: List[Tuple[int, bool, int]] = []
+        for start, end in spans:
+            while ancestors and ancestors[-1][0] <= start:
+                ancestors.pop()
+            if ancestors:
+                _, decoded, error = ancestors[-1]
+                if decoded or start <= error < end:
+                    ancestors.append((end, decoded, error))
+                    continue
+            try:
+                value, _ = _DECODER.raw_decode(text, start)
+            except json.JSONDecodeError as e:
+                ancestors.append((end, False, e.pos))
+            except RecursionError:
+                # 너무 깊게 중첩된 구간은 안쪽도 읽기일 수 없으므로 통째로 건너뜀
+                ancestors.append((end, True, -1))
+            else:
+                yield from _nested(value)
+                ancestors.append((end, True, -1))
+
+def extract_json(text: Optional[str]) -> Any:
+    """텍스트에서 처음으로 완결된 JSON 객체/배열 (없으면 None)"""
+    return next(iter_json(text), None)
+
+def _number(value) -> Optional[float]:
+    """숫자 또는 숫자 문자열 ("07", "3.0")을 float로 (아니거나 유한하지 않으면 None)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return None
+    else:
+        return None
+    # "nan", Infinity 등은 int()에서 터지므로 숫자가 아닌 것으로 봄
+    return number if math.isfinite(number) else None
+
+def _integer(value, low: int, high: int) -> Optional[int]:
+    number = _number(value)
+    if number is None or number != int(number) or not low <= number <= high:
+        return None
+    return int(number)
+
+def coerce_reading(value: Any) -> Optional[Dict]:
+    """dict를 {'hour', 'minute', 'confidence'}로 정규화 (범위 밖이거나 없으면 None)
+
+    숫자 문자열은 숫자로, "HH:MM" 형식의 'time' 값도 받아들이고, confidence는 0~1로 자른다.
+    나머지 키(예: 'index', 'reasoning')는 그대로 남긴다.
+    """
+    if not isinstance(value, dict):
+        return None
+    hour, minute = value.get('hour'), value.get('minute')
+    if (hour is None or minute is None) and isinstance(value.get('time'), str):
+        match = _TIME.match(value['time'])
+        if match:
+            hour, minute = match.groups()
+    hour, minute = _integer(hour, 0, 23), _integer(minute, 0, 59)
+    if hour is None or minute is None:
+        return None
+    confidence = _number(value.get('confidence'))
+    reading = dict(value)
+    reading.update(hour=hour, minute=minute,
+                   confidence=0.0 if confidence is None else min(1.0, max(0.0, confidence)))
+    return reading
+
+def parse_reading(text: Optional[str]) -> Optional[Dict]:
+    """시계 하나 응답 텍스트 → 정규화된 읽기 (실패하면 None)
+
+    읽기로 해석되는 JSON이 나올 때까지 후보를 차례로 본다 ('Step [1]: ...' 같은 설명 속 괄호는 건너뜀).
+    """
+    for value in iter_json(text):
+        if isinstance(value, list):
+            value = value[0] if value else None
+        reading = coerce_reading(value)
+        if reading is not None:
+            return reading
+    return None
+
+def _packed_readings(value: Any, count: int) -> List[Optional[Dict]]:
+    readings: List[Optional[Dict]] = [None] * count
+    if isinstance(value, dict):
+        value = next((v for v in value.values() if isinstance(v, list)), [value])
+    if not isinstance(value, list):
+        return readings
+    for position, item in enumerate(value):
+        reading = coerce_reading(item)
+        if reading is None:
+            continue
+        index = _integer(reading.pop('index', position + 1), 1, count)
+        if index is not None and readings[index - 1] is None:
+            readings[index - 1] = reading
+    return readings
+
+def parse_readings(text: Optional[str], count: int) -> List[Optional[Dict]]:
+    """묶음 응답 텍스트 → 이미지 순서대로 정규화된 읽기 (읽지 못한 이미지는 None)
+
+    'index'(1부터)가 있으면 그 번호로, 없으면 배열 위치로 맞춘다.
+    읽기가 하나라도 나오는 첫 JSON 후보를 쓴다.
+    """
+    for value in iter_json(text):
+        readings = _packed_readings(value, count)
+        if any(reading is not None for reading in readings):
+            return readings
+    return [None] * count
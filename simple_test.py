@@ -6,6 +6,7 @@ import os
 import json
 from gpt4o_time_reader import GPT4oTimeReader
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
 
 def main():
     print("=" * 50)
@@ -16,12 +17,12 @@ def main():
     api_key = os.getenv('OPENAI_API_KEY')
     
     # 메타데이터 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    loader = DatasetLoader()
+    dataset = loader.samples
     
     # 처음 20개 샘플로 테스트
     test_samples = dataset[:20]
-    image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    image_paths = loader.images(test_samples)
     
     print(f"Testing GPT-4o with {len(test_samples)} samples...")
     print("Sample images:")
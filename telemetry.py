@@ -0,0 +1,233 @@
+"""
+API 호출 텔레메트리
+호출마다 한 줄씩 (시간, 대기 시간, 토큰, 모델, 재시도, 결과)을 logs/api_calls.jsonl에 기록하고
+(크기가 넘으면 api_calls.jsonl.1, .2 ...로 순환), 실행별 지연 시간 백분위와 비용을 요약합니다.
+
+사용법:
+    python telemetry.py              # 마지막 실행 요약
+    python telemetry.py --all        # 모든 실행
+    python telemetry.py --run 20240101-120000-1234
+"""
+
+import argparse
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
+import numpy as np
+from cassette import REPLAY_HEADER, shared_cassette
+
+TELEMETRY_DIR = os.getenv('OPENAI_TELEMETRY_DIR', 'logs')
+TELEMETRY_FILE = 'api_calls.jsonl'
+TELEMETRY_MAX_BYTES = 20 * 1024 * 1024
+TELEMETRY_BACKUPS = 5
+TELEMETRY_ENABLED = os.getenv('OPENAI_TELEMETRY', '1').lower() not in ('0', 'false', 'no')
+
+# 모델별 100만 토큰당 가격 (USD): 입력, 캐시된 입력, 출력. Batch API는 절반
+PRICES = {
+    'gpt-4o': (2.50, 1.25, 10.00),
+    'gpt-4o-mini': (0.15, 0.075, 0.60)
+}
+BATCH_DISCOUNT = 0.5
+
+# 이 프로세스의 실행 ID (요약을 실행별로 묶는 데 사용)
+RUN_ID = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+class TelemetryLog:
+    """JSONL 호출 기록 (logging의 RotatingFileHandler로 크기별 순환, 스레드 안전)"""
+
+    def __init__(self, directory: str = TELEMETRY_DIR, max_bytes: int = TELEMETRY_MAX_BYTES,
+                 backups: int = TELEMETRY_BACKUPS):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, TELEMETRY_FILE)
+        self._logger = logging.getLogger(f"telemetry.{os.path.abspath(self.path)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(self.path, maxBytes=max_bytes,
+                                                           backupCount=backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+    def write(self, record: Dict):
+        self._logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+_SHARED: Dict[str, TelemetryLog] = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared_telemetry(directory: Optional[str] = None) -> Optional[TelemetryLog]:
+    """디렉터리별 공용 기록기 (OPENAI_TELEMETRY=0이면 None)"""
+    if not TELEMETRY_ENABLED:
+        return None
+    directory = os.path.abspath(directory or TELEMETRY_DIR)
+    with _SHARED_LOCK:
+        log = _SHARED.get(directory)
+        if log is None:
+            log = _SHARED[directory] = TelemetryLog(directory)
+        return log
+
+def record_call(source: str, model: str, response=None, wall_time: float = 0.0,
+                latency: Optional[float] = None, queue_time: float = 0.0, attempts: int = 1,
+                retries: int = 0, outcome: str = 'ok', error: Union[BaseException, str, None] = None,
+                **extra) -> Optional[Dict]:
+    """API 호출 하나 기록 (response의 usage에서 토큰 수를 읽음)
+
+    source: 'reader' / 'batch' / 'optimizer' 등 호출한 곳
+    wall_time: 대기와 재시도를 포함한 전체 시간, latency: 성공한 시도 하나의 시간
+    queue_time: 동시성 제한과 속도 제한으로 기다린 시간
+    outcome: 'ok' / 'parse_error' / 'cached' / 'error'
+    """
+    log = shared_telemetry()
+    if log is None:
+        return None
+    usage = getattr(response, 'usage', None)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    record = {
+        "ts": time.time(),
+        "run_id": RUN_ID,
+        "source": source,
+        "model": getattr(response, 'model', None) or model,
+        "outcome": 'error' if error is not None else outcome,
+        "wall_time": round(wall_time, 4),
+        "latency": None if latency is None else round(latency, 4),
+        "queue_time": round(queue_time, 4),
+        "attempts": attempts,
+        "retries": retries,
+        "prompt_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+        "completion_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+        "cached_tokens": getattr(details, 'cached_tokens', 0) or 0,
+        **extra
+    }
+    if error is not None:
+        record["error"] = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+    log.write(record)
+    return record
+
+def logged_completion(client, source: str, **request):
+    """client.chat.completions.create(**request)를 부르고 기록 (실패도 기록한 뒤 다시 던짐)
+
+    공용 카세트가 있으면 녹화하거나 카세트에서 재생한다 (재생한 호출은 'replayed'로 기록).
+    """
+    cassette = shared_cassette()
+    started = time.perf_counter()
+    try:
+        if cassette is None:
+            response, headers = client.chat.completions.create(**request), {}
+        else:
+            response, headers = cassette.complete(request, lambda: (client.chat.completions.create(**request), {}))
+    except Exception as e:
+        record_call(source, request.get('model'), wall_time=time.perf_counter() - started, error=e)
+        raise
+    elapsed = time.perf_counter() - started
+    record_call(source, request.get('model'), response, elapsed, elapsed,
+                **({"replayed": True} if REPLAY_HEADER in headers else {}))
+    return response
+
+def call_cost(record: Dict) -> float:
+    """기록 하나의 비용 (USD, 가격표에 없는 모델은 gpt-4o 가격, 스냅샷 이름은 접두어로 찾음, 재생은 0)"""
+    if record.get("replayed"):
+        return 0.0
+    model = record.get("model") or 'gpt-4o'
+    prices = next((PRICES[name] for name in sorted(PRICES, key=len, reverse=True)
+                   if model.startswith(name)), PRICES['gpt-4o'])
+    cached = record.get("cached_tokens", 0)
+    cost = ((record.get("prompt_tokens", 0) - cached) * prices[0] + cached * prices[1]
+            + record.get("completion_tokens", 0) * prices[2]) / 1_000_000
+    return cost * BATCH_DISCOUNT if record.get("batch") else cost
+
+def read_records(directory: Optional[str] = None) -> Iterator[Dict]:
+    """순환된 파일까지 오래된 순서로 모든 기록"""
+    path = os.path.join(directory or TELEMETRY_DIR, TELEMETRY_FILE)
+    backups = [name for name in glob.glob(path + '.*') if name.rsplit('.', 1)[1].isdigit()]
+    # .1이 가장 최근 순환 파일
+    for name in sorted(backups, key=lambda name: int(name.rsplit('.', 1)[1]), reverse=True) + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+def summarize(records: List[Dict]) -> Dict:
+    """호출 수, 결과별 수, 지연 시간 백분위, 토큰, 비용"""
+    calls = [r for r in records if r.get("outcome") != 'cached']
+    # Batch API 결과는 호출별 시간이 없으므로 시간 백분위에서 제외
+    timed = [r for r in calls if not r.get("batch")]
+    wall = [r["wall_time"] for r in timed if r.get("outcome") != 'error']
+    latency = [r["latency"] for r in timed if r.get("latency") is not None]
+    outcomes: Dict[str, int] = {}
+    for r in records:
+        outcomes[r.get("outcome", 'ok')] = outcomes.get(r.get("outcome", 'ok'), 0) + 1
+
+    def percentiles(values: List[float]) -> Dict:
+        if not values:
+            return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+    return {
+        "calls": len(calls),
+        "outcomes": outcomes,
+        "retries": sum(r.get("retries", 0) for r in calls),
+        "replayed": sum(1 for r in calls if r.get("replayed")),
+        "wall_time": percentiles(wall),
+        "latency": percentiles(latency),
+        "queue_time": percentiles([r.get("queue_time", 0.0) for r in timed]),
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in calls),
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in calls),
+        "cached_tokens": sum(r.get("cached_tokens", 0) for r in calls),
+        "cost": sum(call_cost(r) for r in calls)
+    }
+
+def print_summary(run_id: str, records: List[Dict]):
+    summary = summarize(records)
+    started = datetime.fromtimestamp(records[0]["ts"]).strftime('%Y-%m-%d %H:%M:%S')
+    print(f"\n=== Run {run_id} ({started}) ===")
+    outcomes = ', '.join(f"{k} {v}" for k, v in sorted(summary["outcomes"].items()))
+    replayed = f", {summary['replayed']} replayed from cassette" if summary['replayed'] else ''
+    print(f"Calls: {summary['calls']} ({outcomes}), {summary['retries']} retries{replayed}")
+    for name in ("wall_time", "latency", "queue_time"):
+        p = summary[name]
+        print(f"{name:<11} p50 {p['p50']:.2f}s  p95 {p['p95']:.2f}s  p99 {p['p99']:.2f}s")
+    print(f"Tokens: {summary['prompt_tokens']} prompt ({summary['cached_tokens']} cached), "
+          f"{summary['completion_tokens']} completion")
+    print(f"Cost: ${summary['cost']:.4f}")
+
+    sources = sorted({r.get("source") for r in records})
+    if len(sources) > 1:
+        for source in sources:
+            part = summarize([r for r in records if r.get("source") == source])
+            print(f"  {source:<10} {part['calls']:>6} calls  p95 {part['wall_time']['p95']:.2f}s  "
+                  f"${part['cost']:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize per-call API telemetry')
+    parser.add_argument('--dir', default=TELEMETRY_DIR, help='Telemetry directory')
+    parser.add_argument('--run', help='Only this run ID')
+    parser.add_argument('--all', action='store_true', help='Summarize every run, not just the last')
+    args = parser.parse_args()
+
+    runs: Dict[str, List[Dict]] = {}
+    for record in read_records(args.dir):
+        runs.setdefault(record.get("run_id", '?'), []).append(record)
+    if args.run:
+        runs = {args.run: runs.get(args.run, [])}
+    elif not args.all and runs:
+        last = max(runs, key=lambda run: runs[run][-1]["ts"])
+        runs = {last: runs[last]}
+    if not any(runs.values()):
+        print(f"No telemetry in {args.dir}")
+        return
+    for run_id, records in runs.items():
+        if records:
+            print_summary(run_id, records)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import os
 import json
 from gpt4o_time_reader import GPT4oTimeReader
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
 
 def main():
     api_key = os.getenv('OPENAI_API_KEY')
@@ -73,11 +74,11 @@ Respond strictly in the specified JSON format, ensuring accuracy and reflection
 - JSON 형식으로만 답변하세요"""
 
     # 데이터셋 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    loader = DatasetLoader()
+    dataset = loader.samples
     
     test_samples = dataset[:20]  # 20개 샘플로 테스트
-    image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    image_paths = loader.images(test_samples)
     
     reader = GPT4oTimeReader(api_key)
     evaluator = SeparateEvaluationSystem()
@@ -5,6 +5,7 @@ API 키 없이 평가 시스템 테스트
 import json
 import os
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
 
 def create_mock_predictions(ground_truth):
     """모의 예측 결과 생성 (API 키 없이 테스트용)"""
@@ -47,8 +48,8 @@ def main():
     print("=" * 50)
     
     # 메타데이터 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    loader = DatasetLoader()
+    dataset = loader.samples
     
     # 처음 50개 샘플로 테스트
     test_samples = dataset[:50]
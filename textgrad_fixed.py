@@ -2,13 +2,15 @@
 Python 3.8 호환 TextGrad 대체 구현
 """
 
-import openai
 import json
 import os
-import random
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from gpt4o_time_reader import GPT4oTimeReader
+from client_registry import shared_client
+from telemetry import logged_completion
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
+from dataset_index import DatasetIndex, Seed, as_index
 
 class Variable:
     """TextGrad Variable 대체 클래스"""
@@ -23,7 +25,7 @@ class Variable:
         if not self.requires_grad:
             return
         
-        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        client = shared_client(os.getenv('OPENAI_API_KEY'))
         
         improvement_prompt = f"""You are a prompt engineering expert. Improve the following prompt based on the feedback.
 
@@ -38,7 +40,8 @@ Please provide an improved version that addresses the issues mentioned in the fe
 Improved prompt:"""
 
         try:
-            response = client.chat.completions.create(
+            response = logged_completion(
+                client, 'backward',
                 model="gpt-4o",
                 messages=[{"role": "user", "content": improvement_prompt}],
                 max_tokens=800,
@@ -54,11 +57,13 @@ Improved prompt:"""
 class TextGradOptimizer:
     """TextGrad 스타일 최적화기"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, dataset_dir: str = "dataset", seed: int = 0):
         self.api_key = api_key
         os.environ['OPENAI_API_KEY'] = api_key
         self.time_reader = GPT4oTimeReader(api_key)
         self.evaluator = SeparateEvaluationSystem()
+        self.loader = DatasetLoader(dataset_dir)
+        self.seed = seed
         
         # 초기 프롬프트들
         self.initial_prompts = [
@@ -137,10 +142,11 @@ JSON only.""",
 Return JSON only."""
         ]
     
-    def evaluate_prompt(self, prompt: str, test_data: List[Dict], max_samples: int = 15) -> tuple:
-        """프롬프트 평가"""
-        test_samples = random.sample(test_data, min(max_samples, len(test_data)))
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    def evaluate_prompt(self, prompt: str, test_data: Union[List[Dict], DatasetIndex], max_samples: int = 15,
+                        seed: Seed = None) -> tuple:
+        """프롬프트 평가 (seed가 없으면 같은 데이터에서는 항상 같은 샘플로 비교)"""
+        test_samples = as_index(test_data).sample(max_samples, self.seed if seed is None else seed)
+        image_paths = self.loader.images(test_samples)
         
         predictions = self.time_reader.batch_read_times(image_paths, prompt)
         evaluation = self.evaluator.comprehensive_evaluation(predictions, test_samples)
@@ -206,11 +212,8 @@ IMPROVEMENT NEEDED:
         print("🚀 TextGrad 스타일 프롬프트 최적화 시작!")
         print("=" * 60)
         
-        # 데이터 분할
-        random.shuffle(dataset)
-        split_idx = int(len(dataset) * 0.7)
-        train_data = dataset[:split_idx]
-        val_data = dataset[split_idx:]
+        # 데이터 분할 (시간대별 층화)
+        train_data, val_data = as_index(dataset).split(0.7, seed=self.seed)
         
         print(f"훈련: {len(train_data)}개, 검증: {len(val_data)}개")
         
@@ -248,7 +251,7 @@ IMPROVEMENT NEEDED:
             
             # 현재 프롬프트 평가
             train_score, train_eval, train_preds, train_gt = self.evaluate_prompt(
-                best_prompt_var.value, train_data, samples_per_iter
+                best_prompt_var.value, train_data, samples_per_iter, seed=[self.seed, iteration]
             )
             
             print(f"현재 훈련 성능: {train_score:.1%}")
@@ -315,12 +318,12 @@ IMPROVEMENT NEEDED:
 def main():
     api_key = os.getenv('OPENAI_API_KEY')
     
+    optimizer = TextGradOptimizer(api_key)
+    
     # 데이터셋 로드
-    with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-        dataset = json.load(f)
+    dataset = optimizer.loader.samples
     
     # TextGrad 스타일 최적화
-    optimizer = TextGradOptimizer(api_key)
     optimized_prompt = optimizer.optimize(dataset, num_iterations=3, samples_per_iter=15)
     
     print(f"\n🎉 TextGrad 스타일 최적화 완료!")
@@ -3,19 +3,89 @@ TextGrad를 사용한 프롬프트 최적화
 """
 
 import textgrad as tg
+import inspect
 import json
 import os
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple, Union
+from client_registry import shared_client
 from gpt4o_time_reader import GPT4oTimeReader
-import random
+from dataset_loader import DatasetLoader
+from dataset_index import DatasetIndex, Seed, as_index
+from telemetry import logged_completion
+
+try:
+    from textgrad.engine import EngineLM
+except ImportError:  # 엔진 모듈 위치가 다른 textgrad 버전
+    EngineLM = None
+
+# LoggedEngine을 쓸 수 없을 때 쓰는 textgrad 기본 엔진
+FALLBACK_ENGINE = "gpt-4o"
+
+def check_engine(engine) -> Optional[str]:
+    """textgrad가 역전파 엔진을 부르는 방식과 맞는지 확인 (API는 부르지 않음, 맞지 않으면 이유)
+
+    textgrad는 EngineLM 인스턴스만 받고 engine(prompt, system_prompt=...) 형태로 부른다.
+    """
+    if EngineLM is None:
+        return "textgrad.engine.EngineLM is not available"
+    if not isinstance(engine, EngineLM):
+        return f"{type(engine).__name__} is not a textgrad EngineLM"
+    missing = getattr(type(engine), '__abstractmethods__', ())
+    if missing:
+        return f"{type(engine).__name__} does not implement {', '.join(sorted(missing))}"
+    for method in (engine.generate, engine.__call__):
+        try:
+            inspect.signature(method).bind("prompt", system_prompt="system")
+        except TypeError as e:
+            return f"{type(engine).__name__}.{method.__name__} cannot be called like textgrad does: {e}"
+    return None
+
+class LoggedEngine(EngineLM or object):
+    """TextGrad 역전파 엔진 (공용 클라이언트 + logged_completion)
+
+    textgrad 기본 엔진은 자체 OpenAI 클라이언트로 요청하므로 텔레메트리와 카세트 녹화/재생을
+    거치지 않는다. 이 엔진으로 바꾸면 역전파 호출도 기록되고 재생할 때 API를 부르지 않는다.
+    """
+    
+    system_prompt = "You are a helpful, creative, and smart assistant."
+    
+    def __init__(self, model_string: str = "gpt-4o", api_key: Optional[str] = None):
+        self.model_string = model_string
+        self.client = shared_client(api_key)
+    
+    def generate(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0,
+                 max_tokens: int = 2000, top_p: float = 0.99, **kwargs) -> str:
+        response = logged_completion(
+            self.client, 'textgrad',
+            model=self.model_string,
+            messages=[
+                {"role": "system", "content": system_prompt or self.system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p
+        )
+        return response.choices[0].message.content
+    
+    def __call__(self, prompt: str, **kwargs) -> str:
+        return self.generate(prompt, **kwargs)
 
 class TimeReadingOptimizer:
-    def __init__(self, api_key: str = None):
-        # TextGrad 엔진 설정
-        tg.set_backward_engine("gpt-4o")
+    def __init__(self, api_key: str = None, dataset_dir: str = "dataset", seed: int = 0):
+        # TextGrad 엔진 설정 (역전파 호출도 텔레메트리와 카세트를 거치도록)
+        engine = LoggedEngine("gpt-4o", api_key)
+        problem = check_engine(engine)
+        if problem is not None:
+            # 기본 엔진은 자체 클라이언트로 요청하므로 텔레메트리와 카세트를 거치지 않음
+            print(f"Warning: {problem}; using textgrad's {FALLBACK_ENGINE} engine without telemetry/cassette")
+            engine = FALLBACK_ENGINE
+        tg.set_backward_engine(engine, override=True)
         
         self.time_reader = GPT4oTimeReader(api_key)
+        self.loader = DatasetLoader(dataset_dir)
+        self.seed = seed
         
         # 초기 프롬프트들
         self.initial_prompts = [
@@ -91,11 +161,12 @@ Analysis Guidelines:
         
         return tg.Variable(avg_loss, requires_grad=True, role_description="time reading loss")
     
-    def evaluate_prompt(self, prompt: str, test_data: List[Dict], max_samples: int = 20) -> Tuple[float, List[Dict]]:
-        """프롬프트 평가"""
-        # 테스트 샘플 선택
-        test_samples = random.sample(test_data, min(max_samples, len(test_data)))
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    def evaluate_prompt(self, prompt: str, test_data: Union[List[Dict], DatasetIndex], max_samples: int = 20,
+                        seed: Seed = None) -> Tuple[float, List[Dict]]:
+        """프롬프트 평가 (seed가 없으면 같은 데이터에서는 항상 같은 샘플로 비교)"""
+        # 시간대별 층화 샘플 선택
+        test_samples = as_index(test_data).sample(max_samples, self.seed if seed is None else seed)
+        image_paths = self.loader.images(test_samples)
         
         # 예측 수행
         predictions = self.time_reader.batch_read_times(image_paths, prompt)
@@ -105,7 +176,7 @@ Analysis Guidelines:
         
         return evaluation['exact_match_accuracy'], predictions
     
-    def optimize_prompt(self, train_data: List[Dict], val_data: List[Dict], 
+    def optimize_prompt(self, train_data: Union[List[Dict], DatasetIndex], val_data: Union[List[Dict], DatasetIndex],
                        num_iterations: int = 5, samples_per_iter: int = 10) -> str:
         """프롬프트 최적화"""
         best_prompt = self.initial_prompts[0]
@@ -134,7 +205,8 @@ Analysis Guidelines:
             
             # 현재 프롬프트로 예측
             current_prompt = prompt_var.value
-            score, predictions = self.evaluate_prompt(current_prompt, train_data, samples_per_iter)
+            score, predictions = self.evaluate_prompt(current_prompt, train_data, samples_per_iter,
+                                                      seed=[self.seed, iteration])
             
             print(f"Current score: {score:.3f}")
             
@@ -194,19 +266,20 @@ Generate an improved version that addresses these issues."""
         
         return best_prompt
     
-    def run_optimization(self, dataset_path: str = "dataset/metadata.json"):
-        """전체 최적화 프로세스 실행"""
-        # 데이터셋 로드
-        with open(dataset_path, 'r', encoding='utf-8') as f:
-            dataset = json.load(f)
-        
-        # 데이터 분할 (70% 훈련, 30% 검증)
-        random.shuffle(dataset)
-        split_idx = int(len(dataset) * 0.7)
-        train_data = dataset[:split_idx]
-        val_data = dataset[split_idx:]
-        
-        print(f"Dataset size: {len(dataset)}")
+    def run_optimization(self, dataset_path: Optional[str] = None):
+        """전체 최적화 프로세스 실행
+
+        dataset_path를 주면 (데이터셋 디렉터리 또는 그 안의 metadata.json) 그 데이터셋으로 바꿔 실행한다.
+        """
+        if dataset_path is not None:
+            if os.path.isfile(dataset_path):
+                dataset_path = os.path.dirname(dataset_path) or '.'
+            self.loader = DatasetLoader(dataset_path)
+        
+        # 데이터 분할 (70% 훈련, 30% 검증, 시간대별 층화)
+        train_data, val_data = self.loader.index.split(0.7, seed=self.seed)
+        
+        print(f"Dataset size: {len(self.loader)}")
         print(f"Train: {len(train_data)}, Validation: {len(val_data)}")
         
         # 프롬프트 최적화
@@ -226,7 +299,7 @@ Generate an improved version that addresses these issues."""
 if __name__ == "__main__":
     optimizer = TimeReadingOptimizer()
     
-    if os.path.exists("dataset/metadata.json"):
+    if optimizer.loader.exists():
         optimized_prompt, final_score = optimizer.run_optimization()
         print(f"\nOptimization completed!")
         print(f"Final score: {final_score:.3f}")
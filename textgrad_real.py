@@ -6,11 +6,13 @@ Note: Using compatible approach due to Python 3.8 type hint limitations
 
 import os
 import json
-import random
-import openai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from gpt4o_time_reader import GPT4oTimeReader
+from client_registry import shared_client
+from telemetry import logged_completion
 from evaluation_system import SeparateEvaluationSystem
+from dataset_loader import DatasetLoader
+from dataset_index import DatasetIndex, Seed, as_index
 
 # Try to import TextGrad, fallback to custom implementation if incompatible
 try:
@@ -39,7 +41,7 @@ class Variable:
         if not feedback:
             return
         
-        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        client = shared_client(os.getenv('OPENAI_API_KEY'))
         
         improvement_prompt = f"""You are a prompt engineering expert specializing in analog clock reading tasks.
 
@@ -59,7 +61,8 @@ Please create an improved version of this prompt that addresses the issues menti
 Provide only the improved prompt:"""
 
         try:
-            response = client.chat.completions.create(
+            response = logged_completion(
+                client, 'backward',
                 model="gpt-4o",
                 messages=[{"role": "user", "content": improvement_prompt}],
                 max_tokens=1000,
@@ -103,12 +106,14 @@ def sum_variables(variables: List[Variable]) -> Variable:
 class TextGradClockOptimizer:
     """TextGrad-style implementation for analog clock reading optimization"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, dataset_dir: str = "dataset", seed: int = 0):
         self.api_key = api_key
         os.environ['OPENAI_API_KEY'] = api_key
         
         self.time_reader = GPT4oTimeReader(api_key)
         self.evaluator = SeparateEvaluationSystem()
+        self.loader = DatasetLoader(dataset_dir)
+        self.seed = seed
         
         # Initial prompt for optimization
         self.STARTING_SYSTEM_PROMPT = """Analyze this analog clock image and determine the exact time.
@@ -173,10 +178,11 @@ The prompt needs clearer instructions for:
         
         return eval_fn
     
-    def evaluate_prompt_performance(self, prompt: str, test_data: List[Dict], max_samples: int = 15) -> tuple:
-        """Evaluate prompt performance and return metrics"""
-        test_samples = random.sample(test_data, min(max_samples, len(test_data)))
-        image_paths = [os.path.join("dataset", sample['filename']) for sample in test_samples]
+    def evaluate_prompt_performance(self, prompt: str, test_data: Union[List[Dict], DatasetIndex],
+                                    max_samples: int = 15, seed: Seed = None) -> tuple:
+        """Evaluate prompt performance and return metrics (same samples for the same data unless seed is given)"""
+        test_samples = as_index(test_data).sample(max_samples, self.seed if seed is None else seed)
+        image_paths = self.loader.images(test_samples)
         
         predictions = self.time_reader.batch_read_times(image_paths, prompt)
         evaluation = self.evaluator.comprehensive_evaluation(predictions, test_samples)
@@ -190,11 +196,8 @@ The prompt needs clearer instructions for:
         print("🚀 Real TextGrad Prompt Optimization Started!")
         print("=" * 60)
         
-        # Split dataset
-        random.shuffle(dataset)
-        split_idx = int(len(dataset) * 0.7)
-        train_data = dataset[:split_idx]
-        val_data = dataset[split_idx:]
+        # Split dataset (stratified by time of day)
+        train_data, val_data = as_index(dataset).split(0.7, seed=self.seed)
         
         print(f"Training: {len(train_data)} samples, Validation: {len(val_data)} samples")
         
@@ -247,7 +250,7 @@ The prompt needs clearer instructions for:
             epoch_losses = []
             
             # Sample training data for this epoch
-            train_samples = random.sample(train_data, min(samples_per_epoch, len(train_data)))
+            train_samples = train_data.sample(samples_per_epoch, seed=[self.seed, epoch])
             
             print(f"Processing {len(train_samples)} training samples...")
             
@@ -255,7 +258,7 @@ The prompt needs clearer instructions for:
             optimizer.zero_grad()
             
             # Process batch of samples
-            image_paths = [os.path.join("dataset", sample['filename']) for sample in train_samples]
+            image_paths = self.loader.images(train_samples)
             
             print(f"📝 Current Prompt (Epoch {epoch + 1}):\n{'-'*50}")
             print(system_prompt.value[:200] + "..." if len(system_prompt.value) > 200 else system_prompt.value)
@@ -366,17 +369,16 @@ def main():
         print("📝 Set your API key with: export OPENAI_API_KEY='your-key-here'")
         return
     
+    optimizer = TextGradClockOptimizer(api_key)
+    
     # Load dataset
-    try:
-        with open('dataset/metadata.json', 'r', encoding='utf-8') as f:
-            dataset = json.load(f)
-        print(f"✅ Loaded {len(dataset)} samples from dataset")
-    except FileNotFoundError:
-        print("❌ Error: dataset/metadata.json not found")
+    if not optimizer.loader.exists():
+        print("❌ Error: dataset/metadata.json (or packed manifest.json) not found")
         return
+    dataset = optimizer.loader.samples
+    print(f"✅ Loaded {len(dataset)} samples from dataset")
     
     # Run optimization (minimal for debugging)
-    optimizer = TextGradClockOptimizer(api_key)
     optimized_prompt = optimizer.optimize_prompt(dataset, num_epochs=1, samples_per_epoch=3)
     
     print(f"\n🎉 TextGrad optimization completed!")